@@ -48,6 +48,18 @@ def create_app():
     # Rate limiter
     limiter.init_app(app)
 
+    # Data cache backend (memory / sqlite / redis)
+    from . import cache
+    cache.init_app(app)
+
+    # Request latency / upstream / SQL metrics on /metrics, Server-Timing headers
+    from . import metrics
+    metrics.init_app(app)
+
+    # CLI commands (flask shadowserver ...)
+    from . import cli
+    cli.init_app(app)
+
     # Keycloak OIDC (optional)
     if app.config["KEYCLOAK_ENABLED"]:
         kc_url = app.config["KEYCLOAK_SERVER_URL"].rstrip("/")
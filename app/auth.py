@@ -4,6 +4,8 @@ import requests as http_requests
 import urllib3
 from flask import current_app, request, redirect, url_for, session
 
+from . import iris_http
+
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 log = logging.getLogger(__name__)
@@ -33,13 +35,7 @@ def require_auth():
 def validate_key_against_iris(api_key):
     """Validate an API key by calling IRIS. Returns (valid, user_info)."""
     try:
-        resp = http_requests.get(
-            f"{current_app.config['IRIS_URL']}/api/v2/cases",
-            headers={"Authorization": f"Bearer {api_key}"},
-            verify=current_app.config["IRIS_VERIFY_SSL"],
-            timeout=10,
-            params={"per_page": 1},
-        )
+        resp = iris_http.get("/api/v2/cases", api_key, params={"per_page": 1}, timeout=10)
         if resp.status_code == 200:
             log.info("Successful auth from %s", request.remote_addr)
             return True, None
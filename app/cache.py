@@ -0,0 +1,337 @@
+"""Pluggable data cache backends shared by the data source modules.
+
+``memory`` (default) is the per-worker LRU the explorer always used.
+``sqlite`` keeps entries in a local file that every gunicorn worker on the
+host shares, and ``redis`` does the same across hosts (needs the optional
+``redis`` package). Shared entries are stored as zlib-compressed JSON.
+"""
+
+import datetime
+import decimal
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from flask import current_app
+
+log = logging.getLogger(__name__)
+
+
+# ── Serialization ────────────────────────────────────────────────
+
+def _json_default(obj):
+    if isinstance(obj, datetime.datetime):
+        return {"__t": "dt", "v": obj.isoformat()}
+    if isinstance(obj, datetime.date):
+        return {"__t": "d", "v": obj.isoformat()}
+    if isinstance(obj, decimal.Decimal):
+        return {"__t": "dec", "v": str(obj)}
+    raise TypeError(f"Cannot cache value of type {type(obj).__name__}")
+
+
+def _json_object_hook(obj):
+    tag = obj.get("__t")
+    if tag is None or len(obj) != 2:
+        return obj
+    if tag == "dt":
+        return datetime.datetime.fromisoformat(obj["v"])
+    if tag == "d":
+        return datetime.date.fromisoformat(obj["v"])
+    if tag == "dec":
+        return decimal.Decimal(obj["v"])
+    return obj
+
+
+def encode(data):
+    """Serialize cached data to a compact blob."""
+    raw = json.dumps(data, separators=(",", ":"), default=_json_default)
+    return zlib.compress(raw.encode(), 6)
+
+
+def decode(blob):
+    """Inverse of encode()."""
+    return json.loads(zlib.decompress(blob), object_hook=_json_object_hook)
+
+
+# ── Backends ─────────────────────────────────────────────────────
+
+class MemoryCache:
+    """Bounded per-process LRU: evicts least recently used entries on overflow."""
+
+    shared = False
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = self.misses = self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[0] > time.time():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            # Expired — remove it
+            if entry:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, data, ttl):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, data)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for k in list(self._data.keys()):
+                if k.startswith(prefix):
+                    del self._data[k]
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class _SharedCache:
+    """Base for cross-worker backends.
+
+    Every entry carries a random stamp. Decoded values are memoized per
+    process by stamp, so repeated hits return the same object (which keeps
+    EntityStore indexes warm) and skip decompression.
+    """
+
+    shared = True
+    _MEMO_MAX_ENTRIES = 64
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = self.misses = self.evictions = 0
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    def _memo_get(self, key, stamp):
+        with self._memo_lock:
+            memo = self._memo.get(key)
+            if memo and memo[0] == stamp:
+                self._memo.move_to_end(key)
+                return memo[1]
+        return None
+
+    def _memo_put(self, key, stamp, data):
+        with self._memo_lock:
+            self._memo[key] = (stamp, data)
+            self._memo.move_to_end(key)
+            while len(self._memo) > self._MEMO_MAX_ENTRIES:
+                self._memo.popitem(last=False)
+
+    def _memo_drop(self, prefix):
+        with self._memo_lock:
+            for k in list(self._memo.keys()):
+                if k.startswith(prefix):
+                    del self._memo[k]
+
+    def get(self, key):
+        found = self._read_stamp(key)
+        if found is None:
+            self.misses += 1
+            return None
+        data = self._memo_get(key, found)
+        if data is None:
+            blob = self._read_blob(key, found)
+            if blob is None:
+                self.misses += 1
+                return None
+            data = decode(blob)
+            self._memo_put(key, found, data)
+        self.hits += 1
+        return data
+
+    def set(self, key, data, ttl):
+        stamp = os.urandom(8).hex()
+        self._write(key, stamp, encode(data), ttl)
+        self._memo_put(key, stamp, data)
+
+    def delete(self, key):
+        self._delete(key)
+        self._memo_drop(key)
+
+    def delete_prefix(self, prefix):
+        self._delete_prefix(prefix)
+        self._memo_drop(prefix)
+
+
+class SQLiteCache(_SharedCache):
+    """Entries in a local SQLite file (WAL mode) shared by all workers on the host."""
+
+    def __init__(self, path, max_entries=256):
+        super().__init__(max_entries)
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, expires REAL NOT NULL,"
+            " stamp TEXT NOT NULL, value BLOB NOT NULL)"
+        )
+
+    def _conn(self):
+        # One connection per thread (and per process, after a fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _read_stamp(self, key):
+        row = self._conn().execute(
+            "SELECT stamp FROM cache WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _read_blob(self, key, stamp):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND stamp = ?", (key, stamp)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _write(self, key, stamp, blob, ttl):
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, expires, stamp, value) VALUES (?, ?, ?, ?)",
+            (key, now + ttl, stamp, blob),
+        )
+        conn.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+        overflow = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            # Evict entries closest to expiry first
+            conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY expires LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def _delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def _delete_prefix(self, prefix):
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        self._conn().execute(
+            "DELETE FROM cache WHERE key LIKE ? ESCAPE '\\'", (escaped + "%",)
+        )
+
+    def stats(self):
+        entries = self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class RedisCache(_SharedCache):
+    """Entries in Redis (or any Redis-protocol server); expiry is left to Redis."""
+
+    _NAMESPACE = "ide:cache:"
+
+    def __init__(self, url, max_entries=256):
+        super().__init__(max_entries)
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        self._redis = redis.Redis.from_url(url)
+
+    def _read_stamp(self, key):
+        stamp = self._redis.hget(self._NAMESPACE + key, "stamp")
+        return stamp.decode() if stamp else None
+
+    def _read_blob(self, key, stamp):
+        found, blob = self._redis.hmget(self._NAMESPACE + key, "stamp", "value")
+        if not found or found.decode() != stamp:
+            return None
+        return blob
+
+    def _write(self, key, stamp, blob, ttl):
+        pipe = self._redis.pipeline()
+        pipe.hset(self._NAMESPACE + key, mapping={"stamp": stamp, "value": blob})
+        pipe.expire(self._NAMESPACE + key, max(1, int(ttl)))
+        pipe.execute()
+
+    def _delete(self, key):
+        self._redis.delete(self._NAMESPACE + key)
+
+    def _delete_prefix(self, prefix):
+        batch = []
+        for k in self._redis.scan_iter(match=self._NAMESPACE + _redis_glob_escape(prefix) + "*"):
+            batch.append(k)
+            if len(batch) >= 500:
+                self._redis.delete(*batch)
+                batch = []
+        if batch:
+            self._redis.delete(*batch)
+
+    def stats(self):
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def _redis_glob_escape(s):
+    return "".join("\\" + c if c in "*?[]\\" else c for c in s)
+
+
+# ── App wiring ───────────────────────────────────────────────────
+
+def create_backend(name, url="", max_entries=256):
+    """Instantiate a cache backend by name (memory, sqlite, redis)."""
+    if name == "memory":
+        return MemoryCache(max_entries)
+    if name == "sqlite":
+        return SQLiteCache(url or "/tmp/ide_cache.sqlite3", max_entries)
+    if name == "redis":
+        return RedisCache(url or "redis://localhost:6379/0", max_entries)
+    raise ValueError(f"Unknown CACHE_BACKEND {name!r}")
+
+
+def init_app(app):
+    """Create the configured cache backend and attach it to the app."""
+    app.extensions["ide_cache"] = create_backend(
+        app.config["CACHE_BACKEND"],
+        app.config["CACHE_URL"],
+        app.config["CACHE_MAX_ENTRIES"],
+    )
+    log.info("Data cache backend: %s", app.config["CACHE_BACKEND"])
+
+
+def get_backend():
+    """The cache backend of the current app."""
+    return current_app.extensions["ide_cache"]
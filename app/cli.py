@@ -0,0 +1,71 @@
+"""Flask CLI commands (``flask --app app <command>``)."""
+
+import json
+
+import click
+from flask import current_app
+
+
+@click.group("shadowserver")
+def shadowserver_cli():
+    """Shadowserver database maintenance helpers."""
+
+
+@shadowserver_cli.command("ddl")
+def shadowserver_ddl():
+    """Print the search/index and rollup DDL for the shadowserver_db owner to run."""
+    from .shadowserver_db import ROLLUP_DDL, SEARCH_DDL
+    click.echo(SEARCH_DDL)
+    click.echo(ROLLUP_DDL.replace("{viewer}", current_app.config["SS_DB_USER"]))
+
+
+@shadowserver_cli.command("refresh-rollups")
+def shadowserver_refresh_rollups():
+    """Refresh the dashboard rollups (e.g. from cron after each ingestion run)."""
+    if not current_app.config["SS_ENABLED"]:
+        raise click.ClickException("Shadowserver integration is not enabled (SS_ENABLED)")
+    from . import shadowserver_db
+    if shadowserver_db.refresh_rollups():
+        click.echo("Rollups refreshed")
+    else:
+        click.echo("Another session is refreshing the rollups")
+
+
+@shadowserver_cli.command("status")
+def shadowserver_status():
+    """Show which optional search columns, indexes and rollups were detected."""
+    if not current_app.config["SS_ENABLED"]:
+        raise click.ClickException("Shadowserver integration is not enabled (SS_ENABLED)")
+    from . import shadowserver_db
+    try:
+        click.echo(json.dumps(shadowserver_db.capabilities(), indent=2))
+    finally:
+        shadowserver_db._return_conn(None)
+
+
+@shadowserver_cli.command("correlate")
+def shadowserver_correlate():
+    """Correlate all open cases against Shadowserver and store their hit counts."""
+    if not current_app.config["SS_ENABLED"]:
+        raise click.ClickException("Shadowserver integration is not enabled (SS_ENABLED)")
+    db_mode = current_app.config["DATA_SOURCE"] == "db"
+    if not db_mode and not current_app.config["IRIS_API_KEY"]:
+        raise click.ClickException("API mode needs a service key (IRIS_API_KEY) to list cases")
+    from . import correlation
+    try:
+        correlation.check_backend()
+    except correlation.BatchUnavailable as e:
+        raise click.ClickException(str(e))
+    if db_mode:
+        from . import iris_db as ds
+    else:
+        from . import iris_api as ds
+    try:
+        click.echo(json.dumps(correlation.run_batch(ds), indent=2))
+    finally:
+        if db_mode:
+            ds._return_conn(None)
+
+
+def init_app(app):
+    app.cli.add_command(shadowserver_cli)
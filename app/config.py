@@ -40,6 +40,21 @@ class Config:
     IRIS_VERIFY_SSL = os.environ.get("IRIS_VERIFY_SSL", "false").lower() == "true"
     DATA_SOURCE = os.environ.get("DATA_SOURCE", "api")  # "api" or "db"
 
+    # Pooled HTTP session to IRIS (per worker): keep-alive pool size,
+    # retries with exponential backoff on 429/5xx, request timeout
+    IRIS_HTTP_POOL_SIZE = int(os.environ.get("IRIS_HTTP_POOL_SIZE", "20"))
+    IRIS_HTTP_RETRIES = int(os.environ.get("IRIS_HTTP_RETRIES", "3"))
+    IRIS_HTTP_BACKOFF = float(os.environ.get("IRIS_HTTP_BACKOFF", "0.5"))
+    IRIS_HTTP_TIMEOUT = int(os.environ.get("IRIS_HTTP_TIMEOUT", "30"))
+    # Page size for paginated IRIS API v2 list endpoints
+    IRIS_PAGE_SIZE = int(os.environ.get("IRIS_PAGE_SIZE", "100"))
+    # Max pages of one list fetched from IRIS in parallel
+    IRIS_FETCH_CONCURRENCY = int(os.environ.get("IRIS_FETCH_CONCURRENCY", "4"))
+    # Refresh cached entities incrementally (conditional requests / delta sync)
+    IRIS_DELTA_SYNC = os.environ.get("IRIS_DELTA_SYNC", "true").lower() == "true"
+    # Deadline in seconds for fetching all entity types of a case in parallel
+    FANOUT_TIMEOUT = int(os.environ.get("FANOUT_TIMEOUT", "60"))
+
     # Optional: pre-configured API key (single-user/service mode)
     # If set, users skip the login page and this key is used for all requests.
     # If empty, users must log in with their own IRIS API key.
@@ -52,12 +67,54 @@ class Config:
     DB_USER = os.environ.get("DB_USER", "iris")
     DB_PASSWORD = os.environ.get("DB_PASSWORD", "")
     DB_SSL_MODE = os.environ.get("DB_SSL_MODE", "prefer")
+    # Max pooled connections per worker — at least WEB_THREADS with threaded workers
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+    # Both database pools (DB mode and Shadowserver): seconds a checkout waits
+    # for a free connection, maximum connection age, and idle time after
+    # which a connection is pinged before reuse
+    DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PING_AFTER = int(os.environ.get("DB_POOL_PING_AFTER", "30"))
+    # Prepare a SELECT on a connection once it ran this many times (0 = never;
+    # use 0 behind PgBouncer in transaction mode), keep at most DB_PREPARED_MAX
+    DB_PREPARE_THRESHOLD = int(os.environ.get("DB_PREPARE_THRESHOLD", "2"))
+    DB_PREPARED_MAX = int(os.environ.get("DB_PREPARED_MAX", "100"))
+    # DB mode: full entities with more rows are read on every call, not cached
+    DB_CACHE_MAX_ROWS = int(os.environ.get("DB_CACHE_MAX_ROWS", "20000"))
 
     # Data cache TTL in seconds (how long fetched case data is cached)
     CACHE_TTL = int(os.environ.get("CACHE_TTL", "300"))
+    # Cache backend: "memory" (per-worker LRU), "sqlite" (file shared by all
+    # workers on the host) or "redis" (shared across hosts, needs `redis`)
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+    # SQLite file path or redis:// URL (backend-specific default if empty)
+    CACHE_URL = os.environ.get("CACHE_URL", "")
+    CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "256"))
+    # Estimated memory for the indexed DataTables stores per worker (LRU beyond it)
+    ENTITY_STORE_MAX_MB = int(os.environ.get("ENTITY_STORE_MAX_MB", "128"))
+    # Auto-refresh requests (?refresh=auto) serve cached data and refetch in the background
+    CACHE_STALE_WHILE_REVALIDATE = os.environ.get("CACHE_STALE_WHILE_REVALIDATE", "true").lower() == "true"
+    # Minimum age in seconds before an auto-refresh request may refetch a cached key
+    CACHE_MIN_REFRESH = int(os.environ.get("CACHE_MIN_REFRESH", "15"))
 
     # Auto-refresh interval in seconds (0 = disabled)
     REFRESH_INTERVAL = int(os.environ.get("REFRESH_INTERVAL", "30"))
+    # Push changes to open pages over server-sent events instead of polling
+    # every table. Each open stream holds a worker thread: use threaded workers.
+    LIVE_UPDATES = os.environ.get("LIVE_UPDATES", "false").lower() == "true"
+    # Streams are closed (and reconnected by the browser) after this many
+    # seconds — keep it below the gunicorn worker timeout
+    LIVE_STREAM_MAX_SECONDS = int(os.environ.get("LIVE_STREAM_MAX_SECONDS", "90"))
+    # Open streams per worker; each holds one of its WEB_THREADS, so keep it
+    # well below that. Pages beyond the limit get 503 and poll instead.
+    LIVE_MAX_STREAMS = int(os.environ.get("LIVE_MAX_STREAMS", "4"))
+
+    # Prometheus text metrics on /metrics (per worker) and Server-Timing
+    # response headers; /metrics is only served with METRICS_TOKEN set and
+    # requires "Authorization: Bearer <token>"
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+    METRICS_SERVER_TIMING = os.environ.get("METRICS_SERVER_TIMING", "true").lower() == "true"
 
     # Shadowserver integration (read-only viewer for shadowserver_db)
     SS_ENABLED = os.environ.get("SS_ENABLED", "false").lower() == "true"
@@ -67,6 +124,13 @@ class Config:
     SS_DB_USER = os.environ.get("SS_DB_USER", "shadowserver_viewer")
     SS_DB_PASSWORD = os.environ.get("SS_DB_PASSWORD", "")
     SS_DB_SSL_MODE = os.environ.get("SS_DB_SSL_MODE", "prefer")
+    SS_DB_POOL_SIZE = int(os.environ.get("SS_DB_POOL_SIZE", "10"))
+    # "estimate": total counted once per ingestion run, filtered counts capped
+    # at SS_COUNT_CAP and estimated beyond; "exact": COUNT(*) on every draw
+    SS_COUNT_MODE = os.environ.get("SS_COUNT_MODE", "estimate")
+    SS_COUNT_CAP = int(os.environ.get("SS_COUNT_CAP", "10000"))
+    # Cache up to this many matched event IDs per case indicator set (0 = off)
+    SS_CORRELATION_CACHE_MAX = int(os.environ.get("SS_CORRELATION_CACHE_MAX", "50000"))
 
     # Keycloak SSO (optional — enables "Login with Keycloak" on login page)
     KEYCLOAK_ENABLED = os.environ.get("KEYCLOAK_ENABLED", "false").lower() == "true"
@@ -0,0 +1,216 @@
+"""Case indicator extraction and batch Shadowserver correlation.
+
+A batch run gathers the indicators of every open case through the
+configured data source, matches them against ss_events in one set-based
+query (shadowserver_db.correlate_cases) and keeps per-case hit counts in
+the data cache for the cases list, under the data source's key of the
+caller (cleared on logout). The matched event IDs land in the
+correlation cache, so opening a case's Shadowserver tab afterwards does
+not re-run its indicator query. Both must outlive the process that ran
+the batch (the CLI, one web worker), so batches need a shared cache
+backend (sqlite or redis).
+"""
+
+import ipaddress
+import logging
+import threading
+import time
+
+from . import cache, fanout
+
+log = logging.getLogger(__name__)
+
+_HITS_KEY = "ss-case-hits"
+_HITS_TTL = 7 * 86400
+_BATCH_WORKERS = 4
+
+_batch_lock = threading.Lock()
+
+
+def parse_networks(val):
+    """IP networks for an address, CIDR block or ``first-last`` range, else None.
+
+    Host bits of a CIDR are ignored (``10.1.2.3/24`` is ``10.1.2.0/24``);
+    a range is split into the CIDR blocks covering it.
+    """
+    val = (val or "").strip()
+    try:
+        if "-" in val:
+            first, last = (ipaddress.ip_address(p.strip()) for p in val.split("-", 1))
+            if first > last:
+                first, last = last, first
+            return list(ipaddress.summarize_address_range(first, last))
+        return [ipaddress.ip_network(val, strict=False)]
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_asn_range(val):
+    """``(first, last)`` for ``AS64500`` or ``AS64500-AS64510``, else None."""
+    parts = [p.strip().upper().removeprefix("AS").strip() for p in (val or "").split("-", 1)]
+    try:
+        first, last = int(parts[0]), int(parts[-1])
+    except ValueError:
+        return None
+    return (min(first, last), max(first, last))
+
+
+def looks_like_domain(val):
+    """Quick check if a string looks like a domain name."""
+    if not val or not val.strip():
+        return False
+    val = val.strip().lower()
+    return "." in val and parse_networks(val) is None and all(
+        c.isalnum() or c in ".-_" for c in val
+    )
+
+
+def case_indicators(iocs, assets):
+    """Sorted ``ips``/``networks``/``hostnames``/``asns``/``asn_ranges`` of a case."""
+    ips = set()
+    networks = set()
+    hostnames = set()
+    asns = set()
+    asn_ranges = set()
+
+    def add_address(val):
+        """Add an IP, CIDR block or address range; False if it is none of these."""
+        blocks = parse_networks(val)
+        if blocks is None:
+            return False
+        for block in blocks:
+            if block.num_addresses == 1:
+                ips.add(str(block.network_address))
+            else:
+                networks.add(str(block))
+        return True
+
+    for ioc in (iocs or []):
+        val = (ioc.get("ioc_value") or "").strip()
+        ioc_type = str(ioc.get("ioc_type_id", ioc.get("ioc_type", "")))
+        # IP types (exact ID depends on IRIS config, also try by value pattern)
+        if add_address(val):
+            continue
+        if looks_like_domain(val):
+            hostnames.add(val.lower())
+        elif ioc_type in ("asn",) or val.upper().startswith("AS"):
+            asn = parse_asn_range(val)
+            if asn is None or not asn[1]:
+                continue
+            if asn[0] == asn[1]:
+                asns.add(asn[0])
+            else:
+                asn_ranges.add(asn)
+
+    for asset in (assets or []):
+        ip = (asset.get("asset_ip") or "").strip()
+        if ip:
+            add_address(ip)
+        domain = (asset.get("asset_domain") or "").strip()
+        if domain:
+            hostnames.add(domain.lower())
+
+    return {
+        "ips": sorted(ips),
+        "networks": sorted(networks),
+        "hostnames": sorted(hostnames),
+        "asns": sorted(asns),
+        "asn_ranges": sorted(asn_ranges),
+    }
+
+
+class BatchUnavailable(RuntimeError):
+    """Batch correlation cannot keep its results with the configured cache backend."""
+
+
+def check_backend():
+    """Raise BatchUnavailable unless the data cache is shared between processes."""
+    if not cache.get_backend().shared:
+        raise BatchUnavailable(
+            "Batch correlation needs a shared cache backend (CACHE_BACKEND=sqlite or redis); "
+            "with the per-worker memory cache its results would be lost")
+
+
+def run_batch(ds):
+    """Correlate all open cases visible to the data source ``ds``; returns a summary."""
+    from . import shadowserver_db as ss_db
+
+    check_backend()
+
+    started = time.time()
+    cases = ds.get_cases_list(bust_cache=True) or []
+    open_ids = [c["case_id"] for c in cases if c.get("case_id") and not c.get("close_date")]
+
+    def load(case_id):
+        return (ds.get_indicator_rows(case_id, "iocs"), ds.get_indicator_rows(case_id, "assets"))
+
+    tasks = {case_id: ds.bind(lambda case_id=case_id: load(case_id)) for case_id in open_ids}
+    fetched, errors = fanout.run_parallel(tasks, max_workers=_BATCH_WORKERS, timeout=None)
+    for case_id, error in errors.items():
+        log.warning("Batch correlation: could not load indicators of case %s: %s", case_id, error)
+
+    indicators = {}
+    for case_id, (iocs, assets) in fetched.items():
+        ind = case_indicators(iocs, assets)
+        if any(ind.values()):
+            indicators[case_id] = ind
+
+    results = ss_db.correlate_cases(indicators) if indicators else {}
+    for case_id in fetched:
+        results.setdefault(case_id, {"hits": 0, "last_seen": None})
+
+    # Merge, so cases that failed to load this time keep their last counts
+    backend = cache.get_backend()
+    key = ds.cache_key(_HITS_KEY)
+    entry = backend.get(key) or {"cases": {}}
+    entry["cases"].update({str(case_id): hits for case_id, hits in results.items()})
+    entry["updated_at"] = time.time()
+    backend.set(key, entry, _HITS_TTL)
+
+    summary = {
+        "open_cases": len(open_ids),
+        "correlated": len(indicators),
+        "with_hits": sum(1 for hits in results.values() if hits["hits"]),
+        "failed": len(errors),
+        "seconds": round(time.time() - started, 2),
+    }
+    log.info("Batch correlation: %s", summary)
+    return summary
+
+
+def start_batch(ds):
+    """Run the batch in a background thread; False if one is already running.
+
+    Raises BatchUnavailable without a shared cache backend.
+    """
+    check_backend()
+    if not _batch_lock.acquire(blocking=False):
+        return False
+    run = ds.bind(lambda: run_batch(ds))
+
+    def target():
+        try:
+            run()
+        except Exception:
+            log.exception("Batch correlation failed")
+        finally:
+            _batch_lock.release()
+
+    threading.Thread(target=target, name="ss-batch-correlate", daemon=True).start()
+    return True
+
+
+def batch_running():
+    return _batch_lock.locked()
+
+
+def case_hits(ds):
+    """{"cases": {case_id (str): {"hits", "last_seen"}}, "updated_at"} of past batch runs.
+
+    Empty (not correlated) when the cache backend cannot be read.
+    """
+    try:
+        return cache.get_backend().get(ds.cache_key(_HITS_KEY)) or {"cases": {}, "updated_at": None}
+    except Exception:
+        log.warning("Could not read batch correlation results", exc_info=True)
+        return {"cases": {}, "updated_at": None}
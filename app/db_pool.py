@@ -0,0 +1,440 @@
+"""Thread-safe, blocking PostgreSQL connection pools shared by the DB modules.
+
+One pool per database and worker process, created on first use and kept in
+``app.extensions``. A checkout waits up to DB_POOL_TIMEOUT seconds for a
+free connection instead of failing when all are busy; connections idle for
+DB_POOL_PING_AFTER seconds are pinged before reuse and ones older than
+DB_POOL_RECYCLE are replaced. Request connections are returned on app
+context teardown, so they come back even when the view raised. Pooled
+connections prepare their hot SELECTs (see below).
+"""
+
+import collections
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+from flask import current_app, g
+
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+_registry_lock = threading.Lock()
+
+
+class PoolTimeout(psycopg2.pool.PoolError):
+    """No connection became free within the checkout timeout."""
+
+
+# ── Prepared statements ─────────────────────────────────────────
+#
+# Like psycopg 3's auto-prepare: once a connection has executed the same
+# SELECT DB_PREPARE_THRESHOLD times it PREPAREs it (psycopg2 placeholders
+# turned into $n) and runs later calls as EXECUTE, so Postgres skips parse
+# and planning for hot queries. At most DB_PREPARED_MAX statements are kept
+# per connection, least recently used ones are DEALLOCATEd. Server-side
+# (named) cursors and named-parameter queries run unprepared; a query that
+# cannot be prepared (e.g. undeterminable parameter types) falls back to
+# plain execution while it is among the recently refused shapes. An EXECUTE
+# failing because of the prepared statement itself (arguments its parameter
+# types reject, or a plan invalidated by a schema change) DEALLOCATEs it and
+# re-runs the query unprepared, so the caller never sees the error. Pooled
+# connections only read: rolling back the failed transaction first loses
+# nothing unless a named cursor is open on it, in which case the error is
+# raised instead.
+
+_PLACEHOLDER = re.compile(r"%%|%s|%\(")
+# Shapes Postgres refused to PREPARE (deterministic, so shared by all
+# connections): a bounded LRU, an evicted shape is just tried once more
+_MAX_UNPREPARABLE = 500
+_unpreparable = collections.OrderedDict()
+_unpreparable_lock = threading.Lock()
+# datatype_mismatch, undefined_function, ambiguous/indeterminate parameter
+_PARAMETER_TYPE_ERRORS = {"42804", "42883", "42P08", "42P18"}
+# feature_not_supported: "cached plan must not change result type"
+_STALE_PLAN = "0A000"
+# Shape counters per connection are reset beyond this many one-off queries
+_MAX_TRACKED_SHAPES = 1000
+
+
+def _is_unpreparable(query):
+    with _unpreparable_lock:
+        if query in _unpreparable:
+            _unpreparable.move_to_end(query)
+            return True
+    return False
+
+
+def _mark_unpreparable(query):
+    with _unpreparable_lock:
+        _unpreparable[query] = True
+        _unpreparable.move_to_end(query)
+        while len(_unpreparable) > _MAX_UNPREPARABLE:
+            _unpreparable.popitem(last=False)
+
+
+def _numbered(sql, has_params):
+    """``sql`` with psycopg2 placeholders as $1, $2, …; None if it cannot be converted."""
+    if "$" in sql:
+        return None
+    if not has_params:
+        return sql  # without parameters psycopg2 sends the query verbatim
+    parts = []
+    count = 0
+    pos = 0
+    for match in _PLACEHOLDER.finditer(sql):
+        if match.group() == "%(":
+            return None
+        parts.append(sql[pos:match.start()])
+        if match.group() == "%%":
+            parts.append("%")
+        else:
+            count += 1
+            parts.append(f"${count}")
+        pos = match.end()
+    parts.append(sql[pos:])
+    return "".join(parts)
+
+
+def _array_literal(values):
+    """Untyped array literal ('{…}'): unlike psycopg2's ARRAY[…] (text[] for
+    strings) it coerces to the prepared parameter's type, e.g. inet[]."""
+    items = []
+    for value in values:
+        if value is None:
+            items.append("NULL")
+        elif isinstance(value, (list, tuple)):
+            items.append(_array_literal(value))
+        else:
+            text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            items.append(f'"{text}"')
+    return "{" + ",".join(items) + "}"
+
+
+_preparing_cursors = {}
+
+
+def _preparing_cursor_class(base):
+    cls = _preparing_cursors.get(base)
+    if cls is None:
+        def execute(self, query, vars=None):
+            statement = None
+            if self.name is None and isinstance(query, str):
+                statement = self.connection.statement(lambda sql: base.execute(self, sql),
+                                                      query, vars)
+            if statement is None:
+                return base.execute(self, query, vars)
+            if vars is None or not len(vars):
+                sql, args = f"EXECUTE {statement}", None
+            else:
+                placeholders = ", ".join(["%s"] * len(vars))
+                sql = f"EXECUTE {statement} ({placeholders})"
+                args = [_array_literal(v) if isinstance(v, list) else v for v in vars]
+            try:
+                return base.execute(self, sql, args)
+            except psycopg2.Error as e:
+                if not self.connection.discard_statement(query, e):
+                    raise
+            return base.execute(self, query, vars)
+
+        cls = _preparing_cursors[base] = type(f"Preparing{base.__name__}", (base,),
+                                              {"execute": execute})
+    return cls
+
+
+def connection_factory(db, threshold, max_prepared):
+    """psycopg2 connection class for pool ``db``: timed cursors, auto-prepared SELECTs."""
+
+    class Connection(metrics.connection_factory(db)):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.prepared = collections.OrderedDict()  # query -> statement name
+            self.executions = {}
+            self.statement_ids = itertools.count(1)
+            self.named_cursors = weakref.WeakSet()
+
+        def cursor(self, *args, **kwargs):
+            if threshold:
+                base = kwargs.get("cursor_factory") or self.cursor_factory or psycopg2.extensions.cursor
+                kwargs["cursor_factory"] = _preparing_cursor_class(base)
+            cur = super().cursor(*args, **kwargs)
+            if cur.name is not None:
+                self.named_cursors.add(cur)
+            return cur
+
+        def discard_statement(self, query, error):
+            """Drop the prepared ``query`` after its EXECUTE failed with ``error``.
+
+            True when the caller may run the query unprepared instead: the
+            statement itself was at fault and the connection is usable again.
+            """
+            if error.pgcode in _PARAMETER_TYPE_ERRORS:
+                # Arguments the prepared parameter types do not accept: run unprepared from now on
+                _mark_unpreparable(query)
+            elif error.pgcode != _STALE_PLAN:
+                return False
+            name = self.prepared.pop(query, None)
+            if not self.autocommit:
+                if any(not cur.closed for cur in self.named_cursors):
+                    return False
+                self.rollback()
+            if name is not None:
+                # A stale plan is prepared again once the query is hot again
+                with self.cursor() as cur:
+                    cur.execute(f"DEALLOCATE {name}")
+            metrics.inc("db_prepared_statements_total", {"db": db, "result": "retried"})
+            return True
+
+        def statement(self, run, query, vars):
+            """Name of the prepared statement for ``query`` (preparing it now if due), or None.
+
+            ``run`` executes parameterless SQL on the calling cursor.
+            """
+            name = self.prepared.get(query)
+            if name is not None:
+                self.prepared.move_to_end(query)
+                metrics.inc("db_prepared_statements_total", {"db": db, "result": "hit"})
+                return name
+            if (_is_unpreparable(query) or isinstance(vars, dict)
+                    or not query.lstrip()[:6].upper().startswith(("SELECT", "WITH"))):
+                metrics.inc("db_prepared_statements_total", {"db": db, "result": "unprepared"})
+                return None
+            if len(self.executions) >= _MAX_TRACKED_SHAPES:
+                self.executions.clear()
+            self.executions[query] = seen = self.executions.get(query, 0) + 1
+            if seen < threshold:
+                metrics.inc("db_prepared_statements_total", {"db": db, "result": "unprepared"})
+                return None
+            numbered = _numbered(query, vars is not None)
+            if numbered is None:
+                _mark_unpreparable(query)
+                metrics.inc("db_prepared_statements_total", {"db": db, "result": "unprepared"})
+                return None
+            name = f"ide_{next(self.statement_ids)}"
+            sql = f"PREPARE {name} AS {numbered}"
+            if len(self.prepared) >= max_prepared:
+                sql = f"DEALLOCATE {self.prepared.popitem(last=False)[1]}; {sql}"
+            if not self.autocommit:
+                # A failed PREPARE must not abort the caller's transaction
+                sql = f"SAVEPOINT ide_prepare; {sql}; RELEASE SAVEPOINT ide_prepare"
+            try:
+                run(sql)
+            except psycopg2.Error as e:
+                if not self.autocommit:
+                    run("ROLLBACK TO SAVEPOINT ide_prepare")
+                log.info("Not preparing query (%s): %s", e.pgcode, metrics.sql_shape(query))
+                _mark_unpreparable(query)
+                metrics.inc("db_prepared_statements_total", {"db": db, "result": "failed"})
+                return None
+            del self.executions[query]
+            self.prepared[query] = name
+            metrics.inc("db_prepared_statements_total", {"db": db, "result": "prepared"})
+            return name
+
+    return Connection
+
+
+class Pool:
+    """Bounded pool of psycopg2 connections with blocking checkout.
+
+    ``connect`` opens a new connection. Idle connections are reused most
+    recently returned first, so surplus ones age out through recycling.
+    """
+
+    def __init__(self, name, connect, maxconn, timeout, recycle, ping_after):
+        self.name = name
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self.closed = False
+        self._connect = connect
+        self._cond = threading.Condition()
+        self._idle = collections.deque()  # (conn, returned_at)
+        self._born = {}                    # id(conn) -> opened_at, for open connections
+        self._opened = 0
+        self._waiting = 0
+        self._pid = os.getpid()
+        self._counters = {"checkouts": 0, "timeouts": 0, "opened": 0,
+                          "recycled": 0, "ping_failures": 0}
+
+    def getconn(self):
+        """A healthy connection; waits up to ``timeout`` seconds, then raises PoolTimeout."""
+        started = time.perf_counter()
+        try:
+            while True:
+                conn, idle_since = self._checkout(started)
+                if conn is None:
+                    conn = self._open()
+                elif not self._healthy(conn, idle_since):
+                    self._discard(conn)
+                    continue
+                with self._cond:
+                    self._counters["checkouts"] += 1
+                return conn
+        finally:
+            metrics.observe("db_pool_wait_seconds", {"db": self.name},
+                            time.perf_counter() - started, timing="pool")
+
+    def _checkout(self, started):
+        """(idle conn, returned_at), or (None, None) once a new slot is reserved."""
+        with self._cond:
+            if self.closed:
+                raise psycopg2.pool.PoolError("connection pool is closed")
+            while not self._idle and self._opened >= self.maxconn:
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(f"no {self.name} database connection free "
+                                      f"within {self.timeout}s ({self.maxconn} in use)")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            if self._idle:
+                return self._idle.pop()
+            self._opened += 1
+            return None, None
+
+    def _open(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self._counters["opened"] += 1
+        return conn
+
+    def _healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if self.recycle and now - self._born.get(id(conn), now) > self.recycle:
+            with self._cond:
+                self._counters["recycled"] += 1
+            return False
+        if now - idle_since >= self.ping_after:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                with self._cond:
+                    self._counters["ping_failures"] += 1
+                log.warning("Dropping dead %s database connection", self.name)
+                return False
+        return True
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._born.pop(id(conn), None)
+            self._opened -= 1
+            self._cond.notify()
+
+    def putconn(self, conn, close=False):
+        """Return a connection; an open transaction is rolled back, a broken one closed."""
+        if not close and not conn.closed and not self.closed:
+            status = conn.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+        if close or conn.closed or self.closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self.closed = True
+            idle, self._idle = list(self._idle), collections.deque()
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return dict(self._counters, db=self.name, max=self.maxconn, open=self._opened,
+                        idle=len(self._idle), in_use=self._opened - len(self._idle),
+                        waiting=self._waiting)
+
+
+def get_pool(name, connect_kwargs):
+    """The pool ``name`` of the current app, created with ``connect_kwargs()`` on first use.
+
+    ``connect_kwargs`` returns psycopg2.connect arguments plus ``maxconn``.
+    A pool inherited through fork is replaced, never shared with the parent.
+    """
+    pools = current_app.extensions.setdefault("db_pools", {})
+    pool = pools.get(name)
+    if pool is not None and not pool.closed and pool._pid == os.getpid():
+        return pool
+    with _registry_lock:
+        pool = pools.get(name)
+        if pool is None or pool.closed or pool._pid != os.getpid():
+            kwargs = connect_kwargs()
+            maxconn = kwargs.pop("maxconn")
+            config = current_app.config
+            kwargs.setdefault("connection_factory", connection_factory(
+                name, config["DB_PREPARE_THRESHOLD"], config["DB_PREPARED_MAX"]))
+            pool = pools[name] = Pool(
+                name, lambda: psycopg2.connect(**kwargs), maxconn,
+                timeout=config["DB_POOL_TIMEOUT"], recycle=config["DB_POOL_RECYCLE"],
+                ping_after=config["DB_POOL_PING_AFTER"],
+            )
+    return pool
+
+
+def request_conn(name, connect_kwargs):
+    """The connection of pool ``name`` held by this app context (checked out once)."""
+    conns = g.setdefault("db_pool_conns", {})
+    conn = conns.get(name)
+    if conn is None:
+        conn = conns[name] = get_pool(name, connect_kwargs).getconn()
+    return conn
+
+
+def return_request_conn(name):
+    """Return this app context's connection of pool ``name``, if it holds one."""
+    conn = g.get("db_pool_conns", {}).pop(name, None)
+    if conn is not None:
+        current_app.extensions["db_pools"][name].putconn(conn)
+
+
+def _teardown(exc):
+    for name in list(g.get("db_pool_conns", {})):
+        return_request_conn(name)
+
+
+def stats():
+    """Saturation counters of the current app's pools."""
+    return [pool.stats() for pool in current_app.extensions.get("db_pools", {}).values()]
+
+
+def init_app(app):
+    """Return request connections when the app context ends (also after errors)."""
+    if not app.extensions.get("db_pool_teardown"):
+        app.extensions["db_pool_teardown"] = True
+        app.teardown_appcontext(_teardown)
@@ -0,0 +1,263 @@
+"""Indexed in-memory store behind the DataTables entity endpoints.
+
+Rows fetched from IRIS are wrapped once per fetch. Global search, column
+filters, sorting and pagination then run against pre-lowercased text,
+cached sort permutations and a trigram index instead of rescanning and
+re-sorting the whole entity on every draw.
+
+Built stores are kept per worker in an LRU bounded by their estimated size
+(ENTITY_STORE_MAX_MB). A store costs about 8 bytes per row up front; the
+search text adds the rows' text length plus 57 bytes per row (as does each
+filtered column for its values), each sort order 72 bytes per row and the
+trigram index 4 bytes per posting (about one per indexed character) plus
+~150 bytes per distinct trigram: 0.5-1 KB per row for typical entities.
+``python bench/entity_store_memory.py`` compares the estimate with the
+measured allocation (within a few percent).
+"""
+
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+
+from flask import current_app
+
+# Estimated bytes of a store before anything is built, and per row
+_STORE_BASE_BYTES = 400
+_ROW_BYTES = 8
+# Per distinct trigram: key string, array header and dict slot
+_GRAM_BYTES = 150
+# Per row of a sort order: two list slots and two int objects
+_RANK_BYTES = 72
+# Rows with longer search text are verified directly instead of being indexed
+_INDEX_MAX_TEXT = 2048
+# Only the N rarest trigrams of a needle are intersected; the rest is verified
+_INDEX_MAX_POSTINGS = 4
+# Cell separator in the per-row search text — never part of a search value
+_SEP = "\x00"
+
+_stores = OrderedDict()
+_stores_lock = threading.Lock()
+_stores_bytes = 0
+
+
+def _sort_key(val):
+    """Generate a sort key that handles None and mixed types."""
+    if val is None:
+        return ""
+    return str(val).lower()
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _text_bytes(values):
+    return 8 * len(values) + sum(sys.getsizeof(v) for v in values if v is not None)
+
+
+class EntityStore:
+    """Columnar view over a list of row dicts, built lazily on first use."""
+
+    def __init__(self, rows):
+        self.rows = rows if isinstance(rows, list) else []
+        self._lock = threading.Lock()
+        self._text = None        # per-row lowercased search text
+        self._columns = {}       # column -> per-row lowercased value (None if missing)
+        self._ranks = {}         # (column, desc) -> (permutation, rank per row)
+        self._index = None       # trigram -> array of row ids
+        self._unindexed = ()     # row ids too long to index
+        self._key = None         # registry key, once kept by get_store
+        self.nbytes = _STORE_BASE_BYTES + _ROW_BYTES * len(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _grow(self, nbytes):
+        """Account for a newly built structure (and evict others if over budget)."""
+        self.nbytes += nbytes
+        if self._key is not None:
+            _grown(self, nbytes)
+
+    def _search_text(self):
+        if self._text is None:
+            with self._lock:
+                if self._text is None:
+                    self._text = [
+                        _SEP.join(str(v) for v in row.values() if v is not None).lower()
+                        for row in self.rows
+                    ]
+                    self._grow(_text_bytes(self._text))
+        return self._text
+
+    def _column(self, col):
+        values = self._columns.get(col)
+        if values is None:
+            values = [
+                None if row.get(col) is None else str(row[col]).lower()
+                for row in self.rows
+            ]
+            self._columns[col] = values
+            self._grow(_text_bytes(values))
+        return values
+
+    def _rank(self, col, desc):
+        ranked = self._ranks.get((col, desc))
+        if ranked is None:
+            keys = [_sort_key(row.get(col)) for row in self.rows]
+            perm = sorted(range(len(keys)), key=keys.__getitem__, reverse=desc)
+            rank = [0] * len(perm)
+            for pos, i in enumerate(perm):
+                rank[i] = pos
+            ranked = (perm, rank)
+            self._ranks[(col, desc)] = ranked
+            self._grow(_RANK_BYTES * len(perm))
+        return ranked
+
+    def _trigram_index(self):
+        if self._index is None:
+            texts = self._search_text()
+            with self._lock:
+                if self._index is None:
+                    index = {}
+                    unindexed = []
+                    for i, text in enumerate(texts):
+                        if len(text) > _INDEX_MAX_TEXT:
+                            unindexed.append(i)
+                            continue
+                        for gram in _trigrams(text):
+                            postings = index.get(gram)
+                            if postings is None:
+                                postings = index[gram] = array("I")
+                            postings.append(i)
+                    self._unindexed = unindexed
+                    self._index = index
+                    self._grow(_GRAM_BYTES * len(index)
+                               + sum(p.itemsize * len(p) for p in index.values()))
+        return self._index
+
+    def _candidates(self, needle):
+        """Row ids that may contain ``needle`` (a superset), or None for all rows."""
+        if len(needle) < 3:
+            return None
+        index = self._trigram_index()
+        postings = []
+        for gram in _trigrams(needle):
+            found = index.get(gram)
+            if found is None:
+                return set(self._unindexed)
+            postings.append(found)
+        postings.sort(key=len)
+        result = set(postings[0])
+        for found in postings[1:_INDEX_MAX_POSTINGS]:
+            result.intersection_update(found)
+            if not result:
+                break
+        result.update(self._unindexed)
+        return result
+
+    def _filter(self, matches, needle, values):
+        candidates = self._candidates(needle)
+        if matches is None:
+            ids = range(len(values)) if candidates is None else sorted(candidates)
+        elif candidates is None:
+            ids = matches
+        else:
+            ids = [i for i in matches if i in candidates]
+        return [i for i in ids if values[i] is not None and needle in values[i]]
+
+    def query(self, search="", column_filters=None, order_column=None,
+              order_dir="asc", start=0, length=25):
+        """Run one DataTables draw.
+
+        Returns (records_total, records_filtered, page_rows). ``search`` and
+        the column filter values match case-insensitively as substrings.
+        """
+        total = len(self.rows)
+        matches = None  # None = every row, in original order
+
+        search = (search or "").lower()
+        if search:
+            matches = self._filter(matches, search, self._search_text())
+
+        for col, val in (column_filters or {}).items():
+            val = (val or "").lower()
+            if val:
+                matches = self._filter(matches, val, self._column(col))
+
+        filtered = total if matches is None else len(matches)
+
+        if order_column:
+            perm, rank = self._rank(order_column, order_dir == "desc")
+            if matches is None:
+                page = perm[start:start + length]
+            else:
+                page = sorted(matches, key=rank.__getitem__)[start:start + length]
+        elif matches is None:
+            page = range(start, min(start + length, total))
+        else:
+            page = matches[start:start + length]
+
+        return total, filtered, [self.rows[i] for i in page]
+
+
+def _max_bytes():
+    return current_app.config["ENTITY_STORE_MAX_MB"] * 1024 * 1024
+
+
+def _evict(limit):
+    """Drop least recently used stores until the total fits ``limit`` (keeps the newest)."""
+    global _stores_bytes
+    while _stores_bytes > limit and len(_stores) > 1:
+        _, store = _stores.popitem(last=False)
+        store._key = None
+        _stores_bytes -= store.nbytes
+
+
+def _grown(store, nbytes):
+    global _stores_bytes
+    with _stores_lock:
+        if _stores.get(store._key) is store:
+            _stores_bytes += nbytes
+            _evict(_max_bytes())
+
+
+def get_store(key, rows):
+    """Return the EntityStore for ``rows``, reusing the one built for the same fetch.
+
+    A store is rebuilt whenever the data source hands back a different list
+    object for ``key`` (i.e. after a cache refill), so indexes never go stale.
+    """
+    global _stores_bytes
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is not None and store.rows is rows:
+            _stores.move_to_end(key)
+            return store
+        if store is not None:
+            store._key = None
+            _stores_bytes -= store.nbytes
+        store = EntityStore(rows)
+        store._key = key
+        _stores[key] = store
+        _stores.move_to_end(key)
+        _stores_bytes += store.nbytes
+        _evict(_max_bytes())
+        return store
+
+
+def drop_stores(prefix):
+    """Forget all stores whose key starts with ``prefix``."""
+    global _stores_bytes
+    with _stores_lock:
+        for k in list(_stores.keys()):
+            if k.startswith(prefix):
+                store = _stores.pop(k)
+                store._key = None
+                _stores_bytes -= store.nbytes
+
+
+def stats():
+    """Number and estimated size in bytes of this worker's stores."""
+    with _stores_lock:
+        return {"stores": len(_stores), "bytes": _stores_bytes}
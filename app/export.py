@@ -0,0 +1,127 @@
+"""Streaming CSV / NDJSON downloads of table results.
+
+Rows arrive as an iterable of batches and leave as text chunks, so a
+download never holds more than one batch in memory. The first batch is
+read before the response starts, so a failing query still gets an error
+status; a failure after that ends the file with an error marker and
+aborts the transfer instead of finishing a truncated download.
+"""
+
+import csv
+import io
+import json
+import logging
+
+from flask import Response
+
+log = logging.getLogger(__name__)
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Leading characters spreadsheet apps treat as a formula (CSV injection)
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def columns_of(rows):
+    """Column names of ``rows`` in first-seen order."""
+    columns = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+    return list(columns)
+
+
+def _csv_chunks(batches, columns):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if columns is not None:
+        writer.writerow(columns)
+    for rows in batches:
+        if columns is None:
+            # Uniform rows (one query): the first batch names the columns
+            columns = columns_of(rows)
+            writer.writerow(columns)
+        for row in rows:
+            writer.writerow([_cell(row.get(c)) for c in columns])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+
+def _ndjson_chunks(batches):
+    for rows in batches:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in rows)
+
+
+# Last line of a download whose row source failed part-way
+_ERROR_MARKERS = {
+    "csv": "\n# ERROR: export incomplete, reading the data failed\n",
+    "ndjson": json.dumps({"error": "export incomplete, reading the data failed"}) + "\n",
+}
+
+
+def _close(batches):
+    close = getattr(batches, "close", None)
+    if close is not None:
+        close()
+
+
+def _prefetched(first, batches):
+    try:
+        yield first
+        yield from batches
+    finally:
+        _close(batches)
+
+
+def _prefetch(batches):
+    """Read the first batch now; returns the same batches as a closable generator."""
+    batches = iter(batches)
+    try:
+        first = next(batches)
+    except StopIteration:
+        return iter(())
+    return _prefetched(first, batches)
+
+
+def _closing(chunks, batches, fmt):
+    try:
+        yield from chunks
+    except Exception:
+        log.exception("Export failed after the response started")
+        # Flag the file, then re-raise so the server aborts the transfer
+        # (no final chunk): the client sees a failed download, not a short one
+        yield _ERROR_MARKERS[fmt]
+        raise
+    finally:
+        # Close the row source (e.g. release its DB connection) on disconnect too
+        _close(batches)
+
+
+def response(batches, fmt, filename, columns):
+    """Streaming attachment response for ``fmt`` (a key of FORMATS).
+
+    ``columns`` None takes the CSV columns from the first batch. Reading
+    the first batch happens here: errors it raises (connection, SQL) reach
+    the caller before any status is sent.
+    """
+    batches = _prefetch(batches)
+    chunks = _csv_chunks(batches, columns) if fmt == "csv" else _ndjson_chunks(batches)
+    return Response(_closing(chunks, batches, fmt), mimetype=FORMATS[fmt], headers={
+        "Content-Disposition": f'attachment; filename="{filename}.{fmt}"',
+        "X-Accel-Buffering": "no",
+        "Cache-Control": "no-store",
+    })
@@ -0,0 +1,67 @@
+"""Run independent fetches concurrently under one deadline; coalesce duplicate ones."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+def run_parallel(tasks, max_workers, timeout):
+    """Run ``tasks`` (name -> callable) concurrently on a thread pool.
+
+    Returns (results, errors), both keyed by task name. Tasks that raised
+    land in ``errors``; tasks still running when ``timeout`` seconds have
+    passed are reported as TimeoutError and left to finish in the background.
+    """
+    results = {}
+    errors = {}
+    if not tasks:
+        return results, errors
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks))),
+                              thread_name_prefix="fanout")
+    try:
+        futures = {name: pool.submit(fn) for name, fn in tasks.items()}
+        wait(futures.values(), timeout=timeout)
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                errors[name] = TimeoutError(f"{name} did not finish within {timeout}s")
+            elif future.exception() is not None:
+                errors[name] = future.exception()
+            else:
+                results[name] = future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results, errors
+
+
+# Single-flight: concurrent misses for the same cache key share one upstream fetch
+_SINGLE_FLIGHT_TIMEOUT = 120
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def single_flight(key, fn):
+    """Run fn() once per key; concurrent callers for the same key wait for its result."""
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = {"done": threading.Event(), "result": None, "error": None}
+
+    if not leader:
+        if not call["done"].wait(_SINGLE_FLIGHT_TIMEOUT):
+            raise TimeoutError(f"Timed out waiting for in-flight fetch of {key}")
+        if call["error"] is not None:
+            raise call["error"]
+        return call["result"]
+
+    try:
+        call["result"] = fn()
+        return call["result"]
+    except Exception as e:
+        call["error"] = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        call["done"].set()
@@ -1,21 +1,43 @@
+import contextvars
 import hashlib
 import logging
+import threading
 import time
-from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
 import urllib3
 from flask import current_app
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+from . import cache, entity_store, fanout, iris_http, metrics
 from .auth import get_api_key
 
 log = logging.getLogger(__name__)
 
-# Bounded LRU cache: max 256 entries, evicts oldest on overflow
-_CACHE_MAX_ENTRIES = 256
-_cache = OrderedDict()
+# API key for work running outside the request thread (background refresh)
+_bound_api_key = contextvars.ContextVar("iris_bound_api_key", default=None)
+
+
+def _api_key():
+    """The API key of the current request, or the one bound to this worker thread."""
+    return _bound_api_key.get() or get_api_key()
+
+
+def bind(fn):
+    """Wrap fn so it can run in another thread with this request's app and API key."""
+    app = current_app._get_current_object()
+    api_key = _api_key()
+
+    def run(*args, **kwargs):
+        with app.app_context():
+            token = _bound_api_key.set(api_key)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _bound_api_key.reset(token)
+
+    return metrics.carry(run)
 
 
 def _cache_key(api_key, *parts):
@@ -24,36 +46,101 @@ def _cache_key(api_key, *parts):
     return f"{key_hash}:{':'.join(str(p) for p in parts)}"
 
 
+def cache_key(*parts):
+    """Data cache key scoped to the active API key (dropped by invalidate_user_cache)."""
+    return _cache_key(_api_key(), *parts)
+
+
+def _get_cached_entry(key):
+    """Cached {"data", "fetched", "sync"} entry for key, or None.
+
+    ``sync`` holds what the next refresh needs to fetch incrementally
+    (HTTP validators or a delta watermark).
+    """
+    return cache.get_backend().get(key)
+
+
 def _get_cached(key):
-    entry = _cache.get(key)
-    if entry and entry["expires"] > time.time():
-        _cache.move_to_end(key)
-        return entry["data"]
-    # Expired — remove it
-    if entry:
-        del _cache[key]
-    return None
+    entry = _get_cached_entry(key)
+    return entry["data"] if entry is not None else None
+
+
+def _set_cached(key, data, sync=None):
+    entry = {"data": data, "fetched": time.time(), "sync": sync}
+    cache.get_backend().set(key, entry, current_app.config["CACHE_TTL"])
+
+
+# Stale-while-revalidate: keys with a background refresh currently running
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+
+def _refresh_due(entry):
+    """True once an entry is older than the per-key minimum refresh interval."""
+    return time.time() - entry["fetched"] >= current_app.config["CACHE_MIN_REFRESH"]
 
 
-def _set_cached(key, data):
-    ttl = current_app.config["CACHE_TTL"]
-    _cache[key] = {"data": data, "expires": time.time() + ttl}
-    _cache.move_to_end(key)
-    # Evict oldest entries if over limit
-    while len(_cache) > _CACHE_MAX_ENTRIES:
-        _cache.popitem(last=False)
+def _revalidate(key, fetch, previous):
+    """Refresh key in a background thread, at most one refresh per key at a time."""
+    with _revalidating_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+
+    def load():
+        data, sync = fetch(previous)
+        _set_cached(key, data, sync)
+        return data
+
+    bound = bind(lambda: fanout.single_flight(key, load))
+
+    def run():
+        try:
+            bound()
+        except Exception:
+            log.warning("Background refresh failed for %s", key)
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(key)
+
+    threading.Thread(target=run, name="iris-revalidate", daemon=True).start()
+
+
+def _cached_fetch(key, fetch, bust_cache=False):
+    """Read-through cache for one key.
+
+    ``fetch(previous)`` receives the cached entry being refreshed (or None)
+    and returns (data, sync). Misses and refetches are coalesced via
+    single-flight. ``bust_cache=True`` (a manual refresh) refetches now.
+    ``bust_cache="auto"`` (the auto-refresh timer, live-update checks)
+    refreshes a cached key only once the minimum refresh interval has passed
+    — in the background (serving the cached data meanwhile) when
+    stale-while-revalidate is on, synchronously otherwise.
+    """
+    entry = _get_cached_entry(key)
+    if entry is not None and bust_cache is not True:
+        if not bust_cache or not _refresh_due(entry):
+            return entry["data"]
+        if current_app.config["CACHE_STALE_WHILE_REVALIDATE"]:
+            _revalidate(key, fetch, entry)
+            return entry["data"]
+
+    def load():
+        # A previous leader may have filled the cache while we were queued
+        if not bust_cache:
+            cached = _get_cached(key)
+            if cached is not None:
+                return cached
+        data, sync = fetch(entry)
+        _set_cached(key, data, sync)
+        return data
+
+    return fanout.single_flight(key, load)
 
 
 def _get(path, params=None):
     """Make authenticated GET request to IRIS API using the active user's key."""
-    api_key = get_api_key()
-    resp = requests.get(
-        f"{current_app.config['IRIS_URL']}{path}",
-        headers={"Authorization": f"Bearer {api_key}"},
-        verify=current_app.config["IRIS_VERIFY_SSL"],
-        timeout=30,
-        params=params,
-    )
+    resp = iris_http.get(path, _api_key(), params=params)
     resp.raise_for_status()
     return resp.json()
 
@@ -61,97 +148,251 @@ def _get(path, params=None):
 _MAX_PAGINATED_ITEMS = 10_000
 
 
-def _collect_paginated(path):
-    """Fetch all pages from a paginated IRIS API v2 endpoint."""
-    page = 1
-    per_page = 100
-    all_items = []
+def _page_items(path, page, per_page):
+    result = _get(path, params={"page": page, "per_page": per_page})
+    items = result.get("data", [])
+    return items if isinstance(items, list) else []
 
-    while True:
-        result = _get(path, params={"page": page, "per_page": per_page})
-        items = result.get("data", [])
-        if isinstance(items, list):
-            all_items.extend(items)
+
+def _last_page(result, page_size):
+    """Page count from IRIS' pagination metadata, or None when it has none.
+
+    ``page_size`` is the length of a full page as IRIS returned it, which can
+    be smaller than the requested IRIS_PAGE_SIZE when IRIS caps per_page.
+    """
+    last_page = result.get("last_page")
+    if isinstance(last_page, int):
+        return last_page
+    total = result.get("total")
+    if isinstance(total, int) and page_size:
+        return -(-total // page_size)
+    return None
+
+
+def _collect_paginated(path):
+    """Fetch all pages from a paginated IRIS API v2 endpoint.
+
+    Once the first page reports ``last_page`` or ``total``, the remaining
+    pages are fetched concurrently (at most IRIS_FETCH_CONCURRENCY at a time)
+    and joined in page order. Endpoints without either are paged sequentially
+    until a page comes back empty or shorter than the first one.
+    """
+    per_page = current_app.config["IRIS_PAGE_SIZE"]
+    result = _get(path, params={"page": 1, "per_page": per_page})
+    items = result.get("data", [])
+    if not isinstance(items, list):
+        return items
+    all_items = list(items)
+    if not items:
+        return all_items
+
+    page_size = len(items)
+    max_pages = -(-_MAX_PAGINATED_ITEMS // page_size)
+    last_page = _last_page(result, page_size)
+    if last_page is not None:
+        if last_page > max_pages:
+            log.warning("Pagination limit reached (%d of %d pages) for %s",
+                        max_pages, last_page, path)
+        pages = range(2, min(last_page, max_pages) + 1)
+        workers = min(current_app.config["IRIS_FETCH_CONCURRENCY"], len(pages))
+        fetch = bind(lambda page: _page_items(path, page, per_page))
+        if workers <= 1:
+            for page in pages:
+                all_items.extend(fetch(page))
         else:
-            return items
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="iris-page") as pool:
+                for page_items in pool.map(fetch, pages):
+                    all_items.extend(page_items)
+        return all_items
 
-        total = result.get("total")
-        if total is not None and len(all_items) >= total:
-            break
-        if len(items) < per_page:
-            break
+    page = 1
+    while True:
         if len(all_items) >= _MAX_PAGINATED_ITEMS:
             log.warning("Pagination limit reached (%d items) for %s", len(all_items), path)
             break
         page += 1
+        items = _page_items(path, page, per_page)
+        all_items.extend(items)
+        if len(items) < page_size:
+            break
 
     return all_items
 
 
-def _get_legacy(path, params=None):
-    """Fetch from legacy (non-v2) IRIS API endpoint."""
-    result = _get(path, params=params)
-    return result.get("data", result)
-
-
 def invalidate_cache(api_key, case_id, entity=None):
     """Remove cached data for a case entity (or all entities for that case)."""
     key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:12]
+    backend = cache.get_backend()
     if entity:
-        _cache.pop(f"{key_hash}:{case_id}:{entity}", None)
+        backend.delete(f"{key_hash}:{case_id}:{entity}")
+        entity_store.drop_stores(f"{key_hash}:{case_id}:{entity}")
     else:
         prefix = f"{key_hash}:{case_id}:"
-        for k in list(_cache.keys()):
-            if k.startswith(prefix):
-                del _cache[k]
+        backend.delete_prefix(prefix)
+        entity_store.drop_stores(prefix)
 
 
 def invalidate_user_cache(api_key):
     """Remove all cached data for a user's API key (called on logout)."""
     key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:12]
     prefix = f"{key_hash}:"
-    for k in list(_cache.keys()):
-        if k.startswith(prefix):
-            del _cache[k]
+    cache.get_backend().delete_prefix(prefix)
+    entity_store.drop_stores(prefix)
+
+
+# ── Incremental refresh (conditional requests / delta sync) ─────
+
+# Paginated v2 entities that can be delta-synced: (id field, last-update field).
+# Refreshes ask IRIS for rows newest-update-first and stop at the cached watermark.
+_DELTA_FIELDS = {
+    "assets": ("asset_id", "date_update"),
+    "tasks": ("task_id", "task_last_update"),
+}
+# Entities whose IRIS endpoint ignored the update ordering (per worker)
+_delta_unsupported = set()
+
+
+def _get_conditional(path, params, previous):
+    """GET revalidating with the validators of the previous response.
+
+    Returns (result, validators); result is None when IRIS answered 304.
+    """
+    sync = (previous or {}).get("sync") or {}
+    headers = {}
+    if sync.get("etag"):
+        headers["If-None-Match"] = sync["etag"]
+    if sync.get("last_modified"):
+        headers["If-Modified-Since"] = sync["last_modified"]
+    resp = iris_http.get(path, _api_key(), params=params, headers=headers)
+    if resp.status_code == 304 and previous is not None:
+        return None, sync
+    resp.raise_for_status()
+    validators = {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+    }
+    return resp.json(), validators
+
+
+def _fetch_single(path, params, previous, parse):
+    """Fetch a single-request endpoint; a 304 keeps the cached data as is."""
+    result, validators = _get_conditional(path, params, previous)
+    if result is None:
+        return previous["data"], validators
+    return parse(result.get("data", result)), validators
+
+
+def _watermark(rows, update_field):
+    """Latest update stamp of rows, or None if any row lacks one."""
+    stamps = [row.get(update_field) if isinstance(row, dict) else None for row in rows]
+    if not stamps or None in stamps:
+        return None
+    try:
+        return max(stamps)
+    except TypeError:
+        return None
+
+
+def _delta_rows(path, entity, previous):
+    """Merge rows updated since the cached watermark into the cached list.
+
+    Returns (rows, sync), or None when a full fetch is needed: no usable
+    watermark, IRIS ignored the ordering, rows were deleted, or the last
+    full fetch is older than CACHE_TTL (bounding anything a delta missed).
+    """
+    id_field, update_field = _DELTA_FIELDS[entity]
+    rows = previous["data"]
+    sync = previous.get("sync") or {}
+    watermark = sync.get("watermark")
+    if (not watermark or not isinstance(rows, list) or entity in _delta_unsupported
+            or time.time() - sync.get("full_at", 0) >= current_app.config["CACHE_TTL"]):
+        return None
+
+    per_page = current_app.config["IRIS_PAGE_SIZE"]
+    changed = []
+    page = seen = 0
+    while True:
+        page += 1
+        result = _get(path, params={"page": page, "per_page": per_page,
+                                    "order_by": update_field, "sort_dir": "desc"})
+        items = result.get("data", [])
+        total = result.get("total")
+        if not isinstance(items, list) or total is None or total > _MAX_PAGINATED_ITEMS:
+            return None
+        stamps = [item.get(update_field) if isinstance(item, dict) else None for item in items]
+        if None in stamps or stamps != sorted(stamps, reverse=True):
+            log.info("IRIS does not order %s by %s; using full refreshes", entity, update_field)
+            _delta_unsupported.add(entity)
+            return None
+        fresh = [item for item, stamp in zip(items, stamps) if stamp >= watermark]
+        changed.extend(fresh)
+        seen += len(items)
+        if len(fresh) < len(items) or not items or seen >= total:
+            break
+        if len(changed) * 2 > len(rows):
+            return None  # most rows changed — a full (parallel) fetch is cheaper
+
+    positions = {row.get(id_field): i for i, row in enumerate(rows)}
+    merged = rows
+    for item in changed:
+        pos = positions.get(item.get(id_field))
+        if pos is not None and rows[pos] == item:
+            continue
+        if merged is rows:
+            merged = list(rows)
+        if pos is None:
+            positions[item.get(id_field)] = len(merged)
+            merged.append(item)
+        else:
+            merged[pos] = item
+
+    if len(merged) != total:
+        return None  # rows were deleted upstream
+    if changed:
+        watermark = max(watermark, changed[0][update_field])
+    return merged, {"watermark": watermark, "full_at": sync["full_at"]}
+
+
+def _fetch_paginated_entity(path, entity, previous):
+    if (previous is not None and entity in _DELTA_FIELDS
+            and current_app.config["IRIS_DELTA_SYNC"]):
+        delta = _delta_rows(path, entity, previous)
+        if delta is not None:
+            return delta
+    rows = _collect_paginated(path)
+    sync = None
+    if entity in _DELTA_FIELDS and isinstance(rows, list):
+        watermark = _watermark(rows, _DELTA_FIELDS[entity][1])
+        if watermark:
+            sync = {"watermark": watermark, "full_at": time.time()}
+    return rows, sync
+
+
+def _fetch_entity(case_id, entity, previous):
+    """Fetch one entity type from IRIS; returns (data, sync)."""
+    if entity == "case":
+        return _fetch_single(f"/api/v2/cases/{case_id}", None, previous, lambda data: data)
+    if entity == "events":
+        return _fetch_single("/case/timeline/events/list", {"cid": case_id}, previous,
+                             _timeline_rows)
+    if entity == "notes":
+        return _fetch_single("/case/notes/directories/filter", {"cid": case_id}, previous,
+                             _normalize_notes)
+    return _fetch_paginated_entity(f"/api/v2/cases/{case_id}/{entity}", entity, previous)
 
 
 def _get_entity_cached(case_id, entity, bust_cache=False):
     """Fetch and cache a single entity type for a case."""
-    api_key = get_api_key()
-    ck = _cache_key(api_key, case_id, entity)
-
-    if not bust_cache:
-        cached = _get_cached(ck)
-        if cached is not None:
-            return cached
-
-    fetchers = {
-        "case": lambda: _get_case_summary(case_id),
-        "assets": lambda: _collect_paginated(f"/api/v2/cases/{case_id}/assets"),
-        "iocs": lambda: _collect_paginated(f"/api/v2/cases/{case_id}/iocs"),
-        "events": lambda: _get_events(case_id),
-        "tasks": lambda: _collect_paginated(f"/api/v2/cases/{case_id}/tasks"),
-        "notes": lambda: _get_notes(case_id),
-        "evidences": lambda: _collect_paginated(f"/api/v2/cases/{case_id}/evidences"),
-    }
+    ck = _cache_key(_api_key(), case_id, entity)
+    return _cached_fetch(ck, lambda previous: _fetch_entity(case_id, entity, previous),
+                         bust_cache=bust_cache)
 
-    data = fetchers[entity]()
-    _set_cached(ck, data)
-    return data
 
-
-def _get_case_summary(case_id):
-    result = _get(f"/api/v2/cases/{case_id}")
-    return result.get("data", result)
-
-
-def _get_events(case_id):
-    data = _get_legacy("/case/timeline/events/list", params={"cid": case_id})
+def _timeline_rows(data):
     return data.get("timeline", []) if isinstance(data, dict) else data
 
 
-def _get_notes(case_id):
-    data = _get_legacy("/case/notes/directories/filter", params={"cid": case_id})
+def _normalize_notes(data):
     if not isinstance(data, list):
         return []
     notes = []
@@ -180,26 +421,60 @@ def get_entity(case_id, entity, bust_cache=False):
     return _get_entity_cached(case_id, entity, bust_cache=bust_cache)
 
 
+def get_entity_store(case_id, entity, bust_cache=False):
+    """Fetch a single entity type wrapped in an indexed EntityStore."""
+    rows = _get_entity_cached(case_id, entity, bust_cache=bust_cache)
+    return entity_store.get_store(_cache_key(_api_key(), case_id, entity), rows)
+
+
+def get_entities(case_id, entities):
+    """Fetch several entity types for a case concurrently (cached).
+
+    Returns (data, errors) dicts keyed by entity; see fanout.run_parallel.
+    """
+    tasks = {entity: bind(lambda entity=entity: get_entity(case_id, entity))
+             for entity in entities}
+    return fanout.run_parallel(tasks, max_workers=len(tasks),
+                               timeout=current_app.config["FANOUT_TIMEOUT"])
+
+
+def get_entity_counts(case_id, entities):
+    """Row counts per entity type (from the cached entities).
+
+    Returns (counts, errors) dicts keyed by entity; see fanout.run_parallel.
+    """
+    data, errors = get_entities(case_id, entities)
+    return {entity: len(rows) if isinstance(rows, list) else 0
+            for entity, rows in data.items()}, errors
+
+
+def get_entity_state(case_id, entity, bust_cache=False):
+    """Value that changes whenever the entity does (live update fingerprints)."""
+    return get_entity(case_id, entity, bust_cache=bust_cache)
+
+
+def get_indicator_rows(case_id, entity, bust_cache=False):
+    """Rows of ``iocs``/``assets`` for correlation (the cached entity)."""
+    return get_entity(case_id, entity, bust_cache=bust_cache)
+
+
 def get_case_data(case_id):
-    """Fetch all case entities via IRIS REST API."""
-    return {
-        "case": get_case_summary(case_id),
-        "assets": get_entity(case_id, "assets"),
-        "iocs": get_entity(case_id, "iocs"),
-        "events": get_entity(case_id, "events"),
-        "tasks": get_entity(case_id, "tasks"),
-        "notes": get_entity(case_id, "notes"),
-        "evidences": get_entity(case_id, "evidences"),
-    }
+    """Fetch all case entities via IRIS REST API (concurrently)."""
+    names = ("case", "assets", "iocs", "events", "tasks", "notes", "evidences")
+    data, errors = get_entities(case_id, names)
+    for name in names:
+        if name in errors:
+            raise errors[name]
+    return {name: data[name] for name in names}
 
 
 def get_cases_list(bust_cache=False):
-    api_key = get_api_key()
-    ck = _cache_key(api_key, "cases_list")
-    if not bust_cache:
-        cached = _get_cached(ck)
-        if cached is not None:
-            return cached
-    data = _collect_paginated("/api/v2/cases")
-    _set_cached(ck, data)
-    return data
+    ck = _cache_key(_api_key(), "cases_list")
+    return _cached_fetch(ck, lambda previous: (_collect_paginated("/api/v2/cases"), None),
+                         bust_cache=bust_cache)
+
+
+def get_cases_store(bust_cache=False):
+    """Fetch the cases list wrapped in an indexed EntityStore."""
+    rows = get_cases_list(bust_cache=bust_cache)
+    return entity_store.get_store(_cache_key(_api_key(), "cases_list"), rows)
@@ -1,204 +1,537 @@
-import psycopg2
-import psycopg2.extras
-import psycopg2.pool
-from flask import current_app, g
+import itertools
+import time
+
+from flask import current_app
+
+from . import cache, db_pool, entity_store, fanout, metrics
+
+# Concurrent fan-out queries each hold their own pooled connection
+_FANOUT_WORKERS = 3
+
+# Rows per round trip of server-side (named) cursors
+_ITERSIZE = 500
+_cursor_ids = itertools.count()
+
+
+def _connect_kwargs():
+    config = current_app.config
+    return dict(
+        maxconn=config["DB_POOL_SIZE"],
+        host=config["DB_HOST"],
+        port=config["DB_PORT"],
+        dbname=config["DB_NAME"],
+        user=config["DB_USER"],
+        password=config["DB_PASSWORD"],
+        sslmode=config.get("DB_SSL_MODE", "prefer"),
+    )
 
 
 def _get_pool():
-    """Get or create a connection pool (stored on the app)."""
-    if not hasattr(current_app, "_iris_db_pool") or current_app._iris_db_pool is None or current_app._iris_db_pool.closed:
-        current_app._iris_db_pool = psycopg2.pool.SimpleConnectionPool(
-            minconn=1,
-            maxconn=5,
-            host=current_app.config["DB_HOST"],
-            port=current_app.config["DB_PORT"],
-            dbname=current_app.config["DB_NAME"],
-            user=current_app.config["DB_USER"],
-            password=current_app.config["DB_PASSWORD"],
-            sslmode=current_app.config.get("DB_SSL_MODE", "prefer"),
-        )
-    return current_app._iris_db_pool
+    """The worker's iris connection pool (see db_pool)."""
+    return db_pool.get_pool("iris", _connect_kwargs)
 
 
 def _get_conn():
     """Get a pooled connection, returned automatically at end of request."""
-    if "iris_db_conn" not in g:
-        g.iris_db_conn = _get_pool().getconn()
-    return g.iris_db_conn
+    return db_pool.request_conn("iris", _connect_kwargs)
 
 
 def _return_conn(response):
-    """Return connection to pool after request."""
-    conn = g.pop("iris_db_conn", None)
-    if conn is not None:
-        _get_pool().putconn(conn)
+    """Return this context's connection to the pool early (threads, CLI)."""
+    db_pool.return_request_conn("iris")
     return response
 
 
 def init_app(app):
     """Register teardown to return connections."""
-    app.after_request(_return_conn)
+    db_pool.init_app(app)
+
 
+def _columns(cur):
+    return [col.name for col in cur.description]
 
-def _query(sql, params=None):
-    """Execute a query and return all rows as dicts."""
+
+def _iter_query(conn, sql, params=None, size=_ITERSIZE):
+    """Yield lists of row dicts read through a named (server-side) cursor.
+
+    The server hands out ``size`` rows per round trip, so neither libpq nor
+    the worker ever buffers the whole result; plain tuple rows are mapped
+    to dicts once, without an intermediate RealDictRow copy.
+    """
+    with conn.cursor(name=f"iris_stream_{next(_cursor_ids)}") as cur:
+        cur.itersize = size
+        cur.execute(sql, params)
+        columns = None
+        while True:
+            rows = cur.fetchmany(size)
+            if not rows:
+                break
+            if columns is None:
+                columns = _columns(cur)
+            yield [dict(zip(columns, row)) for row in rows]
+
+
+def _query(sql, params=None, stream=False):
+    """Execute a query and return all rows as dicts.
+
+    ``stream`` reads through a server-side cursor (for results with large
+    text columns); otherwise one plain client-side fetch.
+    """
     conn = _get_conn()
-    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+    if stream:
+        return [row for rows in _iter_query(conn, sql, params) for row in rows]
+    with conn.cursor() as cur:
         cur.execute(sql, params)
-        return [dict(row) for row in cur.fetchall()]
+        columns = _columns(cur)
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
 
 
 def _query_one(sql, params=None):
     """Execute a query and return a single row as dict."""
     conn = _get_conn()
-    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+    with conn.cursor() as cur:
         cur.execute(sql, params)
         row = cur.fetchone()
-        return dict(row) if row else None
+        return dict(zip(_columns(cur), row)) if row else None
+
+
+# ── Read-through cache ──────────────────────────────────────────
+#
+# Results are cached like the API backend's (CACHE_TTL, CACHE_BACKEND)
+# under ``db:`` keys shared by all users. Each case entity has a cached
+# *version*: a change probe returning its row count plus the newest update
+# stamp, or a digest of the rows where the table keeps no stamp. A refresh
+# re-runs only the probe (an automatic one at most once per
+# CACHE_MIN_REFRESH). Rows and indicator columns are cached with the version
+# they were read at and re-read once it differs (or their CACHE_TTL ran
+# out). Table draws are not cached: each is one page and one count in SQL.
+
+# Order-independent digest of a row expression: no sort, nothing leaves the server
+_DIGEST = "sum(('x' || left(md5(({})::text), 15))::bit(60)::bigint)"
+
+
+def _set_cached(key, data, version=None):
+    entry = {"data": data, "fetched": time.time(), "version": version}
+    cache.get_backend().set(key, entry, current_app.config["CACHE_TTL"])
+
+
+def _cached_probe(key, probe, bust_cache=False):
+    """Cached result of ``probe()``.
+
+    ``bust_cache=True`` re-runs the probe now, ``"auto"`` only once the
+    cached result is CACHE_MIN_REFRESH old (as for iris_api._cached_fetch).
+    """
+    backend = cache.get_backend()
+    entry = backend.get(key)
+    if entry is not None and (
+            not bust_cache
+            or (bust_cache == "auto"
+                and time.time() - entry["fetched"] < current_app.config["CACHE_MIN_REFRESH"])):
+        return entry["data"]
+
+    def load():
+        # A previous leader may have filled the cache while we were queued
+        if not bust_cache:
+            cached = backend.get(key)
+            if cached is not None:
+                return cached["data"]
+        metrics.inc("db_cache_loads_total", {"kind": "version", "result": "probe"})
+        data = probe()
+        _set_cached(key, data)
+        return data
+
+    return fanout.single_flight(key, load)
+
+
+def _versioned(key, kind, version, read):
+    """Cached result of ``read()``, valid while the entity is at ``version``."""
+    backend = cache.get_backend()
+    entry = backend.get(key)
+    if entry is not None and entry["version"] == version:
+        return entry["data"]
+
+    def load():
+        cached = backend.get(key)
+        if cached is not None and cached["version"] == version:
+            return cached["data"]
+        metrics.inc("db_cache_loads_total",
+                    {"kind": kind, "result": "miss" if cached is None else "changed"})
+        data = read()
+        _set_cached(key, data, version)
+        return data
+
+    return fanout.single_flight(f"{key}@{version}", load)
+
+
+def _fingerprint(sql, params=None):
+    """The probe row of ``sql`` as a list (comparable after a cache round trip)."""
+    conn = _get_conn()
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        return [None if v is None else str(v) for v in cur.fetchone()]
+
+
+def cache_key(*parts):
+    """Data cache key for DB-mode data (shared by all users, dropped by invalidate_cache)."""
+    return "db:" + ":".join(str(p) for p in parts)
+
+
+def invalidate_cache(case_id=None, entity=None):
+    """Remove cached data for a case entity, a whole case, or (no case) everything."""
+    prefix = "db:" if case_id is None else f"db:{case_id}:{entity or ''}"
+    cache.get_backend().delete_prefix(prefix)
+    entity_store.drop_stores(prefix)
+
+
+_CASE_SQL = """
+    SELECT c.case_id, c.name AS case_name, c.description,
+           c.open_date, c.close_date, c.soc_id,
+           c.status_id, c.severity_id,
+           c.classification_id, c.owner_id,
+           c.custom_attributes
+    FROM cases c
+    WHERE c.case_id = %s
+"""
+
+
+def get_case_summary(case_id, bust_cache=False):
+    return get_entity(case_id, "case", bust_cache)
+
+
+# Per-entity list queries (one %s: the case ID) and their default order
+_ENTITY_SQL = {
+    "assets": """
+    SELECT ca.asset_id, ca.asset_name, ca.asset_description,
+           ca.asset_ip, ca.asset_domain, ca.asset_compromise_status_id,
+           ca.asset_type_id, ca.analysis_status_id,
+           ca.date_added, ca.date_update,
+           ca.custom_attributes
+    FROM case_assets ca
+    WHERE ca.case_id = %s
+    """,
+    "iocs": """
+    SELECT i.ioc_id, i.ioc_value, i.ioc_description,
+           i.ioc_type_id, i.ioc_tlp_id,
+           i.ioc_tags, i.custom_attributes,
+           il.ioc_link_id
+    FROM ioc i
+    JOIN ioc_link il ON i.ioc_id = il.ioc_id
+    WHERE il.case_id = %s
+    """,
+    "events": """
+    SELECT ce.event_id, ce.event_title, ce.event_content,
+           ce.event_raw, ce.event_source, ce.event_date,
+           ce.event_tz, ce.event_in_summary,
+           ce.event_in_graph, ce.event_color,
+           ce.event_tags, ce.custom_attributes,
+           ce.modification_history
+    FROM cases_events ce
+    WHERE ce.case_id = %s
+    """,
+    "tasks": """
+    SELECT ct.id AS task_id, ct.task_title, ct.task_description,
+           ct.task_status_id, ct.task_tags,
+           ct.task_open_date, ct.task_close_date,
+           ct.custom_attributes
+    FROM case_tasks ct
+    WHERE ct.case_id = %s
+    """,
+    "notes": """
+    SELECT n.note_id, n.note_title, n.note_content,
+           n.note_creationdate, n.note_lastupdate,
+           n.custom_attributes
+    FROM notes n
+    JOIN notes_group ng ON n.note_group_id = ng.group_id
+    WHERE ng.group_case_id = %s
+    """,
+    "evidences": """
+    SELECT crf.id AS evidence_id, crf.filename,
+           crf.file_description, crf.file_hash,
+           crf.file_size, crf.date_added,
+           crf.custom_attributes
+    FROM case_received_file crf
+    WHERE crf.case_id = %s
+    """,
+}
+
+# Output column names, so they also apply to the query wrapped as a subquery
+_ENTITY_ORDER = {
+    "assets": "date_added DESC",
+    "iocs": "ioc_id DESC",
+    "events": "event_date DESC",
+    "tasks": "task_open_date DESC",
+    "notes": "note_lastupdate DESC",
+    "evidences": "date_added DESC",
+}
+
+
+# Change probe expression per entity (over output columns): the newest
+# update stamp where IRIS keeps one, else a digest of what edits touch
+_ENTITY_CHANGE = {
+    "assets": "max(date_update)::text",
+    "notes": "max(note_lastupdate)::text",
+    "events": _DIGEST.format("event_id, event_date, modification_history"),
+}
+
+# Entities read through a server-side cursor (large text columns)
+_STREAMED = {"events", "notes"}
+
+
+def _entity_sql(entity):
+    return f"{_ENTITY_SQL[entity]} ORDER BY {_ENTITY_ORDER[entity]}"
+
+
+def _read_entity(case_id, entity):
+    return _query(_entity_sql(entity), (case_id,), stream=entity in _STREAMED)
+
+
+def entity_version(case_id, entity, bust_cache=False):
+    """[row count, change stamp] of a case entity (cached, see the probe notes above)."""
+    if entity == "case":
+        return _cached_probe(
+            cache_key(case_id, "case", "version"),
+            lambda: _fingerprint(f"SELECT {_DIGEST.format('c')} FROM cases c WHERE c.case_id = %s",
+                                 (case_id,)),
+            bust_cache,
+        )
+    change = _ENTITY_CHANGE.get(entity, _DIGEST.format("r"))
+    return _cached_probe(
+        cache_key(case_id, entity, "version"),
+        lambda: _fingerprint(f"SELECT count(*), {change} FROM ({_ENTITY_SQL[entity]}) AS r",
+                             (case_id,)),
+        bust_cache,
+    )
 
 
-def get_case_summary(case_id):
-    return _query_one(
-        """
-        SELECT c.case_id, c.name AS case_name, c.description,
-               c.open_date, c.close_date, c.soc_id,
-               c.status_id, c.severity_id,
-               c.classification_id, c.owner_id,
-               c.custom_attributes
-        FROM cases c
-        WHERE c.case_id = %s
-        """,
-        (case_id,),
+def get_entity(case_id, entity, bust_cache=False):
+    """Fetch a single entity type for a case.
+
+    Cached while its version holds; entities with more than
+    DB_CACHE_MAX_ROWS rows are read on every call and not cached.
+    """
+    version = entity_version(case_id, entity, bust_cache)
+    if entity == "case":
+        return _versioned(cache_key(case_id, "case"), "case", version,
+                          lambda: _query_one(_CASE_SQL, (case_id,)))
+    if int(version[0]) > current_app.config["DB_CACHE_MAX_ROWS"]:
+        return _read_entity(case_id, entity)
+    return _versioned(cache_key(case_id, entity), "rows", version,
+                      lambda: _read_entity(case_id, entity))
+
+
+def get_entity_counts(case_id, entities):
+    """Row counts per entity type, from the cached version probes."""
+    tasks = {entity: bind(lambda entity=entity: int(entity_version(case_id, entity)[0]))
+             for entity in entities}
+    return fanout.run_parallel(tasks, max_workers=_FANOUT_WORKERS,
+                               timeout=current_app.config["FANOUT_TIMEOUT"])
+
+
+def get_entity_state(case_id, entity, bust_cache=False):
+    """Value that changes whenever the entity does (live update fingerprints)."""
+    return entity_version(case_id, entity, bust_cache)
+
+
+# Columns correlation needs, read instead of the whole entity
+_INDICATOR_COLUMNS = {
+    "iocs": ("ioc_value", "ioc_type_id"),
+    "assets": ("asset_ip", "asset_domain"),
+}
+
+
+def get_indicator_rows(case_id, entity, bust_cache=False):
+    """Rows of ``iocs``/``assets`` with just the columns correlation reads."""
+    version = entity_version(case_id, entity, bust_cache)
+    columns = ", ".join(f'"{c}"' for c in _INDICATOR_COLUMNS[entity])
+    return _versioned(
+        cache_key(case_id, entity, "indicators"), "indicators", version,
+        lambda: _query(f"SELECT {columns} FROM ({_ENTITY_SQL[entity]}) AS r", (case_id,)),
     )
 
 
-def get_case_assets(case_id):
-    return _query(
-        """
-        SELECT ca.asset_id, ca.asset_name, ca.asset_description,
-               ca.asset_ip, ca.asset_domain, ca.asset_compromise_status_id,
-               ca.asset_type_id, ca.analysis_status_id,
-               ca.date_added, ca.date_update,
-               ca.custom_attributes
-        FROM case_assets ca
-        WHERE ca.case_id = %s
-        ORDER BY ca.date_added DESC
-        """,
-        (case_id,),
-    )
+# ── SQL pushdown (DataTables search / filter / sort / paging) ───
+#
+# Entity queries are wrapped as ``SELECT ... FROM (<entity SQL>) AS r`` so
+# conditions and ordering apply to their output columns. Only columns the
+# entity query actually returns are accepted (probed once per entity).
 
+_entity_columns = {}
 
-def get_case_iocs(case_id):
-    return _query(
-        """
-        SELECT i.ioc_id, i.ioc_value, i.ioc_description,
-               i.ioc_type_id, i.ioc_tlp_id,
-               i.ioc_tags, i.custom_attributes,
-               il.ioc_link_id
-        FROM ioc i
-        JOIN ioc_link il ON i.ioc_id = il.ioc_id
-        WHERE il.case_id = %s
-        ORDER BY i.ioc_id DESC
-        """,
-        (case_id,),
-    )
 
+def _columns_of_entity(cur, entity):
+    columns = _entity_columns.get(entity)
+    if columns is None:
+        cur.execute(f"SELECT * FROM ({_ENTITY_SQL[entity]}) AS r LIMIT 0", (0,))
+        columns = _entity_columns[entity] = tuple(_columns(cur))
+    return columns
 
-def get_case_events(case_id):
-    return _query(
-        """
-        SELECT ce.event_id, ce.event_title, ce.event_content,
-               ce.event_raw, ce.event_source, ce.event_date,
-               ce.event_tz, ce.event_in_summary,
-               ce.event_in_graph, ce.event_color,
-               ce.event_tags, ce.custom_attributes,
-               ce.modification_history
-        FROM cases_events ce
-        WHERE ce.case_id = %s
-        ORDER BY ce.event_date DESC
-        """,
-        (case_id,),
-    )
 
+def _like(term):
+    """ILIKE pattern matching ``term`` as a literal substring."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
 
-def get_case_tasks(case_id):
-    return _query(
-        """
-        SELECT ct.id AS task_id, ct.task_title, ct.task_description,
-               ct.task_status_id, ct.task_tags,
-               ct.task_open_date, ct.task_close_date,
-               ct.custom_attributes
-        FROM case_tasks ct
-        WHERE ct.case_id = %s
-        ORDER BY ct.task_open_date DESC
-        """,
-        (case_id,),
-    )
 
+def _entity_where(columns, search, column_filters):
+    """WHERE clause and params matching the EntityStore search semantics."""
+    conditions = []
+    params = []
+    if search:
+        # Substring of any one cell: the separator (like the in-memory store's)
+        # never occurs in a search value, so matches do not span cells
+        cells = ", ".join(f'"{c}"::text' for c in columns)
+        conditions.append(f"concat_ws(E'\\x01', {cells}) ILIKE %s")
+        params.append(_like(search))
+    for column, value in (column_filters or {}).items():
+        if value and column in columns:
+            conditions.append(f'"{column}"::text ILIKE %s')
+            params.append(_like(value))
+    return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
 
-def get_case_notes(case_id):
-    return _query(
-        """
-        SELECT n.note_id, n.note_title, n.note_content,
-               n.note_creationdate, n.note_lastupdate,
-               n.custom_attributes
-        FROM notes n
-        JOIN notes_group ng ON n.note_group_id = ng.group_id
-        WHERE ng.group_case_id = %s
-        ORDER BY n.note_lastupdate DESC
-        """,
-        (case_id,),
-    )
 
+def _entity_order(entity, columns, order_column, order_dir):
+    if order_column not in columns:
+        return _ENTITY_ORDER[entity]
+    direction = "DESC" if order_dir == "desc" else "ASC"
+    # The entity's ID column breaks ties, so pages do not overlap
+    return f'"{order_column}" {direction} NULLS LAST, "{columns[0]}" {direction}'
 
-def get_case_evidences(case_id):
-    return _query(
-        """
-        SELECT crf.id AS evidence_id, crf.filename,
-               crf.file_description, crf.file_hash,
-               crf.file_size, crf.date_added,
-               crf.custom_attributes
-        FROM case_received_file crf
-        WHERE crf.case_id = %s
-        ORDER BY crf.date_added DESC
-        """,
-        (case_id,),
-    )
 
+def _entity_page(case_id, entity, columns, where, params, order_column, order_dir,
+                 start, length):
+    conn = _get_conn()
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""SELECT * FROM ({_ENTITY_SQL[entity]}) AS r {where}
+            ORDER BY {_entity_order(entity, columns, order_column, order_dir)}
+            LIMIT %s OFFSET %s""",
+            [case_id] + params + [length, start],
+        )
+        names = _columns(cur)
+        return [dict(zip(names, row)) for row in cur.fetchall()]
 
-def get_entity(case_id, entity, bust_cache=False):
-    """Fetch a single entity type for a case."""
-    fetchers = {
-        "case": get_case_summary,
-        "assets": get_case_assets,
-        "iocs": get_case_iocs,
-        "events": get_case_events,
-        "tasks": get_case_tasks,
-        "notes": get_case_notes,
-        "evidences": get_case_evidences,
-    }
-    return fetchers[entity](case_id)
 
+def query_entity(case_id, entity, search="", column_filters=None, order_column=None,
+                 order_dir="asc", start=0, length=25):
+    """One DataTables draw in SQL, same contract as EntityStore.query.
 
-def get_case_data(case_id):
-    """Fetch all case entities via direct PostgreSQL queries."""
-    summary = get_case_summary(case_id)
-    if not summary:
+    Returns (records_total, records_filtered, page_rows); only the page
+    leaves the database. Both counts come from one statement, so they
+    always agree with each other.
+    """
+    conn = _get_conn()
+    with conn.cursor() as cur:
+        columns = _columns_of_entity(cur, entity)
+        where, params = _entity_where(columns, search, column_filters)
+        filtered = f"COUNT(*) FILTER ({where})" if where else "COUNT(*)"
+        cur.execute(f"SELECT COUNT(*), {filtered} FROM ({_ENTITY_SQL[entity]}) AS r",
+                    params + [case_id])
+        total, filtered = cur.fetchone()
+    return total, filtered, _entity_page(case_id, entity, columns, where, params,
+                                         order_column, order_dir, start, length)
+
+
+def iter_entity(case_id, entity, search="", column_filters=None, order_column=None,
+                order_dir="asc"):
+    """All matching rows of a case entity as a generator of row batches, for exports.
+
+    Rows are read through a server-side cursor on a dedicated pooled
+    connection, taken when the first batch is requested and held until the
+    generator is closed (the response body outlives the request context).
+    """
+    pool = _get_pool()
+    sql = _ENTITY_SQL[entity]
+
+    def batches():
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                columns = _columns_of_entity(cur, entity)
+            where, params = _entity_where(columns, search, column_filters)
+            order = _entity_order(entity, columns, order_column, order_dir)
+            yield from _iter_query(conn, f"SELECT * FROM ({sql}) AS r {where} ORDER BY {order}",
+                                   [case_id] + params)
+        finally:
+            # Rolls back the cursor's transaction; a broken connection is discarded
+            pool.putconn(conn)
+
+    return batches()
+
+
+def get_entity_store(case_id, entity, bust_cache=False):
+    """Fetch a single entity type wrapped in an indexed EntityStore."""
+    rows = get_entity(case_id, entity, bust_cache=bust_cache)
+    return entity_store.get_store(f"db:{case_id}:{entity}", rows)
+
+
+def bind(fn):
+    """Wrap fn to run in another thread with its own app context and connection."""
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                return fn()
+            finally:
+                _return_conn(None)
+
+    return metrics.carry(run)
+
+
+def get_entities(case_id, entities):
+    """Fetch several entity types for a case concurrently.
+
+    Returns (data, errors) dicts keyed by entity; see fanout.run_parallel.
+    """
+    tasks = {entity: bind(lambda entity=entity: get_entity(case_id, entity))
+             for entity in entities}
+    return fanout.run_parallel(tasks, max_workers=_FANOUT_WORKERS,
+                               timeout=current_app.config["FANOUT_TIMEOUT"])
+
+
+_CASE_DATA = ("case", "assets", "iocs", "events", "tasks", "notes", "evidences")
+
+
+def _load_case_data(case_id, names):
+    data, errors = get_entities(case_id, names)
+    if "case" not in errors and not data["case"]:
         raise ValueError(f"Case {case_id} not found")
-    return {
-        "case": summary,
-        "assets": get_case_assets(case_id),
-        "iocs": get_case_iocs(case_id),
-        "events": get_case_events(case_id),
-        "tasks": get_case_tasks(case_id),
-        "notes": get_case_notes(case_id),
-        "evidences": get_case_evidences(case_id),
-    }
+    for name in names:
+        if name in errors:
+            raise errors[name]
+    return {name: data[name] for name in names}
+
+
+def get_case_data(case_id):
+    """Fetch all case entities via direct PostgreSQL queries (concurrently)."""
+    return _load_case_data(case_id, _CASE_DATA)
+
+
+def iter_case_data(case_id):
+    """get_case_data for streaming it out: entity rows as generators of row batches.
+
+    Entities over DB_CACHE_MAX_ROWS (not cached, read on every call) are
+    read through iter_entity when their batches are requested instead of
+    into one list; the others are loaded concurrently before this returns,
+    so a missing case or a failing query raises here.
+    """
+    counts, _errors = get_entity_counts(case_id, _CASE_DATA[1:])
+    limit = current_app.config["DB_CACHE_MAX_ROWS"]
+    streamed = [name for name in _CASE_DATA[1:] if counts.get(name, 0) > limit]
+    data = _load_case_data(case_id, [name for name in _CASE_DATA if name not in streamed])
+    for name in _CASE_DATA[1:]:
+        data[name] = iter_entity(case_id, name) if name in streamed else iter([data[name]])
+    return data
 
 
 def get_cases_list(bust_cache=False):
     """Fetch list of all cases."""
-    return _query(
+    version = _cached_probe(
+        cache_key("cases_list", "version"),
+        lambda: _fingerprint(f"SELECT count(*), {_DIGEST.format('c')} FROM cases c"),
+        bust_cache,
+    )
+    return _versioned(cache_key("cases_list"), "cases", version, lambda: _query(
         """
         SELECT c.case_id, c.name AS case_name, c.description,
                c.open_date, c.close_date, c.soc_id,
@@ -206,4 +539,9 @@ def get_cases_list(bust_cache=False):
         FROM cases c
         ORDER BY c.case_id DESC
         """
-    )
+    ))
+
+
+def get_cases_store(bust_cache=False):
+    """Fetch the cases list wrapped in an indexed EntityStore."""
+    return entity_store.get_store("db:cases_list", get_cases_list(bust_cache=bust_cache))
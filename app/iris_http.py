@@ -0,0 +1,137 @@
+"""Pooled HTTP session for all traffic to IRIS.
+
+One requests.Session per gunicorn worker keeps TCP/TLS connections alive
+across requests, negotiates compressed responses and retries 429/5xx
+answers and connection errors with exponential backoff (honouring
+Retry-After); read timeouts are not retried.
+"""
+
+import http.cookiejar
+import logging
+import os
+import threading
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+_counters = {"requests": 0, "retries": 0, "errors": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+class _CountingRetry(Retry):
+    """Retry policy that records every retry attempt in the pool metrics."""
+
+    def increment(self, *args, **kwargs):
+        _count("retries")
+        return super().increment(*args, **kwargs)
+
+
+def _accept_encoding():
+    encodings = ["gzip", "deflate"]
+    # urllib3 only decodes brotli when one of these packages is installed
+    for module in ("brotli", "brotlicffi"):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        encodings.insert(0, "br")
+        break
+    return ", ".join(encodings)
+
+
+def _create_session(config):
+    retry = _CountingRetry(
+        total=config["IRIS_HTTP_RETRIES"],
+        # A read timeout already cost IRIS_HTTP_TIMEOUT: fail instead of
+        # waiting that long again on every retry
+        read=0,
+        backoff_factor=config["IRIS_HTTP_BACKOFF"],
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=config["IRIS_HTTP_POOL_SIZE"],
+        max_retries=retry,
+        pool_block=False,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = _accept_encoding()
+    # The session is shared by every user of this worker: never let a cookie
+    # set by IRIS for one API key ride along on another user's request.
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def get_session():
+    """The per-worker IRIS session (recreated after a fork)."""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                _session = _create_session(current_app.config)
+                _session_pid = os.getpid()
+    return _session
+
+
+def get(path, api_key, params=None, timeout=None, headers=None):
+    """Authenticated GET against IRIS through the pooled session."""
+    config = current_app.config
+    _count("requests")
+    try:
+        with metrics.timed("iris_request_duration_seconds", metrics.iris_labels(path, params),
+                           timing="iris"):
+            return get_session().get(
+                f"{config['IRIS_URL']}{path}",
+                headers={**(headers or {}), "Authorization": f"Bearer {api_key}"},
+                verify=config["IRIS_VERIFY_SSL"],
+                timeout=timeout or config["IRIS_HTTP_TIMEOUT"],
+                params=params,
+            )
+    except requests.RequestException:
+        _count("errors")
+        raise
+
+
+def pool_stats():
+    """Request/retry counters and per-host connection pool usage of this worker."""
+    with _counters_lock:
+        stats = dict(_counters)
+    pools = []
+    session = _session
+    if session is not None and _session_pid == os.getpid():
+        manager = session.get_adapter("https://").poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            # Unopened slots sit in the queue as None placeholders
+            queue = list(pool.pool.queue) if pool.pool is not None else []
+            pools.append({
+                "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle": sum(1 for conn in queue if conn is not None),
+                "max_size": pool.pool.maxsize if pool.pool is not None else 0,
+            })
+    stats["pools"] = pools
+    return stats
@@ -0,0 +1,138 @@
+"""Server-sent change notifications for open explorer and cases-list pages.
+
+One watcher thread per watched topic (a case, or the cases list, per API
+key) refreshes the data through the data source on the refresh interval,
+fingerprints each entity and pushes "entity changed" events to every
+subscribed browser. Upstream load is one refresh per watched topic instead
+of one per open tab and entity table. Every open stream holds a worker
+thread, so a worker serves at most LIVE_MAX_STREAMS of them at a time.
+"""
+
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+
+from flask import current_app
+
+from .auth import get_api_key
+
+log = logging.getLogger(__name__)
+
+_KEEPALIVE_SECONDS = 15
+_MIN_POLL_SECONDS = 5
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def _fingerprint(data):
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class _Watcher:
+    """Polls one topic while it has subscribers and fans out change events."""
+
+    def __init__(self, topic, check, interval):
+        self.topic = topic
+        self.check = check            # bound callable -> {entity: data}
+        self.interval = interval
+        self.subscribers = set()
+        self._seen = {}               # entity -> (data object, fingerprint)
+        self._thread = threading.Thread(target=self._run, name=f"live-{topic}", daemon=True)
+
+    def _poll(self):
+        changed = []
+        for entity, data in self.check().items():
+            seen = self._seen.get(entity)
+            if seen is not None and seen[0] is data:
+                continue
+            fingerprint = _fingerprint(data)
+            if seen is not None and seen[1] != fingerprint:
+                changed.append(entity)
+            self._seen[entity] = (data, fingerprint)
+        return changed
+
+    def _run(self):
+        while True:
+            with _watchers_lock:
+                if not self.subscribers:
+                    _watchers.pop(self.topic, None)
+                    return
+                subscribers = list(self.subscribers)
+            try:
+                changed = self._poll()
+            except Exception:
+                log.warning("Live update check failed for %s", self.topic)
+                changed = []
+            for entity in changed:
+                event = {"entity": entity, "at": int(time.time())}
+                for q in subscribers:
+                    q.put(event)
+            time.sleep(self.interval)
+
+
+def _topic(*parts):
+    key_hash = hashlib.sha256(get_api_key().encode()).hexdigest()[:12]
+    return f"{key_hash}:{':'.join(str(p) for p in parts)}"
+
+
+class StreamLimitReached(Exception):
+    """This worker already serves LIVE_MAX_STREAMS streams."""
+
+
+def subscribe(topic_parts, make_check):
+    """Register a subscriber queue for a topic, starting its watcher if needed.
+
+    ``make_check`` is only called when a new watcher is created; it must
+    return a callable usable from the watcher thread. Raises
+    StreamLimitReached when the worker has no stream slot left.
+    """
+    topic = _topic(*topic_parts)
+    q = queue.Queue()
+    interval = max(_MIN_POLL_SECONDS, current_app.config["REFRESH_INTERVAL"])
+    max_streams = current_app.config["LIVE_MAX_STREAMS"]
+    with _watchers_lock:
+        if sum(len(w.subscribers) for w in _watchers.values()) >= max_streams:
+            raise StreamLimitReached()
+        watcher = _watchers.get(topic)
+        start = watcher is None
+        if start:
+            watcher = _watchers[topic] = _Watcher(topic, make_check(), interval)
+        watcher.subscribers.add(q)
+    if start:
+        watcher._thread.start()
+    return topic, q
+
+
+def unsubscribe(topic, q):
+    with _watchers_lock:
+        watcher = _watchers.get(topic)
+        if watcher is not None:
+            watcher.subscribers.discard(q)
+
+
+def stream(topic, q, max_seconds):
+    """Generator of SSE frames for one subscriber; ends after ``max_seconds``."""
+    deadline = time.time() + max_seconds
+    try:
+        yield "retry: 5000\n\n"
+        while time.time() < deadline:
+            try:
+                event = q.get(timeout=_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: changed\ndata: {json.dumps(event)}\n\n"
+    finally:
+        unsubscribe(topic, q)
+
+
+def stats():
+    """Watched topics and subscriber counts of this worker."""
+    with _watchers_lock:
+        return {"topics": len(_watchers),
+                "subscribers": sum(len(w.subscribers) for w in _watchers.values())}
@@ -0,0 +1,322 @@
+"""In-process performance metrics: Prometheus text on /metrics, Server-Timing headers.
+
+Request latency per endpoint, IRIS calls per entity, pool checkout waits
+and SQL time per query shape are recorded as histograms; cache and HTTP
+pool counters are read from their owners at scrape time. Everything is
+per worker process (scrape each worker, or sum in Prometheus). Recording
+costs a perf_counter() pair and a lock per observation, so it stays on.
+"""
+
+import contextvars
+import hmac
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2.extensions
+from flask import Response, current_app, g, request
+
+# Seconds; tuned for web requests, upstream calls and SQL alike
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Distinct SQL shapes kept per worker; further shapes are recorded as "other"
+_MAX_SQL_SHAPES = 200
+_SQL_SHAPE_LENGTH = 120
+
+_HELP = {
+    "http_request_duration_seconds": "Time to response headers per endpoint",
+    "iris_request_duration_seconds": "IRIS API calls per entity and page",
+    "db_pool_wait_seconds": "Time waiting for a pooled database connection",
+    "db_query_duration_seconds": "SQL execution time per query shape",
+    "db_prepared_statements_total": "Parameterized SQL executions by prepared-statement outcome",
+    "db_cache_loads_total": "DB-mode cache loads: change probes and reads by kind and cause",
+}
+
+_histograms = {}          # (name, labels tuple) -> [bucket counts..., count, sum]
+_counters = {}            # (name, labels tuple) -> value
+_lock = threading.Lock()
+_sql_shapes = set()
+
+# Server-Timing accumulator of the current request, carried into worker threads
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class _Timings:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}  # name -> [seconds, calls]
+
+    def add(self, name, seconds):
+        with self.lock:
+            entry = self.totals.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+
+def observe(name, labels, seconds, timing=None):
+    """Record one duration in histogram ``name``; ``timing`` also adds it to Server-Timing."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * (len(_BUCKETS) + 2)
+        for i, bound in enumerate(_BUCKETS):
+            if seconds <= bound:
+                series[i] += 1
+                break
+        series[-2] += 1
+        series[-1] += seconds
+    if timing:
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.add(timing, seconds)
+
+
+def inc(name, labels, amount=1):
+    """Add ``amount`` to counter ``name``."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def timed(name, labels, timing=None):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, labels, time.perf_counter() - started, timing)
+
+
+def carry(fn):
+    """Wrap fn (about to run on another thread) to add to this request's Server-Timing."""
+    timings = _request_timings.get()
+    if timings is None:
+        return fn
+
+    def run(*args, **kwargs):
+        token = _request_timings.set(timings)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _request_timings.reset(token)
+
+    return run
+
+
+# ── SQL instrumentation ─────────────────────────────────────────
+
+def sql_shape(sql):
+    """Whitespace-collapsed, truncated SQL text; bounded number of distinct shapes."""
+    shape = " ".join(str(sql).split())[:_SQL_SHAPE_LENGTH]
+    if shape in _sql_shapes:
+        return shape
+    with _lock:
+        if len(_sql_shapes) >= _MAX_SQL_SHAPES:
+            return "other"
+        _sql_shapes.add(shape)
+    return shape
+
+
+_timed_cursors = {}
+
+
+def _timed_cursor_class(base):
+    cls = _timed_cursors.get(base)
+    if cls is None:
+        def execute(self, query, vars=None):
+            started = time.perf_counter()
+            try:
+                return base.execute(self, query, vars)
+            finally:
+                observe("db_query_duration_seconds",
+                        {"db": self.connection.metrics_db, "query": sql_shape(query)},
+                        time.perf_counter() - started, timing="sql")
+
+        cls = _timed_cursors[base] = type(f"Timed{base.__name__}", (base,), {"execute": execute})
+    return cls
+
+
+def connection_factory(db):
+    """psycopg2 connection class whose cursors record SQL timings under ``db``."""
+
+    class TimedConnection(psycopg2.extensions.connection):
+        metrics_db = db
+
+        def cursor(self, *args, **kwargs):
+            base = kwargs.get("cursor_factory") or self.cursor_factory or psycopg2.extensions.cursor
+            kwargs["cursor_factory"] = _timed_cursor_class(base)
+            return super().cursor(*args, **kwargs)
+
+    return TimedConnection
+
+
+# ── IRIS calls ──────────────────────────────────────────────────
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def iris_labels(path, params):
+    """Low-cardinality labels for an IRIS API call: entity path and first/later page."""
+    page = (params or {}).get("page")
+    return {
+        "path": _ID_SEGMENT.sub("/{id}", path),
+        "page": "none" if page is None else ("first" if str(page) == "1" else "next"),
+    }
+
+
+# ── Flask wiring ────────────────────────────────────────────────
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_token = _request_timings.set(_Timings())
+
+
+def _after_request(response):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or "unmatched"
+    observe("http_request_duration_seconds",
+            {"endpoint": endpoint, "method": request.method,
+             "status": str(response.status_code)}, elapsed)
+
+    timings = _request_timings.get()
+    if timings is not None and current_app.config["METRICS_SERVER_TIMING"]:
+        with timings.lock:
+            parts = [f'{name};dur={total * 1000:.1f};desc="{calls} call{"s" if calls != 1 else ""}"'
+                     for name, (total, calls) in sorted(timings.totals.items())]
+        parts.append(f"app;dur={elapsed * 1000:.1f}")
+        response.headers["Server-Timing"] = ", ".join(parts)
+    return response
+
+
+def _teardown_request(exc):
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        _request_timings.reset(token)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+
+
+def _histogram_lines(lines):
+    with _lock:
+        series = sorted((key, list(values)) for key, values in _histograms.items())
+    seen = set()
+    for (name, labels), values in series:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(_BUCKETS, values):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{_labels(labels + (("le", bound),))}}} {cumulative}')
+        lines.append(f'{name}_bucket{{{_labels(labels + (("le", "+Inf"),))}}} {values[-2]}')
+        lines.append(f"{name}_count{{{_labels(labels)}}} {values[-2]}")
+        lines.append(f"{name}_sum{{{_labels(labels)}}} {values[-1]:.6f}")
+
+
+def _recorded_counter_lines(lines):
+    with _lock:
+        series = sorted(_counters.items())
+    seen = set()
+    for (name, labels), value in series:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{{{_labels(labels)}}} {value}")
+
+
+def _counter_lines(lines, name, kind, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{{{_labels(labels)}}} {value}" if labels else f"{name} {value}")
+
+
+def render():
+    """All metrics of this worker in the Prometheus text exposition format."""
+    from . import cache, db_pool, entity_store, iris_http, live
+
+    lines = []
+    _histogram_lines(lines)
+    _recorded_counter_lines(lines)
+
+    stats = cache.get_backend().stats()
+    backend = (("backend", stats["backend"]),)
+    for field in ("hits", "misses", "evictions"):
+        _counter_lines(lines, f"cache_{field}_total", "counter", f"Data cache {field}",
+                       [(backend, stats[field])])
+    if "entries" in stats:
+        _counter_lines(lines, "cache_entries", "gauge", "Data cache entries",
+                       [(backend, stats["entries"])])
+
+    pools = db_pool.stats()
+    for field, kind, help_text in (
+            ("in_use", "gauge", "Pooled DB connections checked out"),
+            ("idle", "gauge", "Pooled DB connections idle"),
+            ("max", "gauge", "Pooled DB connection limit"),
+            ("waiting", "gauge", "Threads waiting for a pooled DB connection"),
+            ("timeouts", "counter", "DB connection checkouts that timed out"),
+            ("recycled", "counter", "DB connections replaced for age"),
+            ("ping_failures", "counter", "Dead DB connections found by the pre-ping")):
+        name = f"db_pool_{field}_total" if kind == "counter" else f"db_pool_{field}"
+        _counter_lines(lines, name, kind, help_text,
+                       [((("db", pool["db"]),), pool[field]) for pool in pools])
+
+    http = iris_http.pool_stats()
+    for field in ("requests", "retries", "errors"):
+        _counter_lines(lines, f"iris_http_{field}_total", "counter", f"IRIS HTTP {field}",
+                       [((), http[field])])
+    for field, kind, help_text in (
+            ("connections_opened", "counter", "IRIS connections opened"),
+            ("idle", "gauge", "IRIS keep-alive connections idle"),
+            ("max_size", "gauge", "IRIS keep-alive connection limit")):
+        name = f"iris_http_pool_{field}_total" if kind == "counter" else f"iris_http_pool_{field}"
+        _counter_lines(lines, name, kind, help_text,
+                       [((("host", pool["host"]),), pool[field]) for pool in http["pools"]])
+
+    stores = entity_store.stats()
+    _counter_lines(lines, "entity_store_count", "gauge", "Indexed DataTables stores",
+                   [((), stores["stores"])])
+    _counter_lines(lines, "entity_store_bytes", "gauge",
+                   "Estimated memory of the indexed DataTables stores", [((), stores["bytes"])])
+
+    watched = live.stats()
+    _counter_lines(lines, "live_topics", "gauge", "Watched live-update topics",
+                   [((), watched["topics"])])
+    _counter_lines(lines, "live_subscribers", "gauge", "Open live-update streams",
+                   [((), watched["subscribers"])])
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view():
+    token = current_app.config["METRICS_TOKEN"]
+    if not token:
+        # Endpoint names and SQL shapes are not for anonymous callers
+        return Response("Not Found\n", status=404, mimetype="text/plain")
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    # Bytes: compare_digest refuses non-ASCII str, and headers may carry any latin-1
+    if not hmac.compare_digest(supplied.encode("utf-8", "surrogateescape"), token.encode()):
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    return Response(render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    """Record request metrics and serve /metrics (when METRICS_ENABLED; needs METRICS_TOKEN)."""
+    if not app.config["METRICS_ENABLED"]:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    from . import limiter
+    app.add_url_rule("/metrics", "metrics", limiter.exempt(metrics_view))
@@ -1,15 +1,16 @@
+import functools
 import re
 from urllib.parse import urlparse
 
 from requests.exceptions import HTTPError
 
 from flask import (
-    Blueprint, render_template, jsonify, request,
-    current_app, session, redirect, url_for,
+    Blueprint, Response, render_template, jsonify, request,
+    current_app, session, redirect, url_for, stream_with_context,
 )
 
 from .auth import require_auth, validate_key_against_iris, get_api_key
-from . import limiter, oauth
+from . import correlation, export, limiter, live, oauth
 
 import hashlib
 import logging
@@ -183,7 +184,8 @@ def logout_get():
 def index():
     return render_template("cases.html",
                            iris_url=current_app.config["IRIS_EXTERNAL_URL"],
-                           refresh_interval=current_app.config["REFRESH_INTERVAL"])
+                           refresh_interval=current_app.config["REFRESH_INTERVAL"],
+                           live_updates=current_app.config["LIVE_UPDATES"])
 
 
 @bp.route("/case/<int:case_id>")
@@ -202,7 +204,8 @@ def case_explorer(case_id):
         return render_template("error.html", error="Internal error"), 500
     return render_template("explorer.html", case_id=case_id, case=case_info,
                            iris_url=current_app.config["IRIS_EXTERNAL_URL"],
-                           refresh_interval=current_app.config["REFRESH_INTERVAL"])
+                           refresh_interval=current_app.config["REFRESH_INTERVAL"],
+                           live_updates=current_app.config["LIVE_UPDATES"])
 
 
 # ── DataTables server-side AJAX endpoints ────────────────────────
@@ -210,70 +213,56 @@ def case_explorer(case_id):
 ENTITIES = ("assets", "iocs", "events", "tasks", "notes", "evidences")
 
 
+def _refresh_arg():
+    """``bust_cache`` for the ``refresh`` parameter.
+
+    ``refresh=1`` (refresh buttons) refetches now; ``refresh=auto`` (the
+    auto-refresh timer) is throttled and, with stale-while-revalidate,
+    served from the cache while it refetches in the background.
+    """
+    return {"1": True, "auto": "auto"}.get(request.args.get("refresh"), False)
+
+
 @bp.route("/api/dt/cases")
 def datatable_cases():
     """Server-side DataTables endpoint for the cases list."""
     ds = _get_data_source()
-    bust = request.args.get("refresh") == "1"
+    bust = _refresh_arg()
     try:
-        all_data = ds.get_cases_list(bust_cache=bust)
+        store = ds.get_cases_store(bust_cache=bust)
     except Exception:
         log.error("Failed to fetch cases list")
         return jsonify({"error": "Failed to load cases"}), 500
 
-    if not isinstance(all_data, list):
-        all_data = []
-
-    draw = request.args.get("draw", 1, type=int)
-    start = max(0, request.args.get("start", 0, type=int))
-    length = min(max(1, request.args.get("length", 25, type=int)), 500)
-    search_value = request.args.get("search[value]", "").strip().lower()
-
-    records_total = len(all_data)
-
-    if search_value:
-        filtered = []
-        for row in all_data:
-            for v in row.values():
-                if v is not None and search_value in str(v).lower():
-                    filtered.append(row)
-                    break
-        all_data = filtered
-
-    all_data = _apply_column_filters(all_data, request.args)
-    records_filtered = len(all_data)
-
-    order_col_idx = request.args.get("order[0][column]", None, type=int)
-    order_dir = request.args.get("order[0][dir]", "asc")
-    if order_col_idx is not None:
-        col_name = request.args.get(f"columns[{order_col_idx}][data]", "")
-        if col_name and all_data:
-            all_data.sort(key=lambda r: _sort_key(r.get(col_name)), reverse=(order_dir == "desc"))
-
-    page_data = all_data[start:start + length]
-
-    return jsonify({
-        "draw": draw,
-        "recordsTotal": records_total,
-        "recordsFiltered": records_filtered,
-        "data": page_data,
-    })
+    result = _datatable_draw(store.query, request.args)
+    if current_app.config.get("SS_ENABLED"):
+        # Hit counts from the last batch correlation (None: not correlated yet)
+        hits = correlation.case_hits(ds)["cases"]
+        result["data"] = [dict(row, ss_hits=hits.get(str(row.get("case_id"))))
+                          for row in result["data"]]
+    return jsonify(result)
 
 
 @bp.route("/api/dt/case/<int:case_id>/<entity>")
 def datatable_entity(case_id, entity):
     """Server-side DataTables endpoint.
 
-    Fetches all data from IRIS (cached), then filters/sorts/paginates
-    in Python and returns DataTables-compatible JSON.
+    Fetches all data from IRIS (cached) into an indexed EntityStore, then
+    filters/sorts/paginates against it and returns DataTables-compatible JSON.
+    DB mode draws in SQL instead (iris_db.query_entity).
     """
     if entity not in ENTITIES:
         return jsonify({"error": "Invalid entity"}), 400
 
     ds = _get_data_source()
-    bust = request.args.get("refresh") == "1"
+    bust = _refresh_arg()
     try:
-        all_data = ds.get_entity(case_id, entity, bust_cache=bust)
+        if current_app.config["DATA_SOURCE"] == "db":
+            # SQL pushdown: only the requested page leaves the database
+            return jsonify(_datatable_draw(
+                functools.partial(ds.query_entity, case_id, entity),
+                request.args))
+        store = ds.get_entity_store(case_id, entity, bust_cache=bust)
     except HTTPError as e:
         code = e.response.status_code if e.response is not None else 500
         log.warning("IRIS API error for case %s entity %s: HTTP %s", case_id, entity, code)
@@ -282,60 +271,45 @@ def datatable_entity(case_id, entity):
         log.error("Unexpected error for case %s entity %s", case_id, entity)
         return jsonify({"error": "Internal error"}), 500
 
-    if not isinstance(all_data, list):
-        all_data = []
+    return jsonify(_datatable_draw(store.query, request.args))
 
-    draw = request.args.get("draw", 1, type=int)
-    start = max(0, request.args.get("start", 0, type=int))
-    length = min(max(1, request.args.get("length", 25, type=int)), 500)
-    search_value = request.args.get("search[value]", "").strip().lower()
 
-    records_total = len(all_data)
+def _store_query_args(args):
+    """EntityStore.query search/column filter/sort arguments from DataTables params."""
+    order_col = None
+    order_col_idx = args.get("order[0][column]", None, type=int)
+    if order_col_idx is not None:
+        # Get column name from columns[N][data] parameter
+        order_col = args.get(f"columns[{order_col_idx}][data]", "") or None
 
-    # Filter — global search
-    if search_value:
-        filtered = []
-        for row in all_data:
-            for v in row.values():
-                if v is not None and search_value in str(v).lower():
-                    filtered.append(row)
-                    break
-        all_data = filtered
+    return {
+        "search": args.get("search[value]", "").strip().lower(),
+        "column_filters": _extract_column_filters(args),
+        "order_column": order_col,
+        "order_dir": args.get("order[0][dir]", "asc"),
+    }
 
-    # Filter — per-column search
-    all_data = _apply_column_filters(all_data, request.args)
-    records_filtered = len(all_data)
 
-    # Sort
-    order_col_idx = request.args.get("order[0][column]", None, type=int)
-    order_dir = request.args.get("order[0][dir]", "asc")
+def _datatable_draw(query, args):
+    """Apply DataTables search/column filters/sort/paging params to ``query``.
 
-    if order_col_idx is not None:
-        # Get column name from columns[N][data] parameter
-        col_name = request.args.get(f"columns[{order_col_idx}][data]", "")
-        if col_name and all_data:
-            reverse = order_dir == "desc"
-            all_data.sort(
-                key=lambda r: _sort_key(r.get(col_name)),
-                reverse=reverse,
-            )
+    ``query`` has the EntityStore.query signature (an EntityStore's, or
+    iris_db.query_entity for SQL pushdown).
+    """
+    draw = args.get("draw", 1, type=int)
+    start = max(0, args.get("start", 0, type=int))
+    length = min(max(1, args.get("length", 25, type=int)), 500)
 
-    # Paginate
-    page_data = all_data[start:start + length]
+    records_total, records_filtered, page_data = query(
+        **_store_query_args(args), start=start, length=length,
+    )
 
-    return jsonify({
+    return {
         "draw": draw,
         "recordsTotal": records_total,
         "recordsFiltered": records_filtered,
         "data": page_data,
-    })
-
-
-def _sort_key(val):
-    """Generate a sort key that handles None and mixed types."""
-    if val is None:
-        return ""
-    return str(val).lower()
+    }
 
 
 def _extract_column_filters(args):
@@ -353,22 +327,52 @@ def _extract_column_filters(args):
     return filters
 
 
-def _apply_column_filters(data, args):
-    """Apply per-column search filters from DataTables columns[N][search][value] params."""
-    col_idx = 0
-    while True:
-        col_data = args.get(f"columns[{col_idx}][data]")
-        if col_data is None:
-            break
-        search_val = args.get(f"columns[{col_idx}][search][value]", "").strip().lower()
-        if search_val:
-            data = [
-                row for row in data
-                if row.get(col_data) is not None
-                and search_val in str(row[col_data]).lower()
-            ]
-        col_idx += 1
-    return data
+# ── Streaming exports ────────────────────────────────────────────
+#
+# Same search/filter/sort params as the DataTables endpoints (the export
+# buttons send the table's last request), plus ``format`` (csv, ndjson).
+
+_EXPORT_BATCH = 1000
+
+
+def _export_format():
+    fmt = request.args.get("format", "csv")
+    return fmt if fmt in export.FORMATS else None
+
+
+@bp.route("/api/export/case/<int:case_id>/<entity>")
+def export_entity(case_id, entity):
+    """Download every row of a case entity matching the table's search, filters and sort."""
+    if entity not in ENTITIES:
+        return jsonify({"error": "Invalid entity"}), 400
+    fmt = _export_format()
+    if fmt is None:
+        return jsonify({"error": "Invalid format"}), 400
+
+    ds = _get_data_source()
+    query_args = _store_query_args(request.args)
+    if current_app.config["DATA_SOURCE"] == "db":
+        # Filtered and sorted in SQL, streamed from a server-side cursor
+        try:
+            return export.response(ds.iter_entity(case_id, entity, **query_args), fmt,
+                                   f"case-{case_id}-{entity}", None)
+        except Exception:
+            log.error("Database error exporting case %s entity %s", case_id, entity)
+            return jsonify({"error": "Failed to load entity data"}), 500
+
+    try:
+        store = ds.get_entity_store(case_id, entity)
+    except HTTPError as e:
+        code = e.response.status_code if e.response is not None else 500
+        log.warning("IRIS API error exporting case %s entity %s: HTTP %s", case_id, entity, code)
+        return jsonify({"error": "Failed to load entity data"}), code
+    except Exception:
+        log.error("Unexpected error exporting case %s entity %s", case_id, entity)
+        return jsonify({"error": "Internal error"}), 500
+
+    _, _, rows = store.query(**query_args, start=0, length=len(store))
+    batches = (rows[i:i + _EXPORT_BATCH] for i in range(0, len(rows), _EXPORT_BATCH))
+    return export.response(batches, fmt, f"case-{case_id}-{entity}", export.columns_of(rows))
 
 
 # ── Entity counts (for upfront badge loading) ────────────────────
@@ -377,14 +381,9 @@ def _apply_column_filters(data, args):
 def case_entity_counts(case_id):
     """Return record counts for all entity types — used to populate tab badges on page load."""
     ds = _get_data_source()
-    counts = {}
-    for entity in ENTITIES:
-        try:
-            data = ds.get_entity(case_id, entity)
-            counts[entity] = len(data) if isinstance(data, list) else 0
-        except Exception:
-            counts[entity] = 0
-    return jsonify(counts)
+    # Counted concurrently under FANOUT_TIMEOUT; failed or late entities count as 0
+    counts, _errors = ds.get_entity_counts(case_id, ENTITIES)
+    return jsonify({entity: counts.get(entity, 0) for entity in ENTITIES})
 
 
 # ── IRIS Lookup API (#4 — resolve IDs to human labels) ───────────
@@ -473,17 +472,99 @@ def case_neighbors(case_id):
     return jsonify({"prev": prev_id, "next": next_id})
 
 
+# ── Live updates (server-sent events) ────────────────────────────
+
+def _event_stream(topic_parts, make_check):
+    if not current_app.config["LIVE_UPDATES"]:
+        return jsonify({"error": "Live updates are not enabled"}), 404
+    try:
+        topic, q = live.subscribe(topic_parts, make_check)
+    except live.StreamLimitReached:
+        # The page falls back to polling (EventSource does not retry a 503)
+        log.warning("Live update stream refused: LIVE_MAX_STREAMS reached")
+        return jsonify({"error": "Too many live update streams"}), 503
+    response = Response(
+        live.stream(topic, q, current_app.config["LIVE_STREAM_MAX_SECONDS"]),
+        mimetype="text/event-stream",
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop nginx and similar proxies from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@bp.route("/api/stream/case/<int:case_id>")
+@limiter.exempt
+def stream_case(case_id):
+    """Push an event whenever one of the case's entity tables changes."""
+    ds = _get_data_source()
+
+    def make_check():
+        return ds.bind(lambda: {
+            entity: ds.get_entity_state(case_id, entity, bust_cache="auto") for entity in ENTITIES
+        })
+
+    return _event_stream(("case", case_id), make_check)
+
+
+@bp.route("/api/stream/cases")
+@limiter.exempt
+def stream_cases():
+    """Push an event whenever the cases list changes."""
+    ds = _get_data_source()
+
+    def make_check():
+        return ds.bind(lambda: {"cases": ds.get_cases_list(bust_cache="auto")})
+
+    return _event_stream(("cases",), make_check)
+
+
 # ── JSON API (full dump, kept for programmatic access) ───────────
 
+def _case_dump_chunks(case_id, data):
+    """The case_api document, entity rows (batches) written as they are read."""
+    dumps = current_app.json.dumps
+    try:
+        yield '{"data": {'
+        for i, name in enumerate(sorted(data)):
+            yield (", " if i else "") + dumps(name) + ": "
+            if name == "case":
+                yield dumps(data[name])
+                continue
+            separator = "["
+            for rows in data[name]:
+                if rows:
+                    yield separator + ", ".join(dumps(row) for row in rows)
+                    separator = ", "
+            yield "[]" if separator == "[" else "]"
+        yield '}, "status": "success"}'
+    except Exception:
+        # Abort the transfer: the client sees a failed download, not short JSON
+        log.exception("Case %s dump failed after the response started", case_id)
+        raise
+    finally:
+        for value in data.values():
+            close = getattr(value, "close", None)
+            if close is not None:
+                close()
+
+
 @bp.route("/api/case/<int:case_id>")
 def case_api(case_id):
     ds = _get_data_source()
     try:
+        if current_app.config["DATA_SOURCE"] == "db":
+            # Entities too large for the cache stream from a server-side cursor
+            return Response(stream_with_context(_case_dump_chunks(case_id, ds.iter_case_data(case_id))),
+                            mimetype="application/json")
         data = ds.get_case_data(case_id)
     except HTTPError as e:
         code = e.response.status_code if e.response is not None else 500
         log.warning("IRIS API error for case %s full data: HTTP %s", case_id, code)
         return jsonify({"status": "error", "message": "Failed to load case data"}), code
+    except TimeoutError:
+        log.warning("Timed out loading case %s full data", case_id)
+        return jsonify({"status": "error", "message": "Timed out loading case data"}), 504
     except Exception:
         log.error("Unexpected error loading case %s data", case_id)
         return jsonify({"status": "error", "message": "Internal error"}), 500
@@ -507,7 +588,7 @@ def shadowserver():
 
 @bp.route("/api/dt/shadowserver")
 def datatable_shadowserver():
-    """True server-side DataTables endpoint — SQL LIMIT/OFFSET pagination."""
+    """True server-side DataTables endpoint — SQL keyset or LIMIT/OFFSET pagination."""
     if not current_app.config.get("SS_ENABLED"):
         return jsonify({"error": "Shadowserver not enabled"}), 404
 
@@ -522,6 +603,10 @@ def datatable_shadowserver():
     date_to = request.args.get("date_to", "").strip() or None
     order_column = request.args.get("order_column", "report_date")
     order_dir = request.args.get("order_dir", "desc")
+    # Opaque keyset cursor from the previous response (next/prev page)
+    cursor = request.args.get("cursor") or None
+    # Count exactly instead of per SS_COUNT_MODE (the UI's "exact count" link)
+    exact_count = request.args.get("exact_count") == "1"
 
     column_filters = _extract_column_filters(request.args)
 
@@ -531,7 +616,7 @@ def datatable_shadowserver():
             search_value=search_value, report_type=report_type,
             date_from=date_from, date_to=date_to,
             order_column=order_column, order_dir=order_dir,
-            column_filters=column_filters,
+            column_filters=column_filters, cursor=cursor, exact_count=exact_count,
         ))
     except Exception:
         log.error("Shadowserver query_events error")
@@ -547,42 +632,7 @@ def datatable_case_shadowserver(case_id):
     from . import shadowserver_db as ss_db
 
     # 1. Get case IOCs and assets to extract indicators
-    ds = _get_data_source()
-    bust = request.args.get("refresh") == "1"
-
-    ips = set()
-    hostnames = set()
-    asns = set()
-
-    try:
-        iocs = ds.get_entity(case_id, "iocs", bust_cache=bust)
-        for ioc in (iocs or []):
-            val = ioc.get("ioc_value") or ""
-            ioc_type = str(ioc.get("ioc_type_id", ioc.get("ioc_type", "")))
-            # IP types (exact ID depends on IRIS config, also try by value pattern)
-            if _looks_like_ip(val):
-                ips.add(val.strip())
-            elif _looks_like_domain(val):
-                hostnames.add(val.strip().lower())
-            elif ioc_type in ("asn",) or val.startswith("AS"):
-                try:
-                    asns.add(int(val.replace("AS", "").strip()))
-                except (ValueError, TypeError):
-                    pass
-    except Exception:
-        pass
-
-    try:
-        assets = ds.get_entity(case_id, "assets", bust_cache=bust)
-        for asset in (assets or []):
-            ip = asset.get("asset_ip") or ""
-            if ip.strip():
-                ips.add(ip.strip())
-            domain = asset.get("asset_domain") or ""
-            if domain.strip():
-                hostnames.add(domain.strip().lower())
-    except Exception:
-        pass
+    indicators = _case_indicators(case_id, bust=_refresh_arg())
 
     # 2. Query Shadowserver events matching these indicators
     draw = request.args.get("draw", 1, type=int)
@@ -591,22 +641,26 @@ def datatable_case_shadowserver(case_id):
     search_value = request.args.get("search[value]", "").strip()
     order_column = request.args.get("order_column", "report_date")
     order_dir = request.args.get("order_dir", "desc")
+    cursor = request.args.get("cursor") or None
+    # Count exactly instead of per SS_COUNT_MODE (the UI's "exact count" link)
+    exact_count = request.args.get("exact_count") == "1"
 
     column_filters = _extract_column_filters(request.args)
 
     try:
         result = ss_db.query_events_by_indicators(
             draw=draw, start=start, length=length,
-            ips=list(ips), hostnames=list(hostnames), asns=list(asns),
+            **indicators,
             search_value=search_value,
             order_column=order_column, order_dir=order_dir,
-            column_filters=column_filters,
+            column_filters=column_filters, cursor=cursor, exact_count=exact_count,
         )
         # #17: Add indicator count feedback
         result["indicators"] = {
-            "ips": len(ips),
-            "hostnames": len(hostnames),
-            "asns": len(asns),
+            "ips": len(indicators["ips"]),
+            "networks": len(indicators["networks"]),
+            "hostnames": len(indicators["hostnames"]),
+            "asns": len(indicators["asns"]) + len(indicators["asn_ranges"]),
         }
         return jsonify(result)
     except Exception:
@@ -614,30 +668,97 @@ def datatable_case_shadowserver(case_id):
         return jsonify({"error": "Failed to query Shadowserver data"}), 500
 
 
-def _looks_like_ip(val):
-    """Quick check if a string looks like an IPv4 or IPv6 address."""
-    if not val or not val.strip():
-        return False
-    val = val.strip()
-    # IPv4
-    parts = val.split(".")
-    if len(parts) == 4:
-        try:
-            return all(0 <= int(p) <= 255 for p in parts)
-        except ValueError:
-            return False
-    # IPv6 (contains colons)
-    return ":" in val and all(c in "0123456789abcdefABCDEF:" for c in val)
+def _case_indicators(case_id, bust=False):
+    """Indicators of a case's IOCs and assets (see correlation.case_indicators)."""
+    ds = _get_data_source()
+    iocs = assets = None
+    try:
+        iocs = ds.get_indicator_rows(case_id, "iocs", bust_cache=bust)
+    except Exception:
+        pass
+    try:
+        assets = ds.get_indicator_rows(case_id, "assets", bust_cache=bust)
+    except Exception:
+        pass
+    return correlation.case_indicators(iocs, assets)
 
 
-def _looks_like_domain(val):
-    """Quick check if a string looks like a domain name."""
-    if not val or not val.strip():
-        return False
-    val = val.strip().lower()
-    return "." in val and not _looks_like_ip(val) and all(
-        c.isalnum() or c in ".-_" for c in val
-    )
+@bp.route("/api/export/shadowserver")
+def export_shadowserver():
+    """Download every Shadowserver event matching the page's filters, in table order."""
+    if not current_app.config.get("SS_ENABLED"):
+        return jsonify({"error": "Shadowserver not enabled"}), 404
+    fmt = _export_format()
+    if fmt is None:
+        return jsonify({"error": "Invalid format"}), 400
+
+    from . import shadowserver_db as ss_db
+
+    try:
+        batches = ss_db.export_events(
+            search_value=request.args.get("search[value]", "").strip(),
+            report_type=request.args.get("report_type", "").strip() or None,
+            date_from=request.args.get("date_from", "").strip() or None,
+            date_to=request.args.get("date_to", "").strip() or None,
+            order_column=request.args.get("order_column", "report_date"),
+            order_dir=request.args.get("order_dir", "desc"),
+            column_filters=_extract_column_filters(request.args),
+        )
+        return export.response(batches, fmt, "shadowserver-events", ss_db.EXPORT_COLUMNS)
+    except Exception:
+        log.error("Shadowserver export error")
+        return jsonify({"error": "Failed to query Shadowserver data"}), 500
+
+
+@bp.route("/api/export/case/<int:case_id>/shadowserver")
+def export_case_shadowserver(case_id):
+    """Download every Shadowserver event correlated with a case, in table order."""
+    if not current_app.config.get("SS_ENABLED"):
+        return jsonify({"error": "Shadowserver not enabled"}), 404
+    fmt = _export_format()
+    if fmt is None:
+        return jsonify({"error": "Invalid format"}), 400
+
+    from . import shadowserver_db as ss_db
+
+    try:
+        batches = ss_db.export_events(
+            search_value=request.args.get("search[value]", "").strip(),
+            order_column=request.args.get("order_column", "report_date"),
+            order_dir=request.args.get("order_dir", "desc"),
+            column_filters=_extract_column_filters(request.args),
+            indicators=_case_indicators(case_id),
+        )
+        return export.response(batches, fmt, f"case-{case_id}-shadowserver",
+                               ss_db.EXPORT_COLUMNS)
+    except Exception:
+        log.error("Shadowserver export error for case %s", case_id)
+        return jsonify({"error": "Failed to query Shadowserver data"}), 500
+
+
+@bp.route("/api/shadowserver/correlate", methods=["GET", "POST"])
+def shadowserver_correlate():
+    """Batch-correlate all open cases (POST starts a run in the background)."""
+    if not current_app.config.get("SS_ENABLED"):
+        return jsonify({"error": "Shadowserver not enabled"}), 404
+
+    if request.method == "POST":
+        # JSON-only POST: a cross-site form cannot send it without a CORS preflight
+        if not request.is_json:
+            return jsonify({"error": "Expected application/json"}), 415
+        try:
+            started = correlation.start_batch(_get_data_source())
+        except correlation.BatchUnavailable as e:
+            return jsonify({"error": str(e)}), 409
+        return jsonify({"started": started, "running": True}), 202
+
+    hits = correlation.case_hits(_get_data_source())
+    return jsonify({
+        "running": correlation.batch_running(),
+        "updated_at": hits["updated_at"],
+        "cases": len(hits["cases"]),
+        "with_hits": sum(1 for h in hits["cases"].values() if h["hits"]),
+    })
 
 
 @bp.route("/api/shadowserver/stats")
@@ -653,6 +774,8 @@ def shadowserver_stats():
         for key in ("earliest_date", "latest_date"):
             if stats.get(key):
                 stats[key] = str(stats[key])
+        if stats.get("rollup_refreshed_at"):
+            stats["rollup_refreshed_at"] = stats["rollup_refreshed_at"].isoformat()
         for run in stats.get("recent_runs", []):
             for k in ("run_started", "run_finished"):
                 if run.get(k):
@@ -675,3 +798,19 @@ def shadowserver_report_types():
     except Exception:
         log.error("Shadowserver report-types error")
         return jsonify({"error": "Failed to load report types"}), 500
+
+
+@bp.route("/api/shadowserver/trend")
+def shadowserver_trend():
+    """Events per day (total and per busiest report types) for the dashboard chart."""
+    if not current_app.config.get("SS_ENABLED"):
+        return jsonify({"error": "Shadowserver not enabled"}), 404
+
+    from . import shadowserver_db as ss_db
+
+    days = min(max(1, request.args.get("days", 30, type=int)), 365)
+    try:
+        return jsonify(ss_db.get_trend(days))
+    except Exception:
+        log.error("Shadowserver trend error")
+        return jsonify({"error": "Failed to load trend"}), 500
@@ -1,60 +1,78 @@
 """Read-only Shadowserver PostgreSQL queries with true server-side pagination."""
 
+import base64
+import hashlib
+import ipaddress
 import json
+import logging
+import re
+import threading
+import time
 
 import psycopg2
 import psycopg2.extras
-import psycopg2.pool
-from flask import current_app, g
+from flask import current_app
+
+from . import cache, db_pool
+
+log = logging.getLogger(__name__)
+
+
+def _connect_kwargs():
+    config = current_app.config
+    return dict(
+        maxconn=config["SS_DB_POOL_SIZE"],
+        host=config["SS_DB_HOST"],
+        port=config["SS_DB_PORT"],
+        dbname=config["SS_DB_NAME"],
+        user=config["SS_DB_USER"],
+        password=config["SS_DB_PASSWORD"],
+        sslmode=config.get("SS_DB_SSL_MODE", "prefer"),
+    )
 
 
 def _get_pool():
-    """Get or create a connection pool (stored on the app)."""
-    if not hasattr(current_app, "_ss_db_pool") or current_app._ss_db_pool is None or current_app._ss_db_pool.closed:
-        current_app._ss_db_pool = psycopg2.pool.SimpleConnectionPool(
-            minconn=1,
-            maxconn=5,
-            host=current_app.config["SS_DB_HOST"],
-            port=current_app.config["SS_DB_PORT"],
-            dbname=current_app.config["SS_DB_NAME"],
-            user=current_app.config["SS_DB_USER"],
-            password=current_app.config["SS_DB_PASSWORD"],
-            sslmode=current_app.config.get("SS_DB_SSL_MODE", "prefer"),
-        )
-    return current_app._ss_db_pool
+    """The worker's shadowserver connection pool (see db_pool)."""
+    return db_pool.get_pool("shadowserver", _connect_kwargs)
 
 
 def _get_conn():
     """Get a pooled connection, returned automatically at end of request."""
-    if "ss_db_conn" not in g:
-        g.ss_db_conn = _get_pool().getconn()
-    return g.ss_db_conn
+    return db_pool.request_conn("shadowserver", _connect_kwargs)
 
 
 def _return_conn(response):
-    """Return connection to pool after request."""
-    conn = g.pop("ss_db_conn", None)
-    if conn is not None:
-        _get_pool().putconn(conn)
+    """Return this context's connection to the pool early (threads, CLI)."""
+    db_pool.return_request_conn("shadowserver")
     return response
 
 
 def init_app(app):
     """Register teardown to return connections."""
-    app.after_request(_return_conn)
+    db_pool.init_app(app)
 
 
 def get_stats():
-    """Summary stats for the dashboard cards."""
+    """Summary stats for the dashboard cards (from the daily rollup if available)."""
     conn = _get_conn()
     with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-        cur.execute("""
-            SELECT
-                (SELECT COUNT(*) FROM ss_events) AS total_events,
-                (SELECT COUNT(DISTINCT report_type) FROM ss_events) AS report_types,
-                (SELECT MIN(report_date) FROM ss_events) AS earliest_date,
-                (SELECT MAX(report_date) FROM ss_events) AS latest_date
-        """)
+        if _use_rollup(cur):
+            cur.execute("""
+                SELECT COALESCE(SUM(events), 0)::BIGINT AS total_events,
+                       COUNT(DISTINCT report_type) AS report_types,
+                       MIN(report_date) AS earliest_date,
+                       MAX(report_date) AS latest_date,
+                       (SELECT refreshed_at FROM ss_rollup_state) AS rollup_refreshed_at
+                FROM ss_events_daily
+            """)
+        else:
+            cur.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM ss_events) AS total_events,
+                    (SELECT COUNT(DISTINCT COALESCE(report_type, '')) FROM ss_events) AS report_types,
+                    (SELECT MIN(report_date) FROM ss_events) AS earliest_date,
+                    (SELECT MAX(report_date) FROM ss_events) AS latest_date
+            """)
         stats = dict(cur.fetchone())
 
         cur.execute("""
@@ -70,105 +88,767 @@ def get_stats():
 
 
 def get_report_types():
-    """List distinct report types for the filter dropdown."""
+    """List distinct report types for the filter dropdown.
+
+    Events without a report type (NULL or empty) make up one ``''`` type,
+    as in the rollup, so both paths list and count the same types.
+    """
     conn = _get_conn()
-    with conn.cursor() as cur:
-        cur.execute("SELECT DISTINCT report_type FROM ss_events ORDER BY report_type")
-        return [row[0] for row in cur.fetchall()]
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        if _use_rollup(cur):
+            cur.execute("SELECT DISTINCT report_type FROM ss_events_daily ORDER BY report_type")
+        else:
+            cur.execute("""
+                SELECT DISTINCT COALESCE(report_type, '') AS report_type
+                FROM ss_events ORDER BY report_type
+            """)
+        return [row["report_type"] for row in cur.fetchall()]
+
+
+# Report types charted individually; the rest are summed as "other"
+_TREND_TOP_TYPES = 5
+
+
+def get_trend(days=30):
+    """Events per day over the ``days`` days up to the latest report date.
+
+    Returns {"dates", "total", "by_type"}; ``by_type`` holds a series for
+    each of the busiest report types plus "other".
+    """
+    conn = _get_conn()
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        if _use_rollup(cur):
+            source = "ss_events_daily"
+            volume = "SUM(events)"
+        else:
+            source = "ss_events"
+            volume = "COUNT(*)"
+        cur.execute(
+            f"""
+            SELECT report_date, COALESCE(report_type, '') AS report_type,
+                   {volume}::BIGINT AS events
+            FROM {source}
+            WHERE report_date > (SELECT MAX(report_date) FROM {source}) - %s
+            GROUP BY 1, 2
+            ORDER BY 1
+            """,
+            (days,),
+        )
+        rows = cur.fetchall()
+
+    dates = sorted({row["report_date"] for row in rows})
+    position = {d: i for i, d in enumerate(dates)}
+    volume_by_type = {}
+    for row in rows:
+        volume_by_type[row["report_type"]] = volume_by_type.get(row["report_type"], 0) + row["events"]
+    top = sorted(volume_by_type, key=volume_by_type.get, reverse=True)[:_TREND_TOP_TYPES]
+
+    total = [0] * len(dates)
+    by_type = {t or "(none)": [0] * len(dates) for t in top}
+    for row in rows:
+        i = position[row["report_date"]]
+        total[i] += row["events"]
+        name = (row["report_type"] or "(none)") if row["report_type"] in top else "other"
+        by_type.setdefault(name, [0] * len(dates))[i] += row["events"]
+    return {"dates": [str(d) for d in dates], "total": total, "by_type": by_type}
+
+
+# ── Rollups ─────────────────────────────────────────────────────
+#
+# ss_events_daily (see ROLLUP_DDL) holds one row per report date and type.
+# It is refreshed through the SECURITY DEFINER function ss_refresh_rollups(),
+# either by `flask shadowserver refresh-rollups` (cron / ingestor hook) or by
+# the explorer itself: when a dashboard read notices that an ingestion run
+# finished after the last refresh, one background refresh is started.
+
+ROLLUP_DDL = """\
+-- Daily rollups for the iris-data-explorer Shadowserver dashboard.
+-- Run as the owner of ss_events; {viewer} is the explorer's read-only role.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS ss_events_daily AS
+    SELECT report_date, COALESCE(report_type, '') AS report_type, COUNT(*) AS events
+    FROM ss_events
+    GROUP BY 1, 2;
+CREATE UNIQUE INDEX IF NOT EXISTS ss_events_daily_key
+    ON ss_events_daily (report_date, report_type);
+
+CREATE TABLE IF NOT EXISTS ss_rollup_state (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    refreshed_at TIMESTAMPTZ,
+    ingestion_id BIGINT
+);
+INSERT INTO ss_rollup_state (id, refreshed_at) VALUES (TRUE, now()) ON CONFLICT DO NOTHING;
+
+-- Lets the read-only role refresh the rollup; concurrent callers skip.
+CREATE OR REPLACE FUNCTION ss_refresh_rollups() RETURNS BOOLEAN
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp AS $$
+DECLARE
+    latest BIGINT;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('ss_refresh_rollups')) THEN
+        RETURN FALSE;
+    END IF;
+    SELECT MAX(id) INTO latest FROM ss_ingestion_log WHERE run_finished IS NOT NULL;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY ss_events_daily;
+    UPDATE ss_rollup_state SET refreshed_at = now(), ingestion_id = latest;
+    RETURN TRUE;
+END
+$$;
+
+REVOKE ALL ON FUNCTION ss_refresh_rollups() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION ss_refresh_rollups() TO {viewer};
+GRANT SELECT ON ss_events_daily, ss_rollup_state TO {viewer};
+"""
+
+# Seconds between checks for a finished ingestion run newer than the rollup
+_ROLLUP_CHECK_INTERVAL = 60
+_rollup_checked_at = 0.0
+_rollup_refreshing = threading.Lock()
+
+
+def _use_rollup(cur):
+    """Whether to read from ss_events_daily; kicks off a refresh when it is stale."""
+    global _rollup_checked_at
+    caps = capabilities(cur)
+    if not caps["rollup"]:
+        return False
+    if caps["rollup_refresh"] and time.time() - _rollup_checked_at > _ROLLUP_CHECK_INTERVAL:
+        _rollup_checked_at = time.time()
+        cur.execute("""
+            SELECT (SELECT MAX(id) FROM ss_ingestion_log WHERE run_finished IS NOT NULL) AS latest,
+                   (SELECT ingestion_id FROM ss_rollup_state) AS refreshed
+        """)
+        row = cur.fetchone()
+        if row["latest"] is not None and row["latest"] != row["refreshed"]:
+            _refresh_in_background()
+    return True
+
+
+def refresh_rollups():
+    """Refresh ss_events_daily on a dedicated pooled connection.
+
+    Returns False when another session is already refreshing.
+    """
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT ss_refresh_rollups()")
+            refreshed = cur.fetchone()[0]
+        conn.commit()
+        return refreshed
+    finally:
+        pool.putconn(conn)
+
+
+def _refresh_in_background():
+    if not _rollup_refreshing.acquire(blocking=False):
+        return
+    app = current_app._get_current_object()
+
+    def run():
+        try:
+            with app.app_context():
+                refresh_rollups()
+        except Exception:
+            log.warning("Shadowserver rollup refresh failed")
+        finally:
+            _rollup_refreshing.release()
+
+    threading.Thread(target=run, name="ss-rollup-refresh", daemon=True).start()
 
 
 def query_events_by_indicators(draw, start, length, ips=None, hostnames=None,
                                asns=None, search_value="",
                                order_column="report_date", order_dir="desc",
-                               column_filters=None):
-    """Query ss_events matching case indicators (IPs, hostnames, ASNs).
-
-    True server-side pagination via SQL LIMIT/OFFSET.
+                               column_filters=None, cursor=None, exact_count=False,
+                               networks=None, asn_ranges=None):
+    """Query ss_events matching case indicators (IPs, CIDR networks, hostnames, ASNs).
+
+    ``networks`` are CIDR strings matched by containment, ``asn_ranges``
+    inclusive ``(first, last)`` pairs.
+    True server-side pagination: keyset when a matching ``cursor`` is
+    given, SQL LIMIT/OFFSET otherwise (see _fetch_page).
     Returns DataTables-compatible dict.
     """
     ips = [i for i in (ips or []) if i]
+    networks = [n for n in (networks or []) if n]
     hostnames = [h for h in (hostnames or []) if h]
     asns = [a for a in (asns or []) if a]
+    asn_ranges = [tuple(r) for r in (asn_ranges or [])]
 
-    if not ips and not hostnames and not asns:
+    if not ips and not networks and not hostnames and not asns and not asn_ranges:
         return {"draw": draw, "recordsTotal": 0, "recordsFiltered": 0, "data": []}
 
     conn = _get_conn()
     with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-        # Build indicator WHERE clause (OR across all indicator types)
-        indicator_parts = []
-        params = []
-
-        if ips:
-            indicator_parts.append("ip = ANY(%s::inet[])")
-            params.append(ips)
-        if hostnames:
-            indicator_parts.append("hostname = ANY(%s)")
-            params.append(hostnames)
-        if asns:
-            indicator_parts.append("asn = ANY(%s::int[])")
-            params.append(asns)
-
-        indicator_where = "(" + " OR ".join(indicator_parts) + ")"
-
-        # Total matching indicators (unfiltered by search)
-        cur.execute(f"SELECT COUNT(*) FROM ss_events WHERE {indicator_where}", params)
-        records_total = cur.fetchone()["count"]
+        indicator_where, params = _indicator_where(ips, networks, hostnames, asns, asn_ranges)
+
+        # Total matching indicators (unfiltered by search). When the matches
+        # are cached, the total is their number; small ID sets also replace
+        # the indicator predicates for search/sort/paging (larger ones would
+        # put the whole array into every statement).
+        ids = _correlated_ids(cur, indicator_where, params)
+        if ids is not None:
+            records_total, total_approx = len(ids), False
+            if len(ids) <= _INLINE_IDS_MAX:
+                indicator_where = "id = ANY(%s)"
+                params = [ids]
+                exact_count = True  # counting within a small ID set is cheap
+        else:
+            records_total, total_approx = _count(cur, f"WHERE {indicator_where}", params,
+                                                 exact_count)
 
         # Add optional text search on top
-        extra_conditions = ""
-        extra_params = []
-        if search_value:
-            extra_conditions = """AND (
-                ip::TEXT ILIKE %s OR hostname ILIKE %s OR
-                tag ILIKE %s OR geo ILIKE %s OR
-                report_type ILIKE %s OR
-                raw_data::TEXT ILIKE %s
-            )"""
-            like = f"%{search_value}%"
-            extra_params = [like] * 6
+        extra_conds, extra_params = _search_conditions(cur, search_value)
 
         cf_conds, cf_params = _build_column_filter_conditions(column_filters)
-        if cf_conds:
-            extra_conditions += " AND " + " AND ".join(cf_conds)
-            extra_params.extend(cf_params)
+        extra_conds.extend(cf_conds)
+        extra_params.extend(cf_params)
 
-        where = f"WHERE {indicator_where} {extra_conditions}"
+        where = " AND ".join([f"WHERE {indicator_where}"] + extra_conds)
         count_params = params + extra_params
 
-        cur.execute(f"SELECT COUNT(*) FROM ss_events {where}", count_params)
-        records_filtered = cur.fetchone()["count"]
+        if extra_conds:
+            records_filtered, filtered_approx = _count(cur, where, count_params, exact_count)
+        else:
+            records_filtered, filtered_approx = records_total, total_approx
 
-        # Validate order column
-        allowed_cols = {
-            "report_date", "report_type", "ip", "port", "asn",
-            "geo", "hostname", "tag", "severity", "ingested_at",
-        }
-        if order_column not in allowed_cols:
-            order_column = "report_date"
-        if order_dir not in ("asc", "desc"):
-            order_dir = "desc"
-
-        cur.execute(
-            f"""
-            SELECT id, report_type, report_date, ip, port, asn, geo,
-                   hostname, tag, severity, raw_data, ingested_at
-            FROM ss_events {where}
-            ORDER BY {order_column} {order_dir} NULLS LAST
-            LIMIT %s OFFSET %s
-            """,
-            count_params + [length, start],
-        )
-        rows = _serialize_rows(cur.fetchall())
+        rows, cursors = _fetch_page(cur, where, count_params, order_column, order_dir,
+                                    start, length, cursor)
 
         return {
             "draw": draw,
             "recordsTotal": records_total,
             "recordsFiltered": records_filtered,
             "data": rows,
+            "cursors": cursors,
+            "approximate": {"recordsTotal": total_approx, "recordsFiltered": filtered_approx},
         }
 
 
+def _indicator_where(ips, networks, hostnames, asns, asn_ranges):
+    """WHERE clause (OR across all indicator types) and params for a case's indicators."""
+    indicator_parts = []
+    params = []
+
+    if ips:
+        indicator_parts.append("ip = ANY(%s::inet[])")
+        params.append(ips)
+    if networks:
+        # With the GiST inet_ops index (ss_events_ip_inet) this is a
+        # bitmap index scan per block rather than a scan of ss_events
+        indicator_parts.append("ip <<= ANY(%s::inet[])")
+        params.append(networks)
+    if hostnames:
+        indicator_parts.append("hostname = ANY(%s)")
+        params.append(hostnames)
+    if asns:
+        indicator_parts.append("asn = ANY(%s::int[])")
+        params.append(asns)
+    for first, last in asn_ranges:
+        indicator_parts.append("asn BETWEEN %s AND %s")
+        params.extend([first, last])
+
+    return "(" + " OR ".join(indicator_parts) + ")", params
+
+
+# ── Search ──────────────────────────────────────────────────────
+#
+# The global search box accepts free terms (every term must match somewhere
+# in the event) and field-scoped terms such as ``tag:botnet ip:10.0.0.0/8
+# asn:AS3320 port:443``; quote values with spaces. Free terms match the
+# lowercased ``search_text`` column (trigram-indexed) when the DBA has
+# created it with ``flask shadowserver ddl``, otherwise the per-column
+# ILIKEs (including raw_data::TEXT) are used.
+
+_SEARCH_FIELDS = {
+    "ip": "ip", "host": "hostname", "hostname": "hostname", "tag": "tag",
+    "type": "report_type", "geo": "geo", "asn": "asn", "port": "port",
+    "severity": "severity",
+}
+
+SEARCH_DDL = """\
+-- Search support for iris-data-explorer on shadowserver_db.
+-- Run as the owner of ss_events (the explorer's viewer role is read-only).
+-- Adding the stored column rewrites ss_events: run it in a quiet window.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE ss_events ADD COLUMN IF NOT EXISTS search_text TEXT
+    GENERATED ALWAYS AS (lower(
+        coalesce(host(ip), '') || ' ' || coalesce(hostname, '') || ' ' ||
+        coalesce(tag, '') || ' ' || coalesce(geo, '') || ' ' ||
+        coalesce(report_type, '') || ' ' || coalesce(raw_data::TEXT, '')
+    )) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ss_events_search_trgm
+    ON ss_events USING gin (search_text gin_trgm_ops);
+-- Field-scoped search (ip: CIDR containment, tag:/host: substrings, asn:) and
+-- case correlation with CIDR/range indicators
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ss_events_ip_inet
+    ON ss_events USING gist (ip inet_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ss_events_tag_trgm
+    ON ss_events USING gin (tag gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ss_events_hostname_trgm
+    ON ss_events USING gin (hostname gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ss_events_asn ON ss_events (asn);
+-- Keyset pagination on the default sort (read backwards for descending)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ss_events_report_date_id
+    ON ss_events (report_date, id);
+
+ANALYZE ss_events;
+"""
+
+# How long detected columns/indexes are trusted before re-checking
+_CAPABILITIES_TTL = 300
+_capabilities = None
+_capabilities_at = 0.0
+
+
+def capabilities(cur=None):
+    """Which optional search columns, indexes and rollups exist (cached)."""
+    global _capabilities, _capabilities_at
+    if _capabilities is not None and time.time() - _capabilities_at < _CAPABILITIES_TTL:
+        return _capabilities
+    if cur is None:
+        with _get_conn().cursor(cursor_factory=psycopg2.extras.RealDictCursor) as own:
+            return capabilities(own)
+    cur.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'ss_events' AND column_name = 'search_text'
+        ) AS search_column
+    """)
+    search_column = cur.fetchone()["search_column"]
+    cur.execute("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'ss_events'")
+    indexdefs = [row["indexdef"] for row in cur.fetchall()]
+    cur.execute("""
+        SELECT to_regclass('ss_events_daily') IS NOT NULL AS rollup,
+               to_regprocedure('ss_refresh_rollups()') IS NOT NULL AS rollup_refresh
+    """)
+    rollup = cur.fetchone()
+
+    def indexed(column, opclass=None):
+        # pg_indexes renders e.g. "... USING gin (search_text gin_trgm_ops)"
+        needle = f"({column} {opclass})" if opclass else f"({column})"
+        return any(needle in d for d in indexdefs)
+
+    _capabilities = {
+        "search_column": search_column,
+        "search_index": indexed("search_text", "gin_trgm_ops"),
+        "ip_index": indexed("ip", "inet_ops"),
+        "tag_index": indexed("tag", "gin_trgm_ops"),
+        "hostname_index": indexed("hostname", "gin_trgm_ops"),
+        "asn_index": indexed("asn"),
+        "rollup": rollup["rollup"],
+        "rollup_refresh": rollup["rollup_refresh"],
+    }
+    _capabilities_at = time.time()
+    return _capabilities
+
+
+def _like(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+# Whitespace-separated tokens whose quoted parts may contain spaces; an
+# unclosed quote runs to the end. Backslashes are literal (Windows paths).
+_TOKEN = re.compile(r"""(?:"[^"]*"?|'[^']*'?|[^\s"']+)+""")
+_QUOTED = re.compile(r""""([^"]*)"?|'([^']*)'?""")
+
+
+def _tokens(search_value):
+    return [_QUOTED.sub(lambda m: m[1] if m[1] is not None else m[2], token)
+            for token in _TOKEN.findall(search_value)]
+
+
+def parse_search(search_value):
+    """Split a search string into (free terms, [(column, value), ...])."""
+    terms, fields = [], []
+    for token in _tokens(search_value):
+        name, sep, value = token.partition(":")
+        column = _SEARCH_FIELDS.get(name.lower()) if sep else None
+        if column and value:
+            fields.append((column, value))
+        elif token:
+            terms.append(token)
+    return terms, fields
+
+
+def _field_condition(column, value):
+    if column == "ip":
+        try:
+            network = ipaddress.ip_network(value, strict=False)
+        except ValueError:
+            return "ip::TEXT ILIKE %s", [_like(value)]
+        return "ip <<= %s::inet", [str(network)]
+    if column in ("asn", "port"):
+        number = value.upper().removeprefix("AS") if column == "asn" else value
+        if number.isdigit():
+            return f"{column} = %s", [int(number)]
+        return f"{column}::TEXT ILIKE %s", [_like(value)]
+    if column == "severity":
+        return "severity = %s", [value.lower()]
+    return f"{column} ILIKE %s", [_like(value)]
+
+
+def _search_conditions(cur, search_value):
+    """WHERE conditions (ANDed) and params for the global search box."""
+    terms, fields = parse_search(search_value or "")
+    conditions, params = [], []
+    for column, value in fields:
+        cond, cond_params = _field_condition(column, value)
+        conditions.append(cond)
+        params.extend(cond_params)
+    if terms:
+        if capabilities(cur)["search_column"]:
+            for term in terms:
+                conditions.append("search_text LIKE %s")
+                params.append(_like(term.lower()))
+        else:
+            for term in terms:
+                conditions.append("""(
+                    ip::TEXT ILIKE %s OR hostname ILIKE %s OR
+                    tag ILIKE %s OR geo ILIKE %s OR
+                    report_type ILIKE %s OR
+                    raw_data::TEXT ILIKE %s
+                )""")
+                params.extend([_like(term)] * 6)
+    return conditions, params
+
+
+# ── Counting ────────────────────────────────────────────────────
+#
+# SS_COUNT_MODE=estimate (default) avoids a full COUNT(*) per draw: the
+# unfiltered total is counted once per finished ingestion run and shared
+# through the data cache, and filtered counts stop at SS_COUNT_CAP rows,
+# beyond which the planner's row estimate is reported. Every count comes
+# with a flag telling whether it is approximate. SS_COUNT_MODE=exact, or
+# ``exact_count`` on a request, counts exactly.
+
+# The total of a finished run stays valid until the next run starts
+_TOTAL_TTL = 86400
+
+
+def _latest_run(cur):
+    """The newest ss_ingestion_log row (id, run_finished), or None."""
+    cur.execute("SELECT id, run_finished FROM ss_ingestion_log ORDER BY id DESC LIMIT 1")
+    return cur.fetchone()
+
+
+def _exact(exact_count):
+    return exact_count or current_app.config["SS_COUNT_MODE"] == "exact"
+
+
+def _table_total(cur, exact_count=False):
+    """(row count of ss_events, approximate?)."""
+    if _exact(exact_count):
+        cur.execute("SELECT COUNT(*) FROM ss_events")
+        return cur.fetchone()["count"], False
+
+    run = _latest_run(cur)
+    if run is not None and run["run_finished"] is not None:
+        key = f"ss:total:{run['id']}"
+        backend = cache.get_backend()
+        total = backend.get(key)
+        if total is None:
+            cur.execute("SELECT COUNT(*) FROM ss_events")
+            total = cur.fetchone()["count"]
+            backend.set(key, total, _TOTAL_TTL)
+        return total, False
+
+    # No finished run to pin an exact count to (or one is ingesting right now)
+    cur.execute("SELECT reltuples::BIGINT AS estimate FROM pg_class WHERE oid = 'ss_events'::regclass")
+    row = cur.fetchone()
+    if row is None or row["estimate"] < 0:  # never analyzed
+        cur.execute("SELECT COUNT(*) FROM ss_events")
+        return cur.fetchone()["count"], False
+    return row["estimate"], True
+
+
+def _count(cur, where, params, exact_count=False):
+    """(rows of ss_events matching ``where``, approximate?)."""
+    if _exact(exact_count):
+        cur.execute(f"SELECT COUNT(*) FROM ss_events {where}", params)
+        return cur.fetchone()["count"], False
+
+    cap = current_app.config["SS_COUNT_CAP"]
+    cur.execute(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM ss_events {where} LIMIT %s) AS capped",
+        params + [cap + 1],
+    )
+    count = cur.fetchone()["count"]
+    if count <= cap:
+        return count, False
+    cur.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM ss_events {where}", params)
+    plan = cur.fetchone()["QUERY PLAN"]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return max(count, int(plan[0]["Plan"]["Plan Rows"])), True
+
+
+# ── Keyset pagination ───────────────────────────────────────────
+#
+# Pages are ordered by (order column, id) with PostgreSQL's default NULL
+# placement: last ascending, first descending. That is the order of a btree
+# on (column, id) read forwards or backwards, so ss_events_report_date_id
+# serves both directions of the default sort without a Sort node. A cursor
+# names the row just before (``next``) or just after (``prev``) the page it
+# leads to, so the neighbouring page is an index range scan at any depth
+# instead of scanning and discarding ``start`` rows. Cursors only apply to
+# the ordering, filters and position they were issued for; anything else (a
+# jump to an arbitrary page, a changed filter) falls back to OFFSET.
+
+_SORTABLE_COLUMNS = {
+    "report_date", "report_type", "ip", "port", "asn",
+    "geo", "hostname", "tag", "severity", "ingested_at",
+}
+
+_SELECT_EVENTS = """
+    SELECT id, report_type, report_date, ip, port, asn, geo,
+           hostname, tag, severity, raw_data, ingested_at
+    FROM ss_events
+"""
+
+
+def _filter_hash(where, params):
+    raw = json.dumps([where, params], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def _encode_cursor(**fields):
+    raw = json.dumps(fields, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    """Decode an opaque cursor; None if it is malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fields = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(fields, dict) or not {"k", "c", "d", "v", "i", "p", "f"} <= fields.keys():
+        return None
+    return fields
+
+
+def _order_by(column, direction):
+    return f"{column} {direction}, id {direction}"
+
+
+def _seek_ranges(column, direction, value, row_id):
+    """WHERE conditions, in order, for the rows after the (value, id) row.
+
+    "After" follows ``ORDER BY column direction, id direction``. The non-NULL
+    rows and the NULL rows are separate ranges of the (column, id) index, so
+    each is its own condition instead of one unindexable OR.
+    """
+    op = ">" if direction == "asc" else "<"
+    if value is None:
+        ranges = [(f"{column} IS NULL AND id {op} %s", [row_id])]
+        if direction == "desc":
+            ranges.append((f"{column} IS NOT NULL", []))
+    else:
+        ranges = [(f"({column}, id) {op} (%s, %s)", [value, row_id])]
+        if direction == "asc":
+            ranges.append((f"{column} IS NULL", []))
+    return ranges
+
+
+def _fetch_page(cur, where, params, order_column, order_dir, start, length, cursor=None):
+    """Fetch one page of events; returns (rows, {"next": cursor, "prev": cursor})."""
+    # Validate order column to prevent SQL injection
+    if order_column not in _SORTABLE_COLUMNS:
+        order_column = "report_date"
+    if order_dir not in ("asc", "desc"):
+        order_dir = "desc"
+    fhash = _filter_hash(where, params)
+
+    seek = _decode_cursor(cursor)
+    if seek is not None and not (
+        seek["c"] == order_column and seek["d"] == order_dir and seek["f"] == fhash
+        and ((seek["k"] == "next" and seek["p"] == start)
+             or (seek["k"] == "prev" and seek["p"] == start + length))
+    ):
+        seek = None  # issued for another ordering, filter or position
+
+    if seek is None:
+        cur.execute(
+            f"{_SELECT_EVENTS} {where} ORDER BY {_order_by(order_column, order_dir)} "
+            "LIMIT %s OFFSET %s",
+            params + [length, start],
+        )
+        rows = _serialize_rows(cur.fetchall())
+    else:
+        forward = seek["k"] == "next"
+        # Walk backwards from a prev cursor, then restore display order
+        direction = order_dir if forward else ("asc" if order_dir == "desc" else "desc")
+        rows = []
+        for cond, cond_params in _seek_ranges(order_column, direction, seek["v"], seek["i"]):
+            cur.execute(
+                f"{_SELECT_EVENTS} {where} {'AND' if where else 'WHERE'} {cond} "
+                f"ORDER BY {_order_by(order_column, direction)} LIMIT %s",
+                params + cond_params + [length - len(rows)],
+            )
+            rows.extend(_serialize_rows(cur.fetchall()))
+            if len(rows) >= length:
+                break
+        if not forward:
+            rows.reverse()
+
+    cursors = {"next": None, "prev": None}
+    if rows:
+        common = {"c": order_column, "d": order_dir, "f": fhash}
+        last, first = rows[-1], rows[0]
+        cursors["next"] = _encode_cursor(k="next", v=last[order_column], i=last["id"],
+                                         p=start + len(rows), **common)
+        if start > 0:
+            cursors["prev"] = _encode_cursor(k="prev", v=first[order_column], i=first["id"],
+                                             p=start, **common)
+    return rows, cursors
+
+
+# ── Correlation cache ───────────────────────────────────────────
+#
+# The IDs of the events matching a case's indicator set are cached in the
+# data cache, keyed by a hash of the indicators and the latest ingestion run:
+# new indicators or a new run give a new key, so nothing has to be
+# invalidated explicitly. Sets above SS_CORRELATION_CACHE_MAX are queried
+# directly every time; sets above _INLINE_IDS_MAX only provide the total.
+
+# A finished run's matches stay valid until the next run starts
+_CORRELATION_TTL = 86400
+# Cached ID sets up to this size are sent as the draw's id = ANY(...) filter
+_INLINE_IDS_MAX = 1000
+# While a run is ingesting, matches are re-evaluated this often
+_CORRELATION_RUNNING_TTL = 60
+
+
+def _correlation_key(run, indicator_where, params):
+    digest = hashlib.sha1(
+        json.dumps([indicator_where, params], sort_keys=True, default=str).encode()
+    ).hexdigest()
+    running = "" if run["run_finished"] is not None else "-running"
+    return f"ss:corr:{run['id']}{running}:{digest}"
+
+
+def _store_correlated_ids(run, key, ids, limit):
+    # Remember oversized sets too, so they are not collected on every draw
+    entry = {"ids": ids if len(ids) <= limit else None}
+    ttl = _CORRELATION_TTL if run["run_finished"] is not None else _CORRELATION_RUNNING_TTL
+    cache.get_backend().set(key, entry, ttl)
+    return entry
+
+
+def _correlated_ids(cur, indicator_where, params):
+    """Sorted IDs of the events matching the indicators, or None if not cacheable."""
+    limit = current_app.config["SS_CORRELATION_CACHE_MAX"]
+    run = _latest_run(cur)
+    if not limit or run is None:
+        return None
+    key = _correlation_key(run, indicator_where, params)
+    entry = cache.get_backend().get(key)
+    if entry is None:
+        cur.execute(
+            f"SELECT id FROM ss_events WHERE {indicator_where} ORDER BY id LIMIT %s",
+            params + [limit + 1],
+        )
+        entry = _store_correlated_ids(run, key, [row["id"] for row in cur.fetchall()], limit)
+    return entry["ids"]
+
+
+def correlate_cases(case_indicators):
+    """Match many cases' indicators against ss_events in one set-based query.
+
+    ``case_indicators`` maps case ID -> dict of ``ips``, ``networks``,
+    ``hostnames``, ``asns`` and ``asn_ranges`` (as for
+    query_events_by_indicators). Returns {case_id: {"hits", "last_seen"}}
+    for every given case and caches each case's matched IDs for its
+    Shadowserver tab (see _correlated_ids).
+    """
+    columns = {name: [] for name in (
+        "ip_case", "ip", "net_case", "net", "host_case", "host", "asn_case", "asn_lo", "asn_hi")}
+    for case_id, ind in case_indicators.items():
+        for ip in ind.get("ips") or []:
+            columns["ip_case"].append(case_id)
+            columns["ip"].append(ip)
+        for net in ind.get("networks") or []:
+            columns["net_case"].append(case_id)
+            columns["net"].append(net)
+        for host in ind.get("hostnames") or []:
+            columns["host_case"].append(case_id)
+            columns["host"].append(host)
+        ranges = [(a, a) for a in ind.get("asns") or []] + list(ind.get("asn_ranges") or [])
+        for first, last in ranges:
+            columns["asn_case"].append(case_id)
+            columns["asn_lo"].append(first)
+            columns["asn_hi"].append(last)
+
+    limit = current_app.config["SS_CORRELATION_CACHE_MAX"]
+    # Dedicated connection: batch runs also happen outside requests (CLI, thread)
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        # One join per indicator kind, each driven by the (small) indicator
+        # side through the ip/hostname/asn indexes; UNION dedups events that
+        # match a case through several indicators.
+        cur.execute(
+            """
+            WITH ips AS (SELECT * FROM unnest(%(ip_case)s::int[], %(ip)s::inet[]) AS t(case_id, ip)),
+                 nets AS (SELECT * FROM unnest(%(net_case)s::int[], %(net)s::inet[]) AS t(case_id, net)),
+                 hosts AS (SELECT * FROM unnest(%(host_case)s::int[], %(host)s::text[])
+                           AS t(case_id, hostname)),
+                 asns AS (SELECT * FROM unnest(%(asn_case)s::int[], %(asn_lo)s::int[],
+                                               %(asn_hi)s::int[]) AS t(case_id, lo, hi)),
+                 hits AS (
+                     SELECT i.case_id, e.id, e.report_date
+                     FROM ips i JOIN ss_events e ON e.ip = i.ip
+                     UNION
+                     SELECT n.case_id, e.id, e.report_date
+                     FROM nets n JOIN ss_events e ON e.ip <<= n.net
+                     UNION
+                     SELECT h.case_id, e.id, e.report_date
+                     FROM hosts h JOIN ss_events e ON e.hostname = h.hostname
+                     UNION
+                     SELECT a.case_id, e.id, e.report_date
+                     FROM asns a JOIN ss_events e ON e.asn BETWEEN a.lo AND a.hi
+                 )
+            SELECT case_id, COUNT(*) AS hits, MAX(report_date) AS last_seen,
+                   (array_agg(id ORDER BY id))[1:%(keep)s] AS ids
+            FROM hits
+            GROUP BY case_id
+            """,
+            dict(columns, keep=limit + 1),
+        )
+        rows = {row["case_id"]: row for row in cur.fetchall()}
+        run = _latest_run(cur) if limit else None
+        cur.close()
+    finally:
+        # putconn rolls back (or discards a broken connection) and always frees the slot
+        pool.putconn(conn)
+
+    results = {}
+    for case_id, ind in case_indicators.items():
+        row = rows.get(case_id)
+        results[case_id] = {
+            "hits": row["hits"] if row else 0,
+            "last_seen": row["last_seen"].isoformat() if row and row["last_seen"] else None,
+        }
+        if run is not None:
+            where, params = _indicator_where(
+                ind.get("ips") or [], ind.get("networks") or [], ind.get("hostnames") or [],
+                ind.get("asns") or [], [tuple(r) for r in ind.get("asn_ranges") or []])
+            _store_correlated_ids(run, _correlation_key(run, where, params),
+                                  row["ids"] if row else [], limit)
+    return results
+
+
 _FILTERABLE_COLUMNS = {
     "report_date", "report_type", "ip", "port", "asn",
     "geo", "hostname", "tag", "severity",
@@ -206,81 +886,132 @@ def _serialize_rows(raw_rows):
     return rows
 
 
+def _event_conditions(cur, search_value, report_type, date_from, date_to, column_filters):
+    """WHERE conditions and params for the Shadowserver page's filters."""
+    conditions = []
+    params = []
+
+    if report_type:
+        conditions.append("report_type = %s")
+        params.append(report_type)
+    if date_from:
+        conditions.append("report_date >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("report_date <= %s")
+        params.append(date_to)
+    search_conds, search_params = _search_conditions(cur, search_value)
+    conditions.extend(search_conds)
+    params.extend(search_params)
+
+    cf_conds, cf_params = _build_column_filter_conditions(column_filters)
+    conditions.extend(cf_conds)
+    params.extend(cf_params)
+    return conditions, params
+
+
 def query_events(draw, start, length, search_value="",
                  report_type=None, date_from=None, date_to=None,
                  order_column="report_date", order_dir="desc",
-                 column_filters=None):
-    """True server-side paginated query — SQL LIMIT/OFFSET, not in-memory.
+                 column_filters=None, cursor=None, exact_count=False):
+    """True server-side paginated query — keyset or LIMIT/OFFSET, not in-memory.
 
-    Returns DataTables-compatible dict: {draw, recordsTotal, recordsFiltered, data}.
+    Returns DataTables-compatible dict: {draw, recordsTotal, recordsFiltered,
+    data} plus ``cursors`` for the neighbouring pages and which counts are
+    ``approximate`` (see SS_COUNT_MODE; ``exact_count`` forces exact ones).
     """
     conn = _get_conn()
     with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
         # Total count (unfiltered)
-        cur.execute("SELECT COUNT(*) FROM ss_events")
-        records_total = cur.fetchone()["count"]
-
-        # Build WHERE clause
-        conditions = []
-        params = []
-
-        if report_type:
-            conditions.append("report_type = %s")
-            params.append(report_type)
-        if date_from:
-            conditions.append("report_date >= %s")
-            params.append(date_from)
-        if date_to:
-            conditions.append("report_date <= %s")
-            params.append(date_to)
-        if search_value:
-            conditions.append("""(
-                ip::TEXT ILIKE %s OR hostname ILIKE %s OR
-                tag ILIKE %s OR geo ILIKE %s OR
-                report_type ILIKE %s OR
-                raw_data::TEXT ILIKE %s
-            )""")
-            like = f"%{search_value}%"
-            params.extend([like] * 6)
-
-        cf_conds, cf_params = _build_column_filter_conditions(column_filters)
-        conditions.extend(cf_conds)
-        params.extend(cf_params)
+        records_total, total_approx = _table_total(cur, exact_count)
 
+        conditions, params = _event_conditions(cur, search_value, report_type,
+                                               date_from, date_to, column_filters)
         where = ""
         if conditions:
             where = "WHERE " + " AND ".join(conditions)
 
         # Filtered count
-        cur.execute(f"SELECT COUNT(*) FROM ss_events {where}", params)
-        records_filtered = cur.fetchone()["count"]
-
-        # Validate order column to prevent SQL injection
-        allowed_cols = {
-            "report_date", "report_type", "ip", "port", "asn",
-            "geo", "hostname", "tag", "severity", "ingested_at",
-        }
-        if order_column not in allowed_cols:
-            order_column = "report_date"
-        if order_dir not in ("asc", "desc"):
-            order_dir = "desc"
+        if conditions:
+            records_filtered, filtered_approx = _count(cur, where, params, exact_count)
+        else:
+            records_filtered, filtered_approx = records_total, total_approx
 
-        # Paginated query
-        cur.execute(
-            f"""
-            SELECT id, report_type, report_date, ip, port, asn, geo,
-                   hostname, tag, severity, raw_data, ingested_at
-            FROM ss_events {where}
-            ORDER BY {order_column} {order_dir} NULLS LAST
-            LIMIT %s OFFSET %s
-            """,
-            params + [length, start],
-        )
-        rows = _serialize_rows(cur.fetchall())
+        rows, cursors = _fetch_page(cur, where, params, order_column, order_dir,
+                                    start, length, cursor)
 
         return {
             "draw": draw,
             "recordsTotal": records_total,
             "recordsFiltered": records_filtered,
             "data": rows,
+            "cursors": cursors,
+            "approximate": {"recordsTotal": total_approx, "recordsFiltered": filtered_approx},
         }
+
+
+# ── Export ──────────────────────────────────────────────────────
+
+EXPORT_COLUMNS = ("id", "report_type", "report_date", "ip", "port", "asn", "geo",
+                  "hostname", "tag", "severity", "raw_data", "ingested_at")
+
+# Rows per round trip of the server-side cursor
+_EXPORT_BATCH = 2000
+
+
+def export_events(search_value="", report_type=None, date_from=None, date_to=None,
+                  order_column="report_date", order_dir="desc", column_filters=None,
+                  indicators=None):
+    """All events matching the filters, as a generator of row batches.
+
+    ``indicators`` (a dict as for query_events_by_indicators) restricts the
+    export to a case's correlation. Rows come through a named (server-side)
+    cursor, so memory stays flat however many events match. The response
+    body outlives the request context, so the rows are read on a dedicated
+    connection, taken when the first batch is requested and returned when
+    the generator ends or is closed; the request's own connection is
+    returned first.
+    """
+    if order_column not in _SORTABLE_COLUMNS:
+        order_column = "report_date"
+    if order_dir not in ("asc", "desc"):
+        order_dir = "desc"
+
+    with _get_conn().cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        conditions, params = _event_conditions(cur, search_value, report_type,
+                                               date_from, date_to, column_filters)
+    if indicators is not None:
+        if any(indicators.values()):
+            where, indicator_params = _indicator_where(
+                indicators.get("ips") or [], indicators.get("networks") or [],
+                indicators.get("hostnames") or [], indicators.get("asns") or [],
+                [tuple(r) for r in indicators.get("asn_ranges") or []])
+            conditions.insert(0, where)
+            params = indicator_params + params
+        else:
+            conditions.insert(0, "FALSE")
+
+    _return_conn(None)
+    pool = _get_pool()
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    sql = (f"{_SELECT_EVENTS} {where} "
+           f"ORDER BY {_order_by(order_column, order_dir)}")
+
+    def batches():
+        conn = pool.getconn()
+        try:
+            with conn.cursor(name=f"ss_export_{id(conn)}",
+                             cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.itersize = _EXPORT_BATCH
+                cur.execute(sql, params)
+                while True:
+                    rows = cur.fetchmany(_EXPORT_BATCH)
+                    if not rows:
+                        break
+                    yield _serialize_rows(rows)
+        finally:
+            # putconn rolls back the transaction holding the named cursor (or
+            # discards a broken connection) and always frees the slot
+            pool.putconn(conn)
+
+    return batches()
@@ -55,6 +55,8 @@ document.addEventListener('DOMContentLoaded', function () {
     var CASE_ID = _body.dataset.caseId ? parseInt(_body.dataset.caseId, 10) : undefined;
     var IRIS_URL = _body.dataset.irisUrl || '';
     var REFRESH_INTERVAL = _body.dataset.refreshInterval ? parseInt(_body.dataset.refreshInterval, 10) : 0;
+    var LIVE_UPDATES = _body.dataset.liveUpdates === 'true';
+    var SS_ENABLED = _body.dataset.ssEnabled === 'true';
 
     function irisLink(path, text) {
         if (!IRIS_URL) return escapeHtml(text);
@@ -171,7 +173,7 @@ document.addEventListener('DOMContentLoaded', function () {
             var td = $('<th></th>');
 
             // Skip non-searchable columns (like "Details" / action buttons)
-            if (col.dataSrc() === 'raw_data' || th.text() === 'Actions' || th.text() === '' || th.text() === 'Details') {
+            if (col.dataSrc() === 'raw_data' || col.dataSrc() === 'ss_hits' || th.text() === 'Actions' || th.text() === '' || th.text() === 'Details') {
                 filterRow.append(td);
                 return;
             }
@@ -199,6 +201,24 @@ document.addEventListener('DOMContentLoaded', function () {
         headerRow.after(filterRow);
     }
 
+    // Server-side export of every row matching the table's current search,
+    // filters and sort (/api/dt/... -> /api/export/...), streamed as a download
+    function exportButton(format, label) {
+        return {
+            text: label,
+            titleAttr: 'Download all matching rows as ' + label,
+            action: function (e, dt) {
+                var params = $.extend({}, dt.ajax.params(), { format: format });
+                delete params.draw;
+                delete params.start;
+                delete params.length;
+                delete params.cursor;
+                var url = dt.ajax.url().split('?')[0].replace('/api/dt/', '/api/export/');
+                window.location.href = url + '?' + $.param(params);
+            }
+        };
+    }
+
     function copyBtn(text) {
         if (!text) return '';
         var escaped = escapeHtml(String(text));
@@ -239,14 +259,42 @@ document.addEventListener('DOMContentLoaded', function () {
     var refreshInterval = REFRESH_INTERVAL || 0;
     var statusEl = document.getElementById('refresh-status');
     var lastRefresh = new Date();
+    var liveActive = false;
 
     function updateStatus() {
         if (!statusEl || !refreshInterval) return;
         var ago = Math.round((new Date() - lastRefresh) / 1000);
+        if (liveActive) {
+            statusEl.textContent = 'Updated ' + ago + 's ago | Live';
+            return;
+        }
         var next = Math.max(0, refreshInterval - ago);
         statusEl.textContent = 'Updated ' + ago + 's ago | Next in ' + next + 's';
     }
 
+    // ── Live updates: server pushes "entity changed" events ─────
+    // Falls back to interval polling when disabled or the stream is refused.
+    function startLiveUpdates(url, onChanged, startPolling) {
+        if (!LIVE_UPDATES || !window.EventSource) {
+            startPolling();
+            return;
+        }
+        liveActive = true;
+        var source = new EventSource(url);
+        source.addEventListener('changed', function (e) {
+            var event;
+            try { event = JSON.parse(e.data); } catch (ex) { return; }
+            onChanged(event.entity);
+        });
+        source.onerror = function () {
+            // The browser reconnects by itself unless the stream was refused
+            if (source.readyState === EventSource.CLOSED) {
+                liveActive = false;
+                startPolling();
+            }
+        };
+    }
+
     if (statusEl && refreshInterval) {
         setInterval(updateStatus, 1000);
         updateStatus();
@@ -308,13 +356,18 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     }
 
-    function refreshAllTables(bustCache) {
-        var suffix = bustCache ? '?refresh=1' : '';
+    // refresh: '1' refetches now (refresh button), 'auto' lets the server
+    // answer from its cache while it refetches in the background
+    function refreshAllTables(refresh, onlyKeys) {
+        var suffix = refresh ? '?refresh=' + refresh : '';
         var pending = 0;
         var expandedState = {};
+        var keys = Object.keys(tables).filter(function (key) {
+            return !onlyKeys || onlyKeys.indexOf(key) !== -1;
+        });
 
         // Save expanded rows for each initialized table
-        Object.keys(tables).forEach(function (key) {
+        keys.forEach(function (key) {
             if (tables[key]) {
                 expandedState[key] = getExpandedRowIds(tables[key], key);
                 pending++;
@@ -324,7 +377,7 @@ document.addEventListener('DOMContentLoaded', function () {
         if (!pending) return;
         startRefreshSpin();
 
-        Object.keys(tables).forEach(function (key) {
+        keys.forEach(function (key) {
             var t = tables[key];
             if (!t) return;
             var url = key === 'shadowserver'
@@ -346,7 +399,7 @@ document.addEventListener('DOMContentLoaded', function () {
     // Manual refresh button
     if (refreshBtn) {
         refreshBtn.addEventListener('click', function () {
-            refreshAllTables(true);
+            refreshAllTables('1');
         });
     }
 
@@ -357,6 +410,40 @@ document.addEventListener('DOMContentLoaded', function () {
     var casesTable = document.getElementById('cases-table');
     if (casesTable && CASE_ID === undefined) {
         var irisUrl = (typeof IRIS_URL !== 'undefined') ? IRIS_URL : '';
+        var caseColumns = [
+            { data: 'case_id', width: '40px' },
+            { data: 'case_name', width: '22%', render: function (d) { return '<span title="' + escapeHtml(d) + '">' + escapeHtml(truncate(d, 50)) + '</span>'; } },
+            { data: 'case_description', width: '20%', render: function (d) { return escapeHtml(truncate(stripHtml(d), 60)); } },
+            { data: 'case_soc_id', width: '70px', defaultContent: '' },
+            { data: 'status_id', width: '70px', defaultContent: '', render: function (d) {
+                return d != null ? statusBadge(d) : '';
+            }},
+            { data: 'severity_id', width: '75px', defaultContent: '', render: function (d) {
+                return d != null ? severityBadge(d) : '';
+            }},
+            { data: 'owner', width: '90px', defaultContent: '', render: function (d) {
+                if (!d) return '';
+                var name = d.user_name || d.user_login || d;
+                return '<span title="' + escapeHtml(name) + '">' + escapeHtml(truncate(name, 12)) + '</span>';
+            }},
+            { data: 'open_date', width: '85px', defaultContent: '' },
+            { data: 'close_date', width: '85px', defaultContent: '' }
+        ];
+        if (SS_ENABLED) {
+            // Filled in by batch correlation ("Correlate"); not sortable server-side
+            caseColumns.push({ data: 'ss_hits', width: '80px', orderable: false, searchable: false,
+                defaultContent: '', render: function (d, type, row) {
+                    if (!d) return '<span class="text-iris-muted" title="Not correlated yet">&mdash;</span>';
+                    if (!d.hits) return '0';
+                    return '<a href="/case/' + row.case_id + '" class="badge bg-warning text-dark" title="' +
+                        escapeHtml('Last seen ' + (d.last_seen || '?')) + '">' + d.hits + '</a>';
+                }});
+        }
+        caseColumns.push({ data: 'case_id', width: '110px', orderable: false, render: function (d) {
+            return '<a href="/case/' + d + '" class="btn btn-sm btn-primary py-0 px-2">Explore</a> ' +
+                   '<a href="' + escapeHtml(irisUrl) + '/case?cid=' + d + '" target="_blank" ' +
+                   'class="btn btn-sm btn-outline-info py-0 px-2" title="Open in IRIS">IRIS</a>';
+        }});
         var dt = new DataTable('#cases-table', {
             serverSide: true,
             processing: true,
@@ -372,30 +459,7 @@ document.addEventListener('DOMContentLoaded', function () {
                 url: '/api/dt/cases',
                 dataSrc: 'data'
             },
-            columns: [
-                { data: 'case_id', width: '40px' },
-                { data: 'case_name', width: '22%', render: function (d) { return '<span title="' + escapeHtml(d) + '">' + escapeHtml(truncate(d, 50)) + '</span>'; } },
-                { data: 'case_description', width: '20%', render: function (d) { return escapeHtml(truncate(stripHtml(d), 60)); } },
-                { data: 'case_soc_id', width: '70px', defaultContent: '' },
-                { data: 'status_id', width: '70px', defaultContent: '', render: function (d) {
-                    return d != null ? statusBadge(d) : '';
-                }},
-                { data: 'severity_id', width: '75px', defaultContent: '', render: function (d) {
-                    return d != null ? severityBadge(d) : '';
-                }},
-                { data: 'owner', width: '90px', defaultContent: '', render: function (d) {
-                    if (!d) return '';
-                    var name = d.user_name || d.user_login || d;
-                    return '<span title="' + escapeHtml(name) + '">' + escapeHtml(truncate(name, 12)) + '</span>';
-                }},
-                { data: 'open_date', width: '85px', defaultContent: '' },
-                { data: 'close_date', width: '85px', defaultContent: '' },
-                { data: 'case_id', width: '110px', orderable: false, render: function (d) {
-                    return '<a href="/case/' + d + '" class="btn btn-sm btn-primary py-0 px-2">Explore</a> ' +
-                           '<a href="' + escapeHtml(irisUrl) + '/case?cid=' + d + '" target="_blank" ' +
-                           'class="btn btn-sm btn-outline-info py-0 px-2" title="Open in IRIS">IRIS</a>';
-                }}
-            ],
+            columns: caseColumns,
             language: {
                 emptyTable: 'No cases found',
                 search: 'Filter:',
@@ -419,12 +483,48 @@ document.addEventListener('DOMContentLoaded', function () {
             });
         }
 
-        // Auto-refresh cases table
+        // Batch Shadowserver correlation of all open cases
+        var correlateBtn = document.getElementById('btn-ss-correlate');
+        if (correlateBtn) {
+            var waitForBatch = function () {
+                $.getJSON('/api/shadowserver/correlate', function (status) {
+                    if (status.running) {
+                        setTimeout(waitForBatch, 3000);
+                        return;
+                    }
+                    correlateBtn.disabled = false;
+                    correlateBtn.textContent = 'Correlate';
+                    dt.ajax.reload(null, false);
+                }).fail(function () {
+                    correlateBtn.disabled = false;
+                    correlateBtn.textContent = 'Correlate';
+                });
+            };
+            correlateBtn.addEventListener('click', function () {
+                correlateBtn.disabled = true;
+                correlateBtn.innerHTML = '<div class="spinner-border spinner-border-sm" role="status"></div> Correlating';
+                $.ajax({ url: '/api/shadowserver/correlate', method: 'POST',
+                         contentType: 'application/json', data: '{}' })
+                    .done(function () { setTimeout(waitForBatch, 1000); })
+                    .fail(function (xhr) {
+                        correlateBtn.disabled = false;
+                        correlateBtn.textContent = 'Correlate';
+                        if (xhr.responseJSON && xhr.responseJSON.error) {
+                            correlateBtn.title = xhr.responseJSON.error;
+                        }
+                    });
+            });
+        }
+
+        // Auto-refresh cases table (pushed when live updates are enabled)
         if (refreshInterval > 0) {
-            setInterval(function () {
-                dt.ajax.url('/api/dt/cases?refresh=1').load(null, false);
+            var reloadCases = function () {
+                dt.ajax.url('/api/dt/cases?refresh=auto').load(null, false);
                 lastRefresh = new Date();
-            }, refreshInterval * 1000);
+            };
+            startLiveUpdates('/api/stream/cases', reloadCases, function () {
+                setInterval(reloadCases, refreshInterval * 1000);
+            });
         }
         return;
     }
@@ -442,7 +542,7 @@ document.addEventListener('DOMContentLoaded', function () {
         lengthMenu: [[10, 25, 50, 100], [10, 25, 50, 100]],
         dom: 'lBfrtip',
         stateSave: true,
-        buttons: ['csv', 'copy'],
+        buttons: [exportButton('csv', 'CSV'), exportButton('ndjson', 'NDJSON'), 'copy'],
         autoWidth: false,
         language: {
             emptyTable: 'No data available',
@@ -588,6 +688,57 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     });
 
+    // ── Keyset paging: hand the server the cursor of the neighbouring page ──
+    // The server ignores cursors that do not match the requested page and
+    // falls back to OFFSET, so a stale cursor only costs speed.
+    function keysetPaging() {
+        var requested = null;
+        var last = null;
+        return {
+            apply: function (d) {
+                requested = { start: d.start, length: d.length };
+                if (!last || !last.cursors || d.length !== last.length) return;
+                if (d.start === last.start + last.length && last.cursors.next) {
+                    d.cursor = last.cursors.next;
+                } else if (d.start === last.start - last.length && last.cursors.prev) {
+                    d.cursor = last.cursors.prev;
+                }
+            },
+            record: function (json) {
+                if (requested) last = { start: requested.start, length: requested.length, cursors: json.cursors };
+                return json.data;
+            }
+        };
+    }
+
+    // ── Approximate counts: mark estimates with "≈", count exactly on request ──
+    function approximateCounts() {
+        var exact = false;
+        function fmt(n) { return Number(n).toLocaleString(); }
+        return {
+            apply: function (d) {
+                if (exact) d.exact_count = 1;
+            },
+            info: function (settings, start, end, max, total, pre) {
+                var approx = (settings.json && settings.json.approximate) || {};
+                if (!approx.recordsTotal && !approx.recordsFiltered) return pre;
+                var text = 'Showing ' + (total ? fmt(start) : 0) + ' to ' + fmt(end) + ' of ' +
+                    (approx.recordsFiltered ? '\u2248' : '') + fmt(total) + ' entries';
+                if (total !== max) {
+                    text += ' (filtered from ' + (approx.recordsTotal ? '\u2248' : '') + fmt(max) + ' total entries)';
+                }
+                return escapeHtml(text) + ' <a href="#" class="ss-exact-count">exact count</a>';
+            },
+            bind: function (dt) {
+                $(dt.table().container()).on('click', '.ss-exact-count', function (e) {
+                    e.preventDefault();
+                    exact = true;
+                    dt.ajax.reload(null, false);
+                });
+            }
+        };
+    }
+
     // ── Shadowserver tab (dynamic correlation) ─────────────────
     var ssTable = document.getElementById('dt-shadowserver');
     var ssInitialized = false;
@@ -601,15 +752,20 @@ document.addEventListener('DOMContentLoaded', function () {
             4: 'asn', 5: 'geo', 6: 'hostname', 7: 'tag', 8: 'severity',
         };
 
+        var ssPaging = keysetPaging();
+        var ssCounts = approximateCounts();
+
         tables.shadowserver = new DataTable('#dt-shadowserver', $.extend(true, {}, dtDefaults, {
             ajax: {
                 url: '/api/dt/case/' + CASE_ID + '/shadowserver',
-                dataSrc: 'data',
+                dataSrc: function (json) { return ssPaging.record(json); },
                 data: function (d) {
                     if (d.order && d.order.length > 0) {
                         d.order_column = ssColMap[d.order[0].column] || 'report_date';
                         d.order_dir = d.order[0].dir || 'desc';
                     }
+                    ssPaging.apply(d);
+                    ssCounts.apply(d);
                 }
             },
             columns: [
@@ -637,16 +793,19 @@ document.addEventListener('DOMContentLoaded', function () {
                 }}
             ],
             order: [[0, 'desc']],
+            infoCallback: ssCounts.info,
             language: {
                 emptyTable: 'No Shadowserver matches for this case\'s indicators',
                 search: 'Filter:',
+                searchPlaceholder: 'text tag: ip: asn: port: host: type:',
                 processing: '<div class="spinner-border spinner-border-sm" role="status"></div> Loading...'
             },
             initComplete: function (settings, json) {
                 // Update badge with hit count
+                var approx = (json.approximate && json.approximate.recordsTotal) ? '\u2248' : '';
                 var badge = document.getElementById('ss-badge');
                 if (badge && json.recordsTotal > 0) {
-                    badge.textContent = json.recordsTotal.toLocaleString();
+                    badge.textContent = approx + json.recordsTotal.toLocaleString();
                     badge.style.display = 'inline';
                 }
                 // #17: Indicator count feedback
@@ -655,14 +814,16 @@ document.addEventListener('DOMContentLoaded', function () {
                     var i = json.indicators;
                     var parts = [];
                     if (i.ips) parts.push(i.ips + ' IP' + (i.ips !== 1 ? 's' : ''));
+                    if (i.networks) parts.push(i.networks + ' network' + (i.networks !== 1 ? 's' : ''));
                     if (i.hostnames) parts.push(i.hostnames + ' hostname' + (i.hostnames !== 1 ? 's' : ''));
                     if (i.asns) parts.push(i.asns + ' ASN' + (i.asns !== 1 ? 's' : ''));
                     feedback.textContent = 'Searched ' + (parts.join(', ') || 'no indicators') +
-                        ' — ' + (json.recordsTotal || 0) + ' match' + (json.recordsTotal !== 1 ? 'es' : '');
+                        ' — ' + approx + (json.recordsTotal || 0) + ' match' + (json.recordsTotal !== 1 ? 'es' : '');
                 }
                 addColumnFilters(this.api());
             }
         }));
+        ssCounts.bind(tables.shadowserver);
     }
 
     // Expand raw_data modal
@@ -870,9 +1031,25 @@ document.addEventListener('DOMContentLoaded', function () {
     }
 
     // ── Auto-refresh entity tables (preserves expanded rows) ────
+    // With live updates only the tables whose entity changed are reloaded.
+    function onEntityChanged(entity) {
+        if (!tables[entity]) {
+            // Deferred tab not opened yet — just refresh its badge
+            $.getJSON('/api/case/' + CASE_ID + '/counts', function (counts) {
+                if (entity in counts) updateTabBadge(entity, counts[entity]);
+            });
+        }
+        var keys = [entity];
+        // Shadowserver matches are correlated from the case's IOCs and assets
+        if (entity === 'iocs' || entity === 'assets') keys.push('shadowserver');
+        refreshAllTables('auto', keys);
+    }
+
     if (refreshInterval > 0) {
-        setInterval(function () {
-            refreshAllTables(true);
-        }, refreshInterval * 1000);
+        startLiveUpdates('/api/stream/case/' + CASE_ID, onEntityChanged, function () {
+            setInterval(function () {
+                refreshAllTables('auto');
+            }, refreshInterval * 1000);
+        });
     }
 });
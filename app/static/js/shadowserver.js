@@ -11,6 +11,24 @@ document.addEventListener('DOMContentLoaded', function () {
         return div.innerHTML;
     }
 
+    // Server-side export of every row matching the table's current search,
+    // filters and sort (/api/dt/... -> /api/export/...), streamed as a download
+    function exportButton(format, label) {
+        return {
+            text: label,
+            titleAttr: 'Download all matching rows as ' + label,
+            action: function (e, dt) {
+                var params = $.extend({}, dt.ajax.params(), { format: format });
+                delete params.draw;
+                delete params.start;
+                delete params.length;
+                delete params.cursor;
+                var url = dt.ajax.url().split('?')[0].replace('/api/dt/', '/api/export/');
+                window.location.href = url + '?' + $.param(params);
+            }
+        };
+    }
+
     function copyBtn(text) {
         if (!text) return '';
         var escaped = escapeHtml(String(text));
@@ -100,14 +118,119 @@ document.addEventListener('DOMContentLoaded', function () {
         });
     });
 
+    // ── Events-per-day chart (plain SVG bars, per-type breakdown on hover) ──
+    var SVG_NS = 'http://www.w3.org/2000/svg';
+
+    function renderTrend(data) {
+        var container = document.getElementById('ss-trend');
+        if (!container) return;
+        container.innerHTML = '';
+        if (!data.dates || !data.dates.length) {
+            container.textContent = 'No data';
+            return;
+        }
+        var width = 1000, height = 120, n = data.dates.length;
+        var max = Math.max.apply(null, data.total) || 1;
+        var slot = width / n;
+        var svg = document.createElementNS(SVG_NS, 'svg');
+        svg.setAttribute('viewBox', '0 0 ' + width + ' ' + height);
+        svg.setAttribute('preserveAspectRatio', 'none');
+        data.dates.forEach(function (date, i) {
+            var h = Math.max(1, Math.round(data.total[i] / max * (height - 4)));
+            var rect = document.createElementNS(SVG_NS, 'rect');
+            rect.setAttribute('x', (i * slot + slot * 0.1).toFixed(1));
+            rect.setAttribute('width', (slot * 0.8).toFixed(1));
+            rect.setAttribute('y', height - h);
+            rect.setAttribute('height', h);
+            var lines = [date + ': ' + data.total[i].toLocaleString() + ' events'];
+            Object.keys(data.by_type || {}).forEach(function (type) {
+                var v = data.by_type[type][i];
+                if (v) lines.push('  ' + type + ': ' + v.toLocaleString());
+            });
+            var title = document.createElementNS(SVG_NS, 'title');
+            title.textContent = lines.join('\n');
+            rect.appendChild(title);
+            svg.appendChild(rect);
+        });
+        container.appendChild(svg);
+        var axis = document.createElement('div');
+        axis.className = 'ss-trend-axis d-flex justify-content-between';
+        axis.innerHTML = '<span>' + escapeHtml(data.dates[0]) + '</span>' +
+            '<span>max ' + max.toLocaleString() + '/day</span>' +
+            '<span>' + escapeHtml(data.dates[n - 1]) + '</span>';
+        container.appendChild(axis);
+    }
+
+    function loadTrend() {
+        $.getJSON('/api/shadowserver/trend', { days: $('#trend-days').val() || 30 }, renderTrend);
+    }
+
+    $('#trend-days').on('change', loadTrend);
+    loadTrend();
+
     // Populate report type filter
     $.getJSON('/api/shadowserver/report-types', function (types) {
         var sel = $('#filter-type');
         types.forEach(function (t) {
+            if (!t) return;  // events without a type: only "All types" selects them
             sel.append('<option value="' + escapeHtml(t) + '">' + escapeHtml(t) + '</option>');
         });
     });
 
+    // ── Keyset paging: hand the server the cursor of the neighbouring page ──
+    // The server ignores cursors that do not match the requested page and
+    // falls back to OFFSET, so a stale cursor only costs speed.
+    function keysetPaging() {
+        var requested = null;
+        var last = null;
+        return {
+            apply: function (d) {
+                requested = { start: d.start, length: d.length };
+                if (!last || !last.cursors || d.length !== last.length) return;
+                if (d.start === last.start + last.length && last.cursors.next) {
+                    d.cursor = last.cursors.next;
+                } else if (d.start === last.start - last.length && last.cursors.prev) {
+                    d.cursor = last.cursors.prev;
+                }
+            },
+            record: function (json) {
+                if (requested) last = { start: requested.start, length: requested.length, cursors: json.cursors };
+                return json.data;
+            }
+        };
+    }
+
+    // ── Approximate counts: mark estimates with "≈", count exactly on request ──
+    function approximateCounts() {
+        var exact = false;
+        function fmt(n) { return Number(n).toLocaleString(); }
+        return {
+            apply: function (d) {
+                if (exact) d.exact_count = 1;
+            },
+            info: function (settings, start, end, max, total, pre) {
+                var approx = (settings.json && settings.json.approximate) || {};
+                if (!approx.recordsTotal && !approx.recordsFiltered) return pre;
+                var text = 'Showing ' + (total ? fmt(start) : 0) + ' to ' + fmt(end) + ' of ' +
+                    (approx.recordsFiltered ? '\u2248' : '') + fmt(total) + ' entries';
+                if (total !== max) {
+                    text += ' (filtered from ' + (approx.recordsTotal ? '\u2248' : '') + fmt(max) + ' total entries)';
+                }
+                return escapeHtml(text) + ' <a href="#" class="ss-exact-count">exact count</a>';
+            },
+            bind: function (dt) {
+                $(dt.table().container()).on('click', '.ss-exact-count', function (e) {
+                    e.preventDefault();
+                    exact = true;
+                    dt.ajax.reload(null, false);
+                });
+            }
+        };
+    }
+
+    var ssPaging = keysetPaging();
+    var ssCounts = approximateCounts();
+
     // ── Column-to-index map for ordering ─────────────────────────
     var colMap = {
         0: 'report_date', 1: 'report_type', 2: 'ip', 3: 'port',
@@ -122,7 +245,7 @@ document.addEventListener('DOMContentLoaded', function () {
         lengthMenu: [[10, 25, 50, 100], [10, 25, 50, 100]],
         dom: 'lBfrtip',
         stateSave: true,
-        buttons: ['csv', 'copy'],
+        buttons: [exportButton('csv', 'CSV'), exportButton('ndjson', 'NDJSON'), 'copy'],
         autoWidth: false,
         order: [[0, 'desc']],
         ajax: {
@@ -136,8 +259,10 @@ document.addEventListener('DOMContentLoaded', function () {
                     d.order_column = colMap[d.order[0].column] || 'report_date';
                     d.order_dir = d.order[0].dir || 'desc';
                 }
+                ssPaging.apply(d);
+                ssCounts.apply(d);
             },
-            dataSrc: 'data'
+            dataSrc: function (json) { return ssPaging.record(json); }
         },
         columns: [
             { data: 'report_date' },
@@ -163,9 +288,11 @@ document.addEventListener('DOMContentLoaded', function () {
                        '<span class="text-muted small ms-1">' + escapeHtml(preview) + '</span>';
             }}
         ],
+        infoCallback: ssCounts.info,
         language: {
             emptyTable: 'No Shadowserver events found',
             search: 'Search:',
+            searchPlaceholder: 'text tag: ip:10.0.0.0/8 asn: port: host: type: geo:',
             processing: '<div class="spinner-border spinner-border-sm" role="status"></div> Loading...'
         },
         initComplete: function () {
@@ -173,6 +300,8 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     });
 
+    ssCounts.bind(dt);
+
     // ── Filter form ──────────────────────────────────────────────
     $('#ss-filters').on('submit', function (e) {
         e.preventDefault();
@@ -0,0 +1,96 @@
+"""Compare data cache hit rates: per-worker memory LRU vs shared backends.
+
+Replays a skewed stream of (case, entity) lookups round-robined over N
+simulated gunicorn workers. With ``memory`` every worker has its own LRU;
+with ``sqlite`` (and ``redis`` if --redis-url is given) all workers share one
+store, as they would in production. Runs offline.
+
+    python bench/cache_hit_rate.py --workers 4 --requests 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import cache  # noqa: E402
+
+ENTITIES = ("case", "assets", "iocs", "events", "tasks", "notes", "evidences")
+
+
+def _payload(case_id, entity, rows):
+    return [
+        {"id": i, "case_id": case_id, "entity": entity,
+         "value": f"{entity}-{case_id}-{i}", "description": "x" * 80}
+        for i in range(rows)
+    ]
+
+
+def _key_stream(n, cases, skew, seed):
+    rnd = random.Random(seed)
+    weights = [1.0 / (rank ** skew) for rank in range(1, cases + 1)]
+    case_ids = rnd.choices(range(1, cases + 1), weights=weights, k=n)
+    return [(c, rnd.choice(ENTITIES)) for c in case_ids]
+
+
+def run(name, backends, stream, rows, ttl):
+    fetches = 0
+    started = time.perf_counter()
+    for i, (case_id, entity) in enumerate(stream):
+        backend = backends[i % len(backends)]
+        key = f"bench:{case_id}:{entity}"
+        if backend.get(key) is None:
+            fetches += 1
+            backend.set(key, _payload(case_id, entity, rows), ttl)
+    elapsed = time.perf_counter() - started
+    hits = len(stream) - fetches
+    print(f"{name:8s} hit rate {hits / len(stream):6.1%}  "
+          f"upstream fetches {fetches:6d}  {elapsed * 1e6 / len(stream):8.1f} us/lookup")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of case popularity")
+    parser.add_argument("--rows", type=int, default=50, help="rows per cached entity")
+    parser.add_argument("--max-entries", type=int, default=256, help="entries per worker LRU")
+    parser.add_argument("--shared-max-entries", type=int, default=0,
+                        help="entries in the shared store (default: workers x max-entries)")
+    parser.add_argument("--ttl", type=int, default=300)
+    parser.add_argument("--redis-url", default="")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    shared_max = args.shared_max_entries or args.workers * args.max_entries
+    stream = _key_stream(args.requests, args.cases, args.skew, args.seed)
+    print(f"{args.requests} lookups, {args.cases} cases x {len(ENTITIES)} entities, "
+          f"{args.workers} workers, {args.max_entries} entries per worker LRU, "
+          f"{shared_max} entries shared\n")
+
+    run("memory", [cache.MemoryCache(args.max_entries) for _ in range(args.workers)],
+        stream, args.rows, args.ttl)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite3")
+        run("sqlite", [cache.SQLiteCache(path, shared_max) for _ in range(args.workers)],
+            stream, args.rows, args.ttl)
+
+    if args.redis_url:
+        shared = [cache.RedisCache(args.redis_url, shared_max) for _ in range(args.workers)]
+        shared[0].delete_prefix("bench:")
+        run("redis", shared, stream, args.rows, args.ttl)
+
+    sample = _payload(1, "iocs", args.rows)
+    raw = len(json.dumps(sample).encode())
+    print(f"\nserialized entry: {len(cache.encode(sample))} bytes ({raw} bytes as plain JSON)")
+
+
+if __name__ == "__main__":
+    main()
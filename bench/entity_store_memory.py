@@ -0,0 +1,54 @@
+"""Measure the memory of fully built EntityStores against their estimate.
+
+Builds a store over the fake IRIS rows of each entity at the given sizes,
+runs a global search and a sort (search text, trigram index, one column and
+one sort order) and reports the bytes allocated for it (tracemalloc) next
+to ``EntityStore.nbytes``, the estimate ENTITY_STORE_MAX_MB is checked
+against. The rows themselves are not counted: they belong to the data cache.
+Runs offline.
+
+    python bench/entity_store_memory.py --rows 1000,10000,100000
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.entity_store import EntityStore  # noqa: E402
+from fake_iris import _assets, _events, _iocs  # noqa: E402
+
+_ENTITIES = {"assets": (_assets, "asset_name"), "iocs": (_iocs, "ioc_value"),
+             "events": (_events, "event_date")}
+
+
+def measure(build, column, n):
+    rows = build(1, n)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = EntityStore(rows)
+    store.query(search="host", column_filters={column: "1"}, order_column=column,
+                order_dir="desc")
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return allocated, store.nbytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", default="1000,10000,100000",
+                        help="comma-separated store sizes")
+    args = parser.parse_args()
+
+    print(f"{'entity':8} {'rows':>8} {'measured':>12} {'estimate':>12} {'per row':>9} {'ratio':>6}")
+    for size in (int(n) for n in args.rows.split(",")):
+        for entity, (build, column) in _ENTITIES.items():
+            allocated, estimate = measure(build, column, size)
+            print(f"{entity:8} {size:>8} {allocated / 1e6:>10.1f}MB {estimate / 1e6:>10.1f}MB "
+                  f"{allocated / size:>8.0f}B {estimate / allocated:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Stand-in IRIS for benchmarks: deterministic cases of configurable size.
+
+Serves the endpoints the explorer calls — ``/api/v2/cases`` and
+``/api/v2/cases/<id>[/<entity>]`` (paged, ``total``, update ordering for
+delta sync), the legacy ``/case/timeline/events/list`` and
+``/case/notes/directories/filter`` — after a fixed per-request latency.
+Every entity of a case has the case's row count (``--rows``, overridden per
+case with ``--size``); single responses carry an ETag and answer
+``If-None-Match`` with 304. Encoded bodies are memoized, so large cases cost
+their serialization once.
+
+    python bench/fake_iris.py --port 8443 --latency 0.05 --size 3=100000
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+_CASE_LIST_SIZE = 200
+_BODY_CACHE_MAX = 256
+_STAMP = "2026-01-01T00:00:00"
+
+
+def _stamp(i):
+    # Distinct, sortable update stamps (delta sync orders by them)
+    return f"2026-01-{1 + i // 86400 % 28:02d}T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}"
+
+
+def _assets(case_id, n):
+    return [{"asset_id": i, "asset_name": f"host-{case_id}-{i}",
+             "asset_ip": f"10.{case_id % 256}.{i // 256 % 256}.{i % 256}",
+             "asset_domain": f"host{i}.case{case_id}.example", "asset_type": "Windows - Server",
+             "asset_description": f"Asset {i} of case {case_id}", "date_update": _stamp(i)}
+            for i in range(1, n + 1)]
+
+
+def _iocs(case_id, n):
+    return [{"ioc_id": i, "ioc_value": f"198.51.{i // 256 % 256}.{i % 256}" if i % 2 else
+             f"bad{i}.example.net", "ioc_type": "ip-dst" if i % 2 else "domain",
+             "ioc_tlp": "amber", "ioc_description": f"Indicator {i}", "ioc_tags": "bench"}
+            for i in range(1, n + 1)]
+
+
+def _tasks(case_id, n):
+    return [{"task_id": i, "task_title": f"Task {i}", "task_status": ("To do", "In progress", "Done")[i % 3],
+             "task_description": f"Work item {i} of case {case_id}", "task_last_update": _stamp(i)}
+            for i in range(1, n + 1)]
+
+
+def _evidences(case_id, n):
+    return [{"id": i, "filename": f"evidence-{i}.bin", "file_size": i * 1024,
+             "file_hash": f"{i:064x}", "file_description": f"Evidence {i}"}
+            for i in range(1, n + 1)]
+
+
+def _events(case_id, n):
+    return [{"event_id": i, "event_title": f"Event {i} on host-{case_id}-{i % 50}",
+             "event_date": _stamp(i), "event_source": ("EDR", "SIEM", "Analyst")[i % 3],
+             "event_content": f"Process {i} spawned by user{i % 17}", "event_category": "Execution"}
+            for i in range(1, n + 1)]
+
+
+_PAGED = {"assets": _assets, "iocs": _iocs, "tasks": _tasks, "evidences": _evidences}
+_UPDATE_FIELDS = {"assets": "date_update", "tasks": "task_last_update"}
+
+
+class FakeIris:
+    """Fake IRIS server on a background thread; ``requests`` counts calls served."""
+
+    def __init__(self, latency=0.05, rows=100, sizes=None, port=0):
+        self.latency = latency
+        self.rows = rows
+        self.sizes = dict(sizes or {})
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._bodies = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+    def size_of(self, case_id):
+        return self.sizes.get(case_id, self.rows)
+
+    # ── responses ───────────────────────────────────────────────
+
+    def _body(self, key, build):
+        with self._lock:
+            body = self._bodies.get(key)
+        if body is None:
+            body = json.dumps(build()).encode()
+            with self._lock:
+                if len(self._bodies) >= _BODY_CACHE_MAX:
+                    self._bodies.pop(next(iter(self._bodies)))
+                self._bodies[key] = body
+        return body
+
+    def _paged(self, rows_of, query, update_field=None):
+        page = int(query.get("page", 1))
+        per_page = int(query.get("per_page", 100))
+        order_by = query.get("order_by")
+
+        def build():
+            rows = rows_of()
+            if order_by and order_by == update_field:
+                rows = sorted(rows, key=lambda r: r[order_by],
+                              reverse=query.get("sort_dir") == "desc")
+            return {"status": "success", "total": len(rows),
+                    "data": rows[(page - 1) * per_page:page * per_page]}
+
+        return build, (page, per_page, order_by, query.get("sort_dir"))
+
+    def respond(self, path, query):
+        """(status, body, etag) for a GET; body None for 404."""
+        parts = path.strip("/").split("/")
+        if path == "/api/v2/cases":
+            build, variant = self._paged(lambda: [
+                {"case_id": i, "case_name": f"#{i} - Bench case", "client_name": "Bench",
+                 "open_date": "2026-01-01", "close_date": None if i % 4 else "2026-02-01",
+                 "owner": "analyst", "state_name": "Open"} for i in range(1, _CASE_LIST_SIZE + 1)
+            ], query)
+            return 200, self._body(("cases", variant), build), None
+
+        cid = query.get("cid")
+        if len(parts) == 4 and parts[:3] == ["api", "v2", "cases"] and parts[3].isdigit():
+            case_id = int(parts[3])
+            return 200, self._body(("case", case_id), lambda: {"status": "success", "data": {
+                "case_id": case_id, "case_name": f"#{case_id} - Bench case",
+                "case_description": "Generated by bench/fake_iris.py", "client_name": "Bench",
+                "open_date": "2026-01-01", "rows_per_entity": self.size_of(case_id)}}), _STAMP
+        if (len(parts) == 5 and parts[:3] == ["api", "v2", "cases"] and parts[3].isdigit()
+                and parts[4] in _PAGED):
+            case_id, entity = int(parts[3]), parts[4]
+            n = self.size_of(case_id)
+            build, variant = self._paged(lambda: _PAGED[entity](case_id, n), query,
+                                         _UPDATE_FIELDS.get(entity))
+            return 200, self._body((entity, case_id, variant), build), None
+        if path == "/case/timeline/events/list" and cid and cid.isdigit():
+            case_id = int(cid)
+            return 200, self._body(("events", case_id), lambda: {
+                "status": "success", "data": {"timeline": _events(case_id, self.size_of(case_id))}
+            }), _STAMP
+        if path == "/case/notes/directories/filter" and cid and cid.isdigit():
+            case_id = int(cid)
+            n = self.size_of(case_id)
+            return 200, self._body(("notes", case_id), lambda: {"status": "success", "data": [
+                {"name": f"Directory {d}", "notes": [
+                    {"id": i, "title": f"Note {i}", "content": f"Finding {i} of case {case_id}"}
+                    for i in range(d * 100 + 1, min(n, d * 100 + 100) + 1)]}
+                for d in range(-(-n // 100))]}), _STAMP
+        return 404, None, None
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.requests += 1
+                time.sleep(fake.latency)
+                url = urlsplit(self.path)
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                status, body, etag = fake.respond(url.path, query)
+                if etag and self.headers.get("If-None-Match") == f'"{etag}"':
+                    status, body = 304, b""
+                body = body if body is not None else b'{"status": "error"}'
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", f'"{etag}"')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--rows", type=int, default=100, help="rows per entity of every case")
+    parser.add_argument("--size", action="append", default=[], metavar="CASE=ROWS",
+                        help="rows per entity of one case (repeatable)")
+    args = parser.parse_args()
+
+    sizes = {int(case): int(rows) for case, rows in (s.split("=", 1) for s in args.size)}
+    fake = FakeIris(args.latency, args.rows, sizes, args.port)
+    print(f"Fake IRIS on {fake.url} (latency {args.latency}s, {args.rows} rows per entity)")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Concurrency benchmark: sync vs gthread gunicorn workers.
+
+Starts a fake IRIS that answers every request after a fixed delay, runs the
+explorer under gunicorn (gunicorn.conf.py) once per worker class and has N
+simulated analysts do cold entity loads (every request misses the cache)
+while a prober hits /health. Each analyst connects from its own loopback
+address so the per-IP rate limit applies per analyst, as in production.
+
+    python bench/load.py --users 16 --requests 4 --iris-delay 0.5
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _fake_iris(delay):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            rows = [{"asset_id": i, "asset_name": f"host-{i}", "date_update": "2026-01-01"}
+                    for i in range(20)]
+            body = json.dumps({"status": "success", "data": rows, "total": len(rows)}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", _free_port()), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _get(port, path, source="127.0.0.1"):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120,
+                                      source_address=(source, 0))
+    started = time.perf_counter()
+    try:
+        conn.request("GET", path)
+        status = conn.getresponse().status
+    finally:
+        conn.close()
+    return status, time.perf_counter() - started
+
+
+def _start_app(worker_class, args, iris_port):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        WEB_BIND=f"127.0.0.1:{port}",
+        WEB_WORKER_CLASS=worker_class,
+        WEB_CONCURRENCY=str(args.workers),
+        WEB_THREADS=str(args.threads),
+        IRIS_URL=f"http://127.0.0.1:{iris_port}",
+        IRIS_API_KEY="bench",
+        SECRET_KEY="bench",
+        CACHE_BACKEND="memory",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "app:create_app()"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if _get(port, "/health")[0] == 200:
+                return proc, port
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"gunicorn ({worker_class}) did not start")
+
+
+def _pct(values, q):
+    if not values:
+        return float("nan")
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+
+def run(worker_class, args, iris_port, case_ids):
+    proc, port = _start_app(worker_class, args, iris_port)
+    try:
+        stop = threading.Event()
+        health = []
+
+        def probe():
+            while not stop.is_set():
+                health.append(_get(port, "/health")[1])
+                time.sleep(0.1)
+
+        def analyst(user):
+            source = f"127.0.1.{user + 1}"
+            results = []
+            for _ in range(args.requests):
+                path = f"/api/dt/case/{next(case_ids)}/assets?draw=1&start=0&length=25"
+                results.append(_get(port, path, source))
+            return results
+
+        prober = threading.Thread(target=probe, daemon=True)
+        prober.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            results = [r for user in pool.map(analyst, range(args.users)) for r in user]
+        elapsed = time.perf_counter() - started
+        stop.set()
+        prober.join()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    latencies = [t for status, t in results if status == 200]
+    errors = sum(1 for status, _ in results if status != 200)
+    print(f"{worker_class:8s} {len(results) / elapsed:7.1f} req/s  "
+          f"p50 {_pct(latencies, 50) * 1000:7.0f} ms  p95 {_pct(latencies, 95) * 1000:7.0f} ms  "
+          f"errors {errors:3d}  |  /health p50 {_pct(health, 50) * 1000:6.0f} ms  "
+          f"max {max(health, default=0) * 1000:6.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=16, help="concurrent analysts")
+    parser.add_argument("--requests", type=int, default=4, help="cold loads per analyst")
+    parser.add_argument("--iris-delay", type=float, default=0.5,
+                        help="seconds the fake IRIS takes per request")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--modes", default="sync,gthread")
+    args = parser.parse_args()
+
+    iris = _fake_iris(args.iris_delay)
+    case_ids = itertools.count(1)
+    print(f"{args.users} analysts x {args.requests} cold loads, IRIS delay {args.iris_delay}s, "
+          f"{args.workers} workers ({args.threads} threads for gthread)")
+    try:
+        for mode in args.modes.split(","):
+            run(mode.strip(), args, iris.server_address[1], case_ids)
+    finally:
+        iris.shutdown()
+
+
+if __name__ == "__main__":
+    main()
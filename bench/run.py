@@ -0,0 +1,388 @@
+"""Benchmark suite: hot-path scenarios against a local IRIS stand-in.
+
+Starts bench/fake_iris.py in-process and the explorer under gunicorn
+(gunicorn.conf.py), runs the selected scenarios and reports p50/p95/p99
+latency and throughput per scenario:
+
+    cold_open        case page + tab counts + first table, every case uncached
+    dt_1k/10k/100k   DataTables search/sort/paginate draws on a warm case with
+                     that many timeline events
+    refresh_storm    every user auto-refreshes every table of one case at once
+    ss_keyset        Shadowserver deep paging following the keyset cursors
+    ss_offset        the same pages requested by OFFSET (start=) only
+
+The Shadowserver scenarios need --shadowserver and a database seeded with
+bench/ss_seed.py (SS_DB_* variables as for the explorer). Results can be
+written as JSON and compared against a stored baseline; the exit status is
+1 when a scenario regressed beyond --tolerance.
+
+    python bench/run.py --save-baseline bench/baseline.json
+    python bench/run.py --baseline bench/baseline.json --tolerance 0.15
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_iris import FakeIris  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+ENTITIES = ("assets", "iocs", "events", "tasks", "notes", "evidences")
+# Timeline columns of the DataTables scenarios (columns[N][data])
+_EVENT_COLUMNS = ("event_id", "event_date", "event_title", "event_source", "event_content")
+_DT_SIZES = {"dt_1k": (901, 1_000), "dt_10k": (902, 10_000), "dt_100k": (903, 100_000)}
+_STORM_CASE = 904
+_FIRST_COLD_CASE = 10_000
+
+_sources = itertools.count()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _source():
+    # Every request from its own loopback address: the per-IP rate limit
+    # (120/min) must not throttle the benchmark
+    n = next(_sources)
+    return f"127.{2 + n // 64516 % 250}.{1 + n // 254 % 254}.{1 + n % 254}"
+
+
+def _get(port, path):
+    """(status, seconds, body) of one GET on a fresh connection."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300,
+                                      source_address=(_source(), 0))
+    started = time.perf_counter()
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        body = resp.read()
+        status = resp.status
+    finally:
+        conn.close()
+    return status, time.perf_counter() - started, body
+
+
+def _start_app(args, iris):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        WEB_BIND=f"127.0.0.1:{port}",
+        WEB_WORKER_CLASS="gthread",
+        WEB_CONCURRENCY=str(args.workers),
+        WEB_THREADS=str(args.threads),
+        WEB_TIMEOUT="300",
+        IRIS_URL=iris.url,
+        IRIS_API_KEY="bench",
+        SECRET_KEY="bench",
+        CACHE_BACKEND="memory",
+        LIVE_UPDATES="false",
+        SS_ENABLED="true" if args.shadowserver else "false",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "app:create_app()"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if _get(port, "/health")[0] == 200:
+                return proc, port
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("gunicorn did not start")
+
+
+def _warm(ctx, path):
+    """Load ``path`` into every worker's cache: concurrent requests spread over the workers."""
+    with ThreadPoolExecutor(max_workers=ctx.args.workers * 4) as pool:
+        results = list(pool.map(lambda _: _get(ctx.port, path), range(ctx.args.workers * 4)))
+    return max(status for status, _, _ in results), max(seconds for _, seconds, _ in results)
+
+
+def _dt_params(draw, start=0, length=25, search="", order=0, direction="asc", filters=None):
+    params = {"draw": draw, "start": start, "length": length, "search[value]": search,
+              "order[0][column]": order, "order[0][dir]": direction}
+    for i, column in enumerate(_EVENT_COLUMNS):
+        params[f"columns[{i}][data]"] = column
+        params[f"columns[{i}][search][value]"] = (filters or {}).get(column, "")
+    return urlencode(params)
+
+
+def _dt_variants(rows):
+    """Mix of draws an analyst makes: paging, sorting both ways, search, column filter."""
+    pages = max(1, rows // 25)
+    variants = []
+    for i in range(40):
+        kind = i % 4
+        if kind == 0:
+            variants.append(dict(start=(i * 7919 % pages) * 25))
+        elif kind == 1:
+            variants.append(dict(order=i // 4 % len(_EVENT_COLUMNS),
+                                 direction=("asc", "desc")[i // 4 % 2]))
+        elif kind == 2:
+            variants.append(dict(search=("user7", "host-", "spawned by user1", "siem")[i // 4 % 4]))
+        else:
+            variants.append(dict(filters={"event_source": ("EDR", "SIEM", "Analyst")[i // 4 % 3]},
+                                 order=1, direction="desc"))
+    return variants
+
+
+# ── Scenarios ───────────────────────────────────────────────────
+#
+# Each returns a callable run once per iteration (on --users threads) that
+# yields (status, seconds) samples.
+
+def scenario_cold_open(ctx):
+    case_ids = itertools.count(_FIRST_COLD_CASE)
+    lock = threading.Lock()
+
+    def once(_):
+        with lock:
+            case_id = next(case_ids)
+        started = time.perf_counter()
+        status = _get(ctx.port, f"/case/{case_id}")[0]
+        # The explorer page loads the tab counts and the first table together
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            statuses = list(pool.map(lambda path: _get(ctx.port, path)[0], (
+                f"/api/case/{case_id}/counts",
+                f"/api/dt/case/{case_id}/assets?{_dt_params(1)}",
+            )))
+        return [(max([status] + statuses), time.perf_counter() - started)]
+
+    return once
+
+
+def _scenario_dt(name):
+    def factory(ctx):
+        case_id, rows = _DT_SIZES[name]
+        ctx.iris.sizes[case_id] = rows
+        status, seconds = _warm(ctx, f"/api/dt/case/{case_id}/events?{_dt_params(1)}")
+        print(f"  {name}: first load of {rows} events {seconds * 1000:.0f} ms (HTTP {status})")
+        variants = _dt_variants(rows)
+
+        def once(i):
+            path = f"/api/dt/case/{case_id}/events?{_dt_params(i + 2, **variants[i % len(variants)])}"
+            return [_get(ctx.port, path)[:2]]
+
+        return once
+
+    return factory
+
+
+def scenario_refresh_storm(ctx):
+    for entity in ENTITIES:
+        _warm(ctx, f"/api/dt/case/{_STORM_CASE}/{entity}?{_dt_params(1)}")
+
+    def once(i):
+        return [_get(ctx.port, f"/api/dt/case/{_STORM_CASE}/{entity}?refresh=auto&{_dt_params(i + 2)}")[:2]
+                for entity in ENTITIES]
+
+    return once
+
+
+def _scenario_ss(keyset):
+    def factory(ctx):
+        def once(_):
+            samples = []
+            cursor = None
+            for page in range(ctx.args.pages):
+                path = (f"/api/dt/shadowserver?draw={page + 1}&start={page * 100}&length=100"
+                        f"&order_column=report_date&order_dir=desc")
+                if keyset and cursor:
+                    path += f"&cursor={cursor}"
+                status, seconds, body = _get(ctx.port, path)
+                samples.append((status, seconds))
+                if status != 200:
+                    break
+                cursor = (json.loads(body).get("cursors") or {}).get("next")
+            return samples
+
+        return once
+
+    return factory
+
+
+SCENARIOS = {
+    "cold_open": scenario_cold_open,
+    "dt_1k": _scenario_dt("dt_1k"),
+    "dt_10k": _scenario_dt("dt_10k"),
+    "dt_100k": _scenario_dt("dt_100k"),
+    "refresh_storm": scenario_refresh_storm,
+    "ss_keyset": _scenario_ss(keyset=True),
+    "ss_offset": _scenario_ss(keyset=False),
+}
+_DEFAULT_SCENARIOS = "cold_open,dt_1k,dt_10k,dt_100k,refresh_storm"
+
+
+# ── Measurement and reporting ───────────────────────────────────
+
+class _Context:
+    def __init__(self, args, iris, port):
+        self.args = args
+        self.iris = iris
+        self.port = port
+
+
+def _pct(values, q):
+    if not values:
+        return float("nan")
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+
+def measure(name, ctx):
+    once = SCENARIOS[name](ctx)
+    upstream = ctx.iris.requests
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=ctx.args.users) as pool:
+        samples = [s for batch in pool.map(once, range(ctx.args.iterations)) for s in batch]
+    elapsed = time.perf_counter() - started
+    latencies = [seconds for status, seconds in samples if status == 200]
+    return {
+        "samples": len(samples),
+        "errors": sum(1 for status, _ in samples if status != 200),
+        "throughput": round(len(samples) / elapsed, 2),
+        "p50_ms": round(_pct(latencies, 50) * 1000, 1),
+        "p95_ms": round(_pct(latencies, 95) * 1000, 1),
+        "p99_ms": round(_pct(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0) * 1000, 1),
+        "upstream_calls": ctx.iris.requests - upstream,
+    }
+
+
+def _print_results(results):
+    print(f"\n{'scenario':14s} {'samples':>7s} {'err':>4s} {'ops/s':>8s} "
+          f"{'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'max ms':>8s} {'IRIS':>6s}")
+    for name, r in results.items():
+        print(f"{name:14s} {r['samples']:7d} {r['errors']:4d} {r['throughput']:8.1f} "
+              f"{r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {r['max_ms']:8.1f} "
+              f"{r['upstream_calls']:6d}")
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Print changes against ``baseline``; returns the names of regressed scenarios.
+
+    A latency percentile regresses when it grew by more than ``tolerance``
+    and by more than ``min_delta_ms`` (timer noise on fast scenarios).
+    """
+    regressed = []
+    print(f"\nAgainst baseline from {baseline['meta'].get('timestamp', '?')} "
+          f"(tolerance {tolerance:.0%}):")
+    for name, r in results.items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            print(f"  {name:14s} not in baseline")
+            continue
+        changes = {}
+        worse = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput"):
+            if not old[key]:
+                continue
+            changes[key] = change = (r[key] - old[key]) / old[key]
+            if key == "throughput":
+                if change < -tolerance:
+                    worse.append(key)
+            elif change > tolerance and r[key] - old[key] > min_delta_ms:
+                worse.append(key)
+        if worse or r["errors"] > old["errors"]:
+            regressed.append(name)
+        print(f"  {name:14s} " + "  ".join(f"{key} {change:+.0%}" for key, change in changes.items())
+              + ("  REGRESSED" if name in regressed else ""))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=_DEFAULT_SCENARIOS,
+                        help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--users", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--iterations", type=int, default=80, help="iterations per scenario")
+    parser.add_argument("--pages", type=int, default=50, help="pages per Shadowserver walk")
+    parser.add_argument("--iris-latency", type=float, default=0.05,
+                        help="seconds the fake IRIS takes per request")
+    parser.add_argument("--rows", type=int, default=200, help="rows per entity of other cases")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--shadowserver", action="store_true",
+                        help="enable Shadowserver (database seeded with bench/ss_seed.py)")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write results as the new baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed relative slowdown before a scenario counts as regressed")
+    parser.add_argument("--min-delta-ms", type=float, default=10.0,
+                        help="latency growth below this many ms never counts as a regression")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    if any(n.startswith("ss_") for n in names) and not args.shadowserver:
+        parser.error("Shadowserver scenarios need --shadowserver")
+
+    iris = FakeIris(args.iris_latency, args.rows).start()
+    proc, port = _start_app(args, iris)
+    ctx = _Context(args, iris, port)
+    print(f"{args.users} clients x {args.iterations} iterations, IRIS latency {args.iris_latency}s, "
+          f"{args.workers} workers x {args.threads} threads")
+    results = {}
+    try:
+        for name in names:
+            print(f"Running {name} ...")
+            results[name] = measure(name, ctx)
+    finally:
+        proc.terminate()
+        proc.wait()
+        iris.stop()
+
+    _print_results(results)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items()
+                     if k not in ("output", "save_baseline", "baseline", "tolerance",
+                                  "min_delta_ms")},
+        },
+        "scenarios": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Wrote {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        differing = {k: v for k, v in report["meta"]["args"].items()
+                     if k != "scenarios" and baseline["meta"].get("args", {}).get(k, v) != v}
+        if differing:
+            print(f"\nNote: baseline was recorded with different settings ({', '.join(differing)})")
+        regressed = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
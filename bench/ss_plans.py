@@ -0,0 +1,122 @@
+"""EXPLAIN the Shadowserver page statements and flag sorts.
+
+Pages through ``ss_events`` on the default sort with the keyset cursors,
+then EXPLAINs the statements of the first page, the next and prev seeks at
+``--depth`` pages and the OFFSET fallback there. A keyset statement whose
+plan contains a Sort node (a top-N sort of the whole table instead of an
+index range scan) fails the run. Needs the database from bench/ss_seed.py
+with ``--ddl`` (the ss_events_report_date_id index); connection settings
+come from the SS_DB_* variables.
+
+    SS_DB_HOST=localhost SS_DB_USER=postgres python bench/ss_plans.py --depth 200
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import psycopg2.extras
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.shadowserver_db import _fetch_page  # noqa: E402
+from ss_seed import _connect  # noqa: E402
+
+
+class _Recorder:
+    """Cursor wrapper remembering the statements _fetch_page runs."""
+
+    def __init__(self, cur):
+        self.cur = cur
+        self.statements = []
+
+    def execute(self, sql, params):
+        self.statements.append((sql, list(params)))
+        self.cur.execute(sql, params)
+
+    def fetchall(self):
+        return self.cur.fetchall()
+
+
+def _nodes(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _nodes(child)
+
+
+def _explain(cur, sql, params):
+    cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+    plan = cur.fetchone()["QUERY PLAN"]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return list(_nodes(plan[0]["Plan"]))
+
+
+def _describe(nodes):
+    parts = []
+    for node in nodes:
+        name = node["Node Type"]
+        if node.get("Index Name"):
+            name += f" {node.get('Scan Direction', '')} on {node['Index Name']}".replace("  ", " ")
+        parts.append(name)
+    return " > ".join(parts)
+
+
+def check(cur, direction, depth, length):
+    """[(label, keyset?, plan nodes)] for one sort direction of report_date."""
+    recorder = _Recorder(cur)
+    start, cursor, cursors = 0, None, {}
+    for _ in range(depth):
+        rows, cursors = _fetch_page(recorder, "", [], "report_date", direction,
+                                    start, length, cursor)
+        if not rows or not cursors["next"]:
+            break
+        start, cursor = start + len(rows), cursors["next"]
+    first = recorder.statements[0]
+
+    recorder.statements.clear()
+    _fetch_page(recorder, "", [], "report_date", direction, start, length, cursor)
+    seek_next = list(recorder.statements)
+    recorder.statements.clear()
+    _fetch_page(recorder, "", [], "report_date", direction, start - length, length,
+                cursors["prev"])
+    seek_prev = list(recorder.statements)
+    recorder.statements.clear()
+    _fetch_page(recorder, "", [], "report_date", direction, start, length)
+    offset = recorder.statements[0]
+
+    results = [(f"first page ({direction})", True, _explain(cur, *first))]
+    for label, statements in ((f"next at row {start} ({direction})", seek_next),
+                              (f"prev at row {start} ({direction})", seek_prev)):
+        for sql, params in statements:
+            results.append((label, True, _explain(cur, sql, params)))
+    results.append((f"OFFSET {start} ({direction})", False, _explain(cur, *offset)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--depth", type=int, default=100, help="pages to walk before checking")
+    parser.add_argument("--length", type=int, default=100, help="rows per page")
+    args = parser.parse_args()
+
+    conn = _connect()
+    failed = False
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        for direction in ("desc", "asc"):
+            for label, keyset, nodes in check(cur, direction, args.depth, args.length):
+                sorted_ = any(node["Node Type"] in ("Sort", "Incremental Sort")
+                              for node in nodes)
+                verdict = "SORT" if sorted_ else "ok"
+                if keyset and sorted_:
+                    failed = True
+                elif not keyset:
+                    verdict = "info"
+                print(f"{verdict:5} {label:32} {_describe(nodes)}")
+    conn.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Seed a local PostgreSQL with synthetic Shadowserver events for benchmarks.
+
+Creates ``ss_events`` and ``ss_ingestion_log`` (the tables the ingestor
+owns in production) and fills them server-side with generate_series, so
+millions of rows load in seconds. ``--ddl`` also applies the explorer's
+search indexes and daily rollup (``flask shadowserver ddl``). Connection
+settings come from the SS_DB_* variables, as for the explorer itself.
+
+    SS_DB_HOST=localhost SS_DB_USER=postgres python bench/ss_seed.py --events 1000000 --ddl
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.shadowserver_db import ROLLUP_DDL, SEARCH_DDL  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ss_events (
+    id BIGSERIAL PRIMARY KEY,
+    report_type TEXT,
+    report_date DATE,
+    ip INET,
+    port INTEGER,
+    asn INTEGER,
+    geo TEXT,
+    hostname TEXT,
+    tag TEXT,
+    severity TEXT,
+    raw_data JSONB,
+    ingested_at TIMESTAMPTZ DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ss_events_report_date ON ss_events (report_date);
+CREATE INDEX IF NOT EXISTS ss_events_ip ON ss_events (ip);
+CREATE INDEX IF NOT EXISTS ss_events_hostname ON ss_events (hostname);
+
+CREATE TABLE IF NOT EXISTS ss_ingestion_log (
+    id BIGSERIAL PRIMARY KEY,
+    run_started TIMESTAMPTZ,
+    run_finished TIMESTAMPTZ,
+    status TEXT,
+    reports_found INTEGER,
+    events_ingested INTEGER,
+    events_skipped INTEGER,
+    error_message TEXT
+);
+"""
+
+# Deterministic pseudo-random events spread over --days report dates
+SEED = """
+INSERT INTO ss_events (report_type, report_date, ip, port, asn, geo, hostname, tag, severity, raw_data)
+SELECT (ARRAY['scan_http', 'scan_ssh', 'botnet_drone', 'sinkhole_http', 'open_resolver',
+              'scan_rdp', 'device_id', 'compromised_website'])[1 + g %% 8],
+       current_date - (g %% %(days)s),
+       ('10.' || (g / 65536) %% 256 || '.' || (g / 256) %% 256 || '.' || g %% 256)::inet,
+       (ARRAY[22, 80, 443, 3389, 53, 8080])[1 + g %% 6],
+       64500 + g %% 500,
+       (ARRAY['DE', 'AT', 'CH', 'NL', 'FR'])[1 + g %% 5],
+       CASE WHEN g %% 3 = 0 THEN 'host' || g %% 50000 || '.example.org' END,
+       (ARRAY['mirai', 'emotet', 'qakbot', 'cve-2024-3400', 'ssh-bruteforce'])[1 + g %% 5],
+       (ARRAY['low', 'medium', 'high', 'critical'])[1 + g %% 4],
+       jsonb_build_object('seq', g, 'protocol', 'tcp', 'naics', 518210 + g %% 7)
+FROM generate_series(1, %(events)s) AS g
+"""
+
+
+def _connect():
+    return psycopg2.connect(
+        host=os.environ.get("SS_DB_HOST", "localhost"),
+        port=int(os.environ.get("SS_DB_PORT", "5432")),
+        dbname=os.environ.get("SS_DB_NAME", "shadowserver_db"),
+        user=os.environ.get("SS_DB_USER", "postgres"),
+        password=os.environ.get("SS_DB_PASSWORD", ""),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=90, help="report dates the events spread over")
+    parser.add_argument("--reset", action="store_true", help="drop existing bench tables first")
+    parser.add_argument("--ddl", action="store_true",
+                        help="apply the explorer's search indexes and rollup")
+    args = parser.parse_args()
+
+    conn = _connect()
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        if args.reset:
+            cur.execute("DROP MATERIALIZED VIEW IF EXISTS ss_events_daily; "
+                        "DROP TABLE IF EXISTS ss_events, ss_ingestion_log, ss_rollup_state")
+        cur.execute(SCHEMA)
+        started = time.perf_counter()
+        cur.execute(SEED, {"events": args.events, "days": args.days})
+        cur.execute("""
+            INSERT INTO ss_ingestion_log (run_started, run_finished, status, reports_found,
+                                          events_ingested, events_skipped)
+            VALUES (now() - interval '5 minutes', now(), 'success', 8, %s, 0)
+        """, (args.events,))
+        print(f"Inserted {args.events} events in {time.perf_counter() - started:.1f}s")
+        if args.ddl:
+            # CREATE INDEX CONCURRENTLY cannot share a transaction: one statement at a time
+            for statement in SEARCH_DDL.split(";\n"):
+                if statement.strip() and not all(
+                        line.startswith("--") for line in statement.strip().splitlines()):
+                    cur.execute(statement)
+            cur.execute(ROLLUP_DDL.replace("{viewer}", conn.info.user))
+            cur.execute("SELECT ss_refresh_rollups()")
+            print("Applied search DDL and rollup")
+        cur.execute("ANALYZE ss_events")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
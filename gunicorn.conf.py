@@ -0,0 +1,20 @@
+"""Gunicorn settings, overridable from the environment.
+
+The default ``gthread`` worker serves each request on a thread of a small
+worker pool, so a cold case load waiting on IRIS or a slow Shadowserver
+query only occupies one thread and ``/health`` and other users keep being
+served. ``WEB_WORKER_CLASS=sync`` restores one request per worker process.
+"""
+
+import os
+
+bind = os.environ.get("WEB_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = os.environ.get("WEB_WORKER_CLASS", "gthread")
+# Requests served concurrently per worker; keep DB_POOL_SIZE / SS_DB_POOL_SIZE
+# at least this large in database mode. Gunicorn silently turns sync workers
+# with more than one thread into gthread workers, so sync gets exactly one.
+threads = int(os.environ.get("WEB_THREADS", "8")) if worker_class == "gthread" else 1
+timeout = int(os.environ.get("WEB_TIMEOUT", "120"))
+# Idle keep-alive connections hold a thread; release them quickly
+keepalive = int(os.environ.get("WEB_KEEPALIVE", "5"))
@@ -0,0 +1,13 @@
+import pytest
+from flask import Flask
+
+from app.config import Config
+
+
+@pytest.fixture
+def app():
+    """A bare app carrying the default configuration, with its context pushed."""
+    app = Flask("tests")
+    app.config.from_object(Config)
+    with app.app_context():
+        yield app
@@ -0,0 +1,260 @@
+import collections
+import itertools
+import threading
+import weakref
+
+import psycopg2
+import pytest
+from flask import Flask
+from psycopg2.extensions import (TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INERROR,
+                                 TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_UNKNOWN)
+
+from app import db_pool, metrics
+from app.db_pool import Pool, PoolTimeout
+
+
+class _Info:
+    transaction_status = TRANSACTION_STATUS_IDLE
+
+
+class _Conn:
+    def __init__(self):
+        self.closed = 0
+        self.info = _Info()
+        self.rollbacks = 0
+        self.fail_rollback = False
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise psycopg2.OperationalError("server closed the connection")
+        self.rollbacks += 1
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def opened():
+    return []
+
+
+@pytest.fixture
+def pool(opened):
+    def connect():
+        conn = _Conn()
+        opened.append(conn)
+        return conn
+
+    return Pool("test", connect, maxconn=2, timeout=0.2, recycle=0, ping_after=60)
+
+
+def test_returned_connection_is_reused(pool, opened):
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert len(opened) == 1
+    assert pool.stats()["in_use"] == 1
+
+
+@pytest.mark.parametrize("status", [TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_INERROR])
+def test_open_transaction_is_rolled_back(pool, status):
+    conn = pool.getconn()
+    conn.info.transaction_status = status
+    pool.putconn(conn)
+    assert conn.rollbacks == 1 and not conn.closed
+    assert pool.getconn() is conn
+
+
+def test_failed_rollback_discards_connection(pool, opened):
+    conn = pool.getconn()
+    conn.info.transaction_status = TRANSACTION_STATUS_INERROR
+    conn.fail_rollback = True
+    pool.putconn(conn)
+    assert conn.closed
+    assert pool.stats()["open"] == 0
+    assert pool.getconn() is not conn
+    assert len(opened) == 2
+
+
+@pytest.mark.parametrize("broken", ["unknown", "closed", "close"])
+def test_broken_connection_frees_its_slot(pool, broken):
+    conn = pool.getconn()
+    other = pool.getconn()
+    if broken == "unknown":
+        conn.info.transaction_status = TRANSACTION_STATUS_UNKNOWN
+    elif broken == "closed":
+        conn.closed = 2
+    pool.putconn(conn, close=broken == "close")
+    assert conn.closed
+    stats = pool.stats()
+    assert (stats["open"], stats["idle"]) == (1, 0)
+    fresh = pool.getconn()  # would time out if the slot had leaked
+    assert fresh is not conn and fresh is not other
+
+
+def test_failed_connect_frees_its_slot():
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise psycopg2.OperationalError("could not connect")
+        return _Conn()
+
+    pool = Pool("test", connect, maxconn=1, timeout=0.2, recycle=0, ping_after=60)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    assert pool.stats()["open"] == 0
+    assert pool.getconn() is not None
+
+
+def test_checkout_times_out_when_exhausted(pool):
+    held = [pool.getconn(), pool.getconn()]
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()["timeouts"] == 1
+    pool.putconn(held.pop())
+    assert pool.getconn() is not None
+
+
+def test_waiter_gets_returned_connection(pool):
+    held = [pool.getconn(), pool.getconn()]
+    pool.timeout = 5
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+    waiter.start()
+    pool.putconn(held[0])
+    waiter.join(5)
+    assert got == [held[0]]
+
+
+def test_request_connection_returned_on_error(monkeypatch, pool):
+    app = Flask("tests")
+    db_pool.init_app(app)
+    app.extensions["db_pools"] = {"test": pool}
+    monkeypatch.setattr(db_pool, "get_pool", lambda name, connect_kwargs: pool)
+
+    @app.route("/boom")
+    def boom():
+        conn = db_pool.request_conn("test", dict)
+        assert db_pool.request_conn("test", dict) is conn
+        conn.info.transaction_status = TRANSACTION_STATUS_INERROR
+        raise RuntimeError("query failed")
+
+    assert app.test_client().get("/boom").status_code == 500
+    stats = pool.stats()
+    assert stats["in_use"] == 0 and stats["idle"] == 1
+    assert pool.getconn().rollbacks == 1
+
+
+class _PgError(psycopg2.ProgrammingError):
+    def __init__(self, pgcode):
+        super().__init__(f"error {pgcode}")
+        self.code = pgcode
+
+    pgcode = property(lambda self: self.code)
+
+
+class _Cursor:
+    name = None
+    closed = False
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, query, vars=None):
+        self.connection.sent.append(query)
+        if query.startswith("EXECUTE") and self.connection.fail:
+            raise _PgError(self.connection.fail.pop(0))
+
+
+class _PreparingConn:
+    """Stands in for a pooled connection; statement handling is the real one's."""
+
+    _real = db_pool.connection_factory("test", 2, 10)
+    statement = _real.statement
+    discard_statement = _real.discard_statement
+    autocommit = False
+
+    def __init__(self):
+        self.prepared = collections.OrderedDict()
+        self.executions = {}
+        self.statement_ids = itertools.count(1)
+        self.named_cursors = weakref.WeakSet()
+        self.sent = []
+        self.fail = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return db_pool._preparing_cursor_class(_Cursor)(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+_QUERY = "SELECT a FROM t WHERE id = %s"
+
+
+def _retried():
+    return metrics._counters.get(("db_prepared_statements_total",
+                                  (("db", "test"), ("result", "retried"))), 0)
+
+
+@pytest.fixture
+def prepared_conn(monkeypatch):
+    monkeypatch.setattr(db_pool, "_unpreparable", collections.OrderedDict())
+    conn = _PreparingConn()
+    for i in range(2):
+        conn.cursor().execute(_QUERY, [i])
+    assert conn.prepared == {_QUERY: "ide_1"}
+    conn.sent.clear()
+    return conn
+
+
+def test_parameter_type_error_retries_unprepared(prepared_conn):
+    retried = _retried()
+    prepared_conn.fail.append("42804")
+    prepared_conn.cursor().execute(_QUERY, [3])
+    assert prepared_conn.sent == ["EXECUTE ide_1 (%s)", "DEALLOCATE ide_1", _QUERY]
+    assert prepared_conn.rollbacks == 1 and not prepared_conn.prepared
+    assert _retried() == retried + 1
+    # The shape is refused from now on
+    prepared_conn.sent.clear()
+    for i in range(3):
+        prepared_conn.cursor().execute(_QUERY, [i])
+    assert prepared_conn.sent == [_QUERY] * 3
+
+
+def test_stale_plan_is_prepared_again(prepared_conn):
+    prepared_conn.fail.append("0A000")
+    prepared_conn.cursor().execute(_QUERY, [3])
+    assert prepared_conn.sent == ["EXECUTE ide_1 (%s)", "DEALLOCATE ide_1", _QUERY]
+    prepared_conn.sent.clear()
+    for i in range(2):
+        prepared_conn.cursor().execute(_QUERY, [i])
+    assert prepared_conn.prepared == {_QUERY: "ide_2"}
+    assert prepared_conn.sent[-1] == "EXECUTE ide_2 (%s)"
+
+
+def test_other_errors_are_raised(prepared_conn):
+    prepared_conn.fail.append("57014")  # query_canceled
+    with pytest.raises(psycopg2.ProgrammingError):
+        prepared_conn.cursor().execute(_QUERY, [3])
+    assert prepared_conn.prepared == {_QUERY: "ide_1"} and not prepared_conn.rollbacks
+
+
+def test_no_retry_with_open_named_cursor(prepared_conn):
+    named = _Cursor(prepared_conn)
+    named.name = "export"
+    prepared_conn.named_cursors.add(named)
+    prepared_conn.fail.append("0A000")
+    with pytest.raises(psycopg2.ProgrammingError):
+        prepared_conn.cursor().execute(_QUERY, [3])
+    assert not prepared_conn.rollbacks and not prepared_conn.prepared
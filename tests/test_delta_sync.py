@@ -0,0 +1,145 @@
+import time
+
+import pytest
+
+from app import iris_api
+
+
+class _FakeIris:
+    """Paginated v2 asset list, ordered by ``order_by`` when asked to."""
+
+    def __init__(self, rows, honours_order=True):
+        self.rows = rows
+        self.honours_order = honours_order
+        self.requests = []
+
+    def get(self, path, params=None):
+        self.requests.append(dict(params))
+        rows = list(self.rows)
+        if params.get("order_by") and self.honours_order:
+            rows.sort(key=lambda row: row[params["order_by"]],
+                      reverse=params.get("sort_dir") == "desc")
+        page, per_page = params["page"], params["per_page"]
+        return {"data": rows[(page - 1) * per_page:page * per_page], "total": len(rows)}
+
+
+def _asset(asset_id, updated, name=None):
+    return {"asset_id": asset_id, "date_update": f"2026-10-{updated:02d}T00:00:00",
+            "asset_name": name or f"asset-{asset_id}"}
+
+
+@pytest.fixture
+def iris(app, monkeypatch):
+    app.config.update(IRIS_PAGE_SIZE=3, IRIS_DELTA_SYNC=True, CACHE_TTL=300)
+    monkeypatch.setattr(iris_api, "get_api_key", lambda: "key")
+    monkeypatch.setattr(iris_api, "_delta_unsupported", set())
+    fake = _FakeIris([_asset(i, i) for i in range(1, 11)])
+    monkeypatch.setattr(iris_api, "_get", fake.get)
+    return fake
+
+
+def _full_fetch():
+    return iris_api._fetch_paginated_entity("/api/v2/cases/1/assets", "assets", None)
+
+
+def _refresh(previous):
+    data, sync = previous
+    return iris_api._fetch_paginated_entity("/api/v2/cases/1/assets", "assets",
+                                            {"data": data, "sync": sync})
+
+
+def test_full_fetch_records_watermark(iris):
+    rows, sync = _full_fetch()
+    assert [row["asset_id"] for row in rows] == list(range(1, 11))
+    assert sync["watermark"] == "2026-10-10T00:00:00"
+
+
+def test_unchanged_rows_keep_the_cached_list(iris):
+    previous = _full_fetch()
+    iris.requests.clear()
+    rows, sync = _refresh(previous)
+    assert rows is previous[0]
+    assert sync == previous[1]
+    assert len(iris.requests) == 1  # only the first newest-first page
+
+
+def test_changed_and_new_rows_are_merged(iris):
+    previous = _full_fetch()
+    iris.rows[3] = _asset(4, 12, "renamed")
+    iris.rows.append(_asset(11, 13))
+    rows, sync = _refresh(previous)
+    assert [row["asset_id"] for row in rows] == list(range(1, 12))
+    assert rows[3]["asset_name"] == "renamed"
+    assert rows[:3] == previous[0][:3]
+    assert previous[0][3]["asset_name"] == "asset-4"  # the cached list is not mutated
+    assert sync["watermark"] == "2026-10-13T00:00:00"
+    assert sync["full_at"] == previous[1]["full_at"]
+
+
+def test_changes_spanning_pages(iris):
+    previous = _full_fetch()
+    for i in range(4):
+        iris.rows[i] = _asset(i + 1, 20 + i, "changed")
+    iris.requests.clear()
+    rows, _ = _refresh(previous)
+    assert [row["asset_name"] for row in rows[:4]] == ["changed"] * 4
+    assert [row["asset_name"] for row in rows[4:]] == [f"asset-{i}" for i in range(5, 11)]
+    assert all(request.get("order_by") == "date_update" for request in iris.requests)
+    assert len(iris.requests) == 2
+
+
+def test_deleted_rows_force_a_full_fetch(iris):
+    previous = _full_fetch()
+    del iris.rows[2]
+    iris.requests.clear()
+    rows, _ = _refresh(previous)
+    assert [row["asset_id"] for row in rows] == [1, 2] + list(range(4, 11))
+    assert "order_by" in iris.requests[0]
+    assert sorted(request["page"] for request in iris.requests[1:]) == [1, 2, 3]
+    assert all("order_by" not in request for request in iris.requests[1:])
+
+
+def test_most_rows_changed_forces_a_full_fetch(iris):
+    previous = _full_fetch()
+    iris.rows = [_asset(i, 20 + i, "changed") for i in range(1, 11)]
+    iris.requests.clear()
+    rows, _ = _refresh(previous)
+    assert [row["asset_name"] for row in rows] == ["changed"] * 10
+    assert "order_by" not in iris.requests[-1]
+
+
+def test_unordered_endpoint_disables_delta(iris):
+    previous = _full_fetch()
+    iris.honours_order = False
+    iris.rows[0] = _asset(1, 20, "changed")
+    rows, _ = _refresh(previous)
+    assert rows[0]["asset_name"] == "changed"
+    assert "assets" in iris_api._delta_unsupported
+
+
+def test_stale_full_fetch_is_not_extended(iris):
+    data, sync = _full_fetch()
+    iris.requests.clear()
+    rows, new_sync = _refresh((data, dict(sync, full_at=time.time() - 301)))
+    assert rows == data and rows is not data
+    assert new_sync["full_at"] > sync["full_at"]
+    assert all("order_by" not in request for request in iris.requests)
+
+
+def test_not_modified_keeps_cached_data(app, monkeypatch):
+    class Response:
+        status_code = 304
+
+    monkeypatch.setattr(iris_api, "get_api_key", lambda: "key")
+    seen = {}
+
+    def get(path, api_key, params=None, headers=None):
+        seen.update(headers)
+        return Response()
+
+    monkeypatch.setattr(iris_api.iris_http, "get", get)
+    previous = {"data": [{"note_id": 1}], "sync": {"etag": '"v1"'}}
+    data, sync = iris_api._fetch_entity(1, "notes", previous)
+    assert data is previous["data"]
+    assert sync == {"etag": '"v1"'}
+    assert seen == {"If-None-Match": '"v1"'}
@@ -0,0 +1,107 @@
+import itertools
+import random
+
+import pytest
+
+from app import entity_store
+from app.entity_store import EntityStore
+
+
+def _sort_key(val):
+    if val is None:
+        return ""
+    return str(val).lower()
+
+
+def _old_query(rows, search="", column_filters=None, order_column=None,
+               order_dir="asc", start=0, length=25):
+    """The per-draw scan the DataTables endpoints ran before EntityStore."""
+    data = list(rows)
+    total = len(data)
+    search = search.lower()
+    if search:
+        data = [row for row in data
+                if any(v is not None and search in str(v).lower() for v in row.values())]
+    for col, val in (column_filters or {}).items():
+        val = val.lower()
+        if val:
+            data = [row for row in data
+                    if row.get(col) is not None and val in str(row[col]).lower()]
+    filtered = len(data)
+    if order_column and data:
+        data.sort(key=lambda r: _sort_key(r.get(order_column)), reverse=order_dir == "desc")
+    return total, filtered, data[start:start + length]
+
+
+def _rows():
+    rng = random.Random(7)
+    words = ["Alpha", "beta", "GAMMA", "delta", "10.0.0.1", "évasion", "ab", "Ünïcode"]
+    rows = []
+    for i in range(300):
+        row = {
+            "id": i,
+            "name": f"{rng.choice(words)}-{rng.choice(words)}",
+            "ioc_value": rng.choice([None, "", f"host{i % 17}.example", rng.choice(words)]),
+            "score": rng.choice([None, 1, 10, 2.5, "7"]),
+        }
+        if i % 5 == 0:
+            row["extra"] = "x" * 3000 + rng.choice(words)  # beyond the trigram index
+        if i % 11 == 0:
+            del row["ioc_value"]
+        rows.append(row)
+    return rows
+
+
+ROWS = _rows()
+SEARCHES = ["", "a", "ab", "alp", "ALPHA-beta", "host3", "10.0.", "xxxalpha", "évas", "nomatch", "7"]
+FILTERS = [None, {"name": "ga"}, {"ioc_value": "example"}, {"name": "beta", "score": "1"},
+           {"missing": "x"}, {"name": ""}]
+ORDERS = [(None, "asc"), ("name", "asc"), ("name", "desc"), ("score", "asc"),
+          ("ioc_value", "desc"), ("missing", "asc")]
+
+
+@pytest.mark.parametrize("search,column_filters", list(itertools.product(SEARCHES, FILTERS)))
+def test_filter_parity(search, column_filters):
+    store = EntityStore(ROWS)
+    for order_column, order_dir in ORDERS:
+        for start, length in ((0, 25), (40, 10), (290, 25), (500, 25)):
+            assert store.query(search, column_filters, order_column, order_dir,
+                               start, length) == \
+                _old_query(ROWS, search, column_filters, order_column, order_dir,
+                           start, length)
+
+
+def test_store_reused_per_fetch(app):
+    rows = [{"a": 1}]
+    store = entity_store.get_store("k:1:assets", rows)
+    assert entity_store.get_store("k:1:assets", rows) is store
+    assert entity_store.get_store("k:1:assets", list(rows)) is not store
+    entity_store.drop_stores("k:1:")
+    assert entity_store.get_store("k:1:assets", rows) is not store
+    entity_store.drop_stores("k:")
+    assert entity_store.stats() == {"stores": 0, "bytes": 0}
+
+
+def test_stores_bounded_by_size(app, monkeypatch):
+    built = EntityStore(ROWS)
+    built.query("alp", order_column="name")
+    monkeypatch.setattr(entity_store, "_max_bytes", lambda: int(built.nbytes * 2.5))
+
+    stores = [entity_store.get_store(f"k:{i}:events", ROWS) for i in range(3)]
+    for store in stores[:2]:
+        store.query("alp", order_column="name")
+    assert entity_store.stats() == {"stores": 3,
+                                    "bytes": sum(store.nbytes for store in stores)}
+
+    # Indexing a third store pushes the least recently used one out
+    stores[2].query("alp", order_column="name")
+    assert entity_store.stats() == {"stores": 2,
+                                    "bytes": stores[1].nbytes + stores[2].nbytes}
+    assert entity_store.get_store("k:2:events", ROWS) is stores[2]
+    assert entity_store.get_store("k:0:events", ROWS) is not stores[0]
+    entity_store.drop_stores("k:")
+    assert entity_store.stats() == {"stores": 0, "bytes": 0}
+
+
+def test_non_list_rows():
+    assert EntityStore(None).query("x") == (0, 0, [])
@@ -0,0 +1,110 @@
+import json
+from collections import namedtuple
+
+import pytest
+
+from app import cache, iris_db
+
+
+_COLUMNS = ("ioc_id", "ioc_value", "ioc_type")
+_Column = namedtuple("_Column", "name")
+
+
+class _Cursor:
+    description = [_Column(name) for name in _COLUMNS]
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((" ".join(sql.split()), list(params or [])))
+        self.result = self.conn.results.pop(0)
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+class _Conn:
+    def __init__(self, results):
+        self.results = results
+        self.statements = []
+
+    def cursor(self):
+        return _Cursor(self)
+
+
+@pytest.fixture
+def conn(app, monkeypatch):
+    app.config.update(CACHE_BACKEND="memory")
+    cache.init_app(app)
+    conn = _Conn([])
+    monkeypatch.setattr(iris_db, "_get_conn", lambda: conn)
+    monkeypatch.setitem(iris_db._entity_columns, "iocs", _COLUMNS)
+    return conn
+
+
+def test_unfiltered_draw_counts_and_pages_live(conn):
+    conn.results = [[(3, 3)], [(1, "a", "ip"), (2, "b", "domain")]]
+    total, filtered, rows = iris_db.query_entity(7, "iocs", start=0, length=2)
+    assert (total, filtered) == (3, 3)
+    assert rows == [{"ioc_id": 1, "ioc_value": "a", "ioc_type": "ip"},
+                    {"ioc_id": 2, "ioc_value": "b", "ioc_type": "domain"}]
+    count_sql, count_params = conn.statements[0]
+    assert count_sql.startswith("SELECT COUNT(*), COUNT(*) FROM")
+    assert count_params == [7]
+    assert cache.get_backend().stats()["entries"] == 0  # draws are not cached
+
+
+def test_filtered_draw_counts_in_one_statement(conn):
+    conn.results = [[(3, 1)], [(2, "b", "domain")]]
+    total, filtered, _ = iris_db.query_entity(7, "iocs", search="b",
+                                              column_filters={"ioc_type": "dom"})
+    assert (total, filtered) == (3, 1)
+    count_sql, count_params = conn.statements[0]
+    assert "COUNT(*) FILTER (WHERE concat_ws(" in count_sql
+    assert count_params == ["%b%", "%dom%", 7]
+    page_sql, page_params = conn.statements[1]
+    assert page_params == [7, "%b%", "%dom%", 25, 0]
+
+
+def test_case_data_streams_uncached_entities(app, monkeypatch):
+    app.config.update(DB_CACHE_MAX_ROWS=100)
+    counts = {"assets": 2, "iocs": 500, "events": 101, "tasks": 0, "notes": 100, "evidences": 1}
+    monkeypatch.setattr(iris_db, "get_entity_counts", lambda case_id, entities: (counts, {}))
+    loaded = []
+
+    def get_entities(case_id, names):
+        loaded.extend(names)
+        return {name: {"case_id": case_id} if name == "case" else [{"n": name}]
+                for name in names}, {}
+
+    monkeypatch.setattr(iris_db, "get_entities", get_entities)
+    monkeypatch.setattr(iris_db, "iter_entity",
+                        lambda case_id, entity: iter([[{"streamed": entity}]]))
+    data = iris_db.iter_case_data(7)
+    assert loaded == ["case", "assets", "tasks", "notes", "evidences"]
+    assert data["case"] == {"case_id": 7}
+    assert list(data["iocs"]) == [[{"streamed": "iocs"}]]
+    assert list(data["events"]) == [[{"streamed": "events"}]]
+    assert list(data["notes"]) == [[{"n": "notes"}]]
+
+
+def test_case_dump_matches_jsonify(app):
+    from app import routes
+
+    data = {"case": {"case_id": 7, "name": "x"}, "assets": [[{"b": 1, "a": None}], [{"b": 2}]],
+            "iocs": [], "events": [[], [{"e": "é"}]]}
+    chunks = routes._case_dump_chunks(7, {name: iter(value) if name != "case" else value
+                                          for name, value in data.items()})
+    expected = {"case": data["case"], "assets": [{"b": 1, "a": None}, {"b": 2}], "iocs": [],
+                "events": [{"e": "é"}]}
+    assert json.loads("".join(chunks)) == {"status": "success", "data": expected}
@@ -0,0 +1,145 @@
+import re
+import sqlite3
+
+import pytest
+
+from app.shadowserver_db import _decode_cursor, _encode_cursor, _fetch_page
+
+
+class _Cursor:
+    """Runs the generated SQL on SQLite, which shares the row-value syntax.
+
+    SQLite sorts NULLs first ascending, PostgreSQL last: ORDER BY terms get
+    PostgreSQL's placement spelled out.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.statements = []
+
+    def execute(self, sql, params):
+        self.statements.append(sql)
+        sql = re.sub(r"ORDER BY (\w+) (asc|desc)",
+                     lambda m: f"{m[0]} NULLS {'LAST' if m[2] == 'asc' else 'FIRST'}", sql)
+        self.result = self.db.execute(sql.replace("%s", "?"), params)
+
+    def fetchall(self):
+        names = [col[0] for col in self.result.description]
+        return [dict(zip(names, row)) for row in self.result.fetchall()]
+
+
+@pytest.fixture
+def cur():
+    db = sqlite3.connect(":memory:")
+    db.execute("""CREATE TABLE ss_events (
+        id INTEGER PRIMARY KEY, report_type TEXT, report_date TEXT, ip TEXT, port INTEGER,
+        asn INTEGER, geo TEXT, hostname TEXT, tag TEXT, severity TEXT, raw_data TEXT,
+        ingested_at TEXT)""")
+    for i in range(1, 88):
+        db.execute(
+            "INSERT INTO ss_events VALUES (?, ?, ?, ?, ?, ?, 'NL', ?, NULL, ?, '{}', NULL)",
+            (i, f"scan_{i % 3}", f"2026-01-{i % 9 + 1:02d}", f"10.0.0.{i}",
+             None if i % 4 == 0 else i % 7, 64500 + i % 5,
+             None if i % 6 == 0 else f"h{i % 10}.example", ["low", "high", None][i % 3]))
+    yield _Cursor(db)
+    db.close()
+
+
+def _offset_pages(cur, where, params, column, direction, length):
+    pages, start = [], 0
+    while True:
+        rows, _ = _fetch_page(cur, where, params, column, direction, start, length)
+        if not rows:
+            return pages
+        pages.append(rows)
+        start += length
+
+
+def test_cursor_round_trip():
+    cursor = _encode_cursor(k="next", c="port", d="asc", v=None, i=7, p=25, f="abc")
+    assert _decode_cursor(cursor) == {"k": "next", "c": "port", "d": "asc", "v": None,
+                                      "i": 7, "p": 25, "f": "abc"}
+    assert "=" not in cursor
+
+
+@pytest.mark.parametrize("cursor", ["", None, "!!!", "bm90IGpzb24", _encode_cursor(k="next")])
+def test_malformed_cursor(cursor):
+    assert _decode_cursor(cursor) is None
+
+
+@pytest.mark.parametrize("column", ["report_date", "port", "hostname", "severity", "asn"])
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+@pytest.mark.parametrize("where,params", [("", []), ("WHERE asn <> %s", [64502])])
+def test_seek_matches_offset(cur, column, direction, where, params):
+    length = 10
+    expected = _offset_pages(cur, where, params, column, direction, length)
+    assert len(expected) > 2
+
+    # Forward through every page with the next cursors
+    start, cursor, forward = 0, None, []
+    while True:
+        rows, cursors = _fetch_page(cur, where, params, column, direction, start, length, cursor)
+        if not rows:
+            break
+        forward.append(rows)
+        start, cursor = start + len(rows), cursors["next"]
+    assert forward == expected
+
+    # ... and back again with the prev cursors
+    start = (len(expected) - 1) * length
+    rows, cursors = _fetch_page(cur, where, params, column, direction, start, length)
+    backward = [rows]
+    while cursors["prev"]:
+        start -= length
+        rows, cursors = _fetch_page(cur, where, params, column, direction, start, length,
+                                    cursors["prev"])
+        backward.append(rows)
+    assert start == 0
+    assert backward[::-1] == expected
+
+
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+def test_seek_statements_are_index_ranges(cur, direction):
+    """Each seek is one (column, id) range in index order: no OR, no NULLS clause."""
+    _, cursors = _fetch_page(cur, "", [], "port", direction, 0, 10)
+    seen = len(cur.statements)
+    start, rows = 0, [None] * 10
+    while len(rows) == 10:  # up to the short last page
+        rows, cursors = _fetch_page(cur, "", [], "port", direction, start + 10, 10,
+                                    cursors["next"])
+        start += 10
+    _fetch_page(cur, "", [], "port", direction, start - 10, 10, cursors["prev"])
+    seeks = cur.statements[seen:]
+    assert any("port IS NULL" in sql for sql in seeks)
+    for sql in [cur.statements[0]] + seeks:
+        assert " OR " not in sql and "NULLS" not in sql
+        assert re.search(r"ORDER BY port (asc|desc), id \1 LIMIT", sql)
+    assert all("OFFSET" not in sql for sql in seeks)
+
+
+def test_desc_sorts_nulls_first(cur):
+    rows, _ = _fetch_page(cur, "", [], "port", "desc", 0, 30)
+    assert [row["port"] for row in rows[:21]] == [None] * 21
+    rows, _ = _fetch_page(cur, "", [], "port", "asc", 70, 30)
+    assert [row["port"] for row in rows[-17:]] == [None] * 17
+
+
+@pytest.mark.parametrize("change", [
+    {"order_column": "asn"},
+    {"order_dir": "desc"},
+    {"start": 20},
+    {"where": "WHERE asn <> %s", "params": [64502]},
+])
+def test_foreign_cursor_falls_back_to_offset(cur, change):
+    _, cursors = _fetch_page(cur, "", [], "port", "asc", 0, 10)
+    draw = {"where": "", "params": [], "order_column": "port", "order_dir": "asc",
+            "start": 10, "length": 10, **change}
+    rows, _ = _fetch_page(cur, cursor=cursors["next"], **draw)
+    assert "OFFSET" in cur.statements[-1]
+    del draw["start"]
+    assert rows == _fetch_page(cur, start=change.get("start", 10), **draw)[0]
+
+
+def test_unknown_order_column(cur):
+    _fetch_page(cur, "", [], "raw_data; DROP TABLE ss_events", "sideways", 0, 5)
+    assert "ORDER BY report_date desc" in cur.statements[-1]
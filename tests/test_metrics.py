@@ -0,0 +1,22 @@
+import pytest
+
+from app import cache, metrics
+
+
+@pytest.mark.parametrize("authorization, status", [
+    ("Bearer s3cret", 200),
+    ("Bearer wrong", 401),
+    ("Bearer s3cr\xe9t", 401),
+    ("", 401),
+])
+def test_metrics_token(app, authorization, status):
+    app.config.update(CACHE_BACKEND="memory", METRICS_TOKEN="s3cret")
+    cache.init_app(app)
+    with app.test_request_context("/metrics", headers={"Authorization": authorization}):
+        assert metrics.metrics_view().status_code == status
+
+
+def test_metrics_hidden_without_token(app):
+    app.config["METRICS_TOKEN"] = ""
+    with app.test_request_context("/metrics", headers={"Authorization": "Bearer "}):
+        assert metrics.metrics_view().status_code == 404
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from app import cache, iris_api
+
+
+class _Fetches(list):
+    """IRIS stand-in: every fetch returns a new version and records its ``previous``."""
+
+    def fetch(self, previous):
+        self.append(previous)
+        return f"v{len(self)}", None
+
+
+@pytest.fixture
+def fetches(app, monkeypatch):
+    app.config.update(CACHE_BACKEND="memory", CACHE_MIN_REFRESH=15,
+                      CACHE_STALE_WHILE_REVALIDATE=True)
+    cache.init_app(app)
+    monkeypatch.setattr(iris_api, "get_api_key", lambda: "key")
+    calls = _Fetches()
+    iris_api._cached_fetch("k", calls.fetch)
+    return calls
+
+
+def _wait_for(predicate):
+    deadline = time.time() + 5
+    while not predicate():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_manual_refresh_refetches_at_once(fetches):
+    assert iris_api._cached_fetch("k", fetches.fetch, bust_cache=True) == "v2"
+    assert iris_api._cached_fetch("k", fetches.fetch) == "v2"
+
+
+def test_auto_refresh_waits_for_min_interval(fetches):
+    assert iris_api._cached_fetch("k", fetches.fetch, bust_cache="auto") == "v1"
+    assert len(fetches) == 1
+
+
+def test_auto_refresh_revalidates_in_background(app, fetches):
+    app.config["CACHE_MIN_REFRESH"] = 0
+    assert iris_api._cached_fetch("k", fetches.fetch, bust_cache="auto") == "v1"
+    _wait_for(lambda: iris_api._get_cached("k") == "v2")
+    assert fetches[-1]["data"] == "v1"  # the refetch gets the cached entry
+
+
+def test_auto_refresh_without_swr_is_synchronous(app, fetches):
+    app.config.update(CACHE_MIN_REFRESH=0, CACHE_STALE_WHILE_REVALIDATE=False)
+    assert iris_api._cached_fetch("k", fetches.fetch, bust_cache="auto") == "v2"
+
+
+def test_manual_refreshes_are_coalesced(app, fetches):
+    release = threading.Event()
+
+    def slow_fetch(previous):
+        release.wait(5)
+        return fetches.fetch(previous)
+
+    results = []
+
+    def refresh():
+        with app.app_context():
+            results.append(iris_api._cached_fetch("k", slow_fetch, bust_cache=True))
+
+    threads = [threading.Thread(target=refresh) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["v2"] * 4
+    assert len(fetches) == 2
@@ -0,0 +1,34 @@
+import pytest
+
+from app.shadowserver_db import parse_search
+
+
+@pytest.mark.parametrize("search,expected", [
+    ("mirai 10.0.0.1", (["mirai", "10.0.0.1"], [])),
+    ('tag:botnet ip:10.0.0.0/8 "open resolver"',
+     (["open resolver"], [("tag", "botnet"), ("ip", "10.0.0.0/8")])),
+    ('host:"my host" asn:AS3320', ([], [("hostname", "my host"), ("asn", "AS3320")])),
+    ("type:'scan http'", ([], [("report_type", "scan http")])),
+    ("unknown:value tag:", (["unknown:value", "tag:"], [])),
+    ("", ([], [])),
+])
+def test_terms_and_fields(search, expected):
+    assert parse_search(search) == expected
+
+
+@pytest.mark.parametrize("search,expected", [
+    (r"C:\Windows\System32", ([r"C:\Windows\System32"], [])),
+    (r"\d+\.exe tag:a\b", ([r"\d+\.exe"], [("tag", r"a\b")])),
+    (r'"C:\Program Files\x"', ([r"C:\Program Files\x"], [])),
+])
+def test_backslashes_are_literal(search, expected):
+    assert parse_search(search) == expected
+
+
+@pytest.mark.parametrize("search,expected", [
+    ('tag:"open resolver', ([], [("tag", "open resolver")])),
+    ("o'brien scan", (["obrien scan"], [])),
+    ('mirai "', (["mirai"], [])),
+])
+def test_unbalanced_quotes(search, expected):
+    assert parse_search(search) == expected
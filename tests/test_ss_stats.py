@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+
+from app import shadowserver_db
+
+
+class _Cursor:
+    """SQLite stand-in for a RealDictCursor."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.result = self.db.execute(sql.replace("::BIGINT", ""), params or [])
+
+    def _row(self, row):
+        return dict(zip([col[0] for col in self.result.description], row))
+
+    def fetchone(self):
+        return self._row(self.result.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self.result.fetchall()]
+
+
+class _Conn:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, cursor_factory=None):
+        return _Cursor(self.db)
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE ss_events (id INTEGER PRIMARY KEY, report_type TEXT, report_date TEXT)")
+    db.executemany("INSERT INTO ss_events (report_type, report_date) VALUES (?, ?)",
+                   [("scan_a", "2026-01-01"), ("scan_b", "2026-01-02"), (None, "2026-01-02"),
+                    ("", "2026-01-03"), ("scan_a", "2026-01-03")])
+    db.execute("""CREATE TABLE ss_events_daily AS
+        SELECT report_date, COALESCE(report_type, '') AS report_type, COUNT(*) AS events
+        FROM ss_events GROUP BY 1, 2""")
+    db.execute("CREATE TABLE ss_rollup_state (refreshed_at TEXT)")
+    db.execute("""CREATE TABLE ss_ingestion_log (id INTEGER PRIMARY KEY, run_started TEXT,
+        run_finished TEXT, status TEXT, reports_found INTEGER, events_ingested INTEGER,
+        events_skipped INTEGER, error_message TEXT)""")
+    conn = _Conn(db)
+    monkeypatch.setattr(shadowserver_db, "_get_conn", lambda: conn)
+    yield conn
+    db.close()
+
+
+@pytest.mark.parametrize("rollup", [True, False])
+def test_untyped_events_are_one_report_type(conn, monkeypatch, rollup):
+    monkeypatch.setattr(shadowserver_db, "_use_rollup", lambda cur: rollup)
+    assert shadowserver_db.get_report_types() == ["", "scan_a", "scan_b"]
+    stats = shadowserver_db.get_stats()
+    assert (stats["total_events"], stats["report_types"]) == (5, 3)